@@ -32,6 +32,8 @@ threadsafety = 1
 paramstyle = 'qmark'
 
 CONFIG_ERROR = "CONFIG_ERROR"
+BATCH_ERROR = "BATCH_ERROR"
+POOL_TIMEOUT = "POOL_TIMEOUT"
 
 
 class OutParam ():
@@ -105,6 +107,17 @@ class DatabaseError(Error):
         self.sqlState = sqlState
 
 
+class BatchError(DatabaseError):
+
+    """Represents errors returned by the Database for individual parameter
+     sets of a batch. failures is a list of (index, DatabaseError) tuples
+     identifying the parameter sets that need to be resubmitted."""
+
+    def __init__(self, code, msg, failures):
+        DatabaseError.__init__(self, code, msg)
+        self.failures = failures
+
+
 class InternalError(DatabaseError):
 
     def __init__(self, code, msg):
@@ -25,12 +25,26 @@
 import re
 import logging
 import json
+import array
+import functools
 from . import util
 from .api import *  # @UnusedWildImport # noqa
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 logger = logging.getLogger(__name__)
 
 SECS_IN_MILLISECS = MILLISECS_IN_MICROSECS = 1000
+# The array type codes used for integer and float columns.
+try:
+    INTEGER_ARRAY_TYPE = array.array("q").typecode
+except ValueError:
+    # Python 2 does not support long long arrays.
+    INTEGER_ARRAY_TYPE = "l"
+FLOAT_ARRAY_TYPE = "d"
 dateRegExStr = r"(\d{4})-(\d{2})-(\d{2})"
 timeRegExStr = r"(\d{2}):(\d{2}):(\d{2})(\.(\d{1,6}))?(([-+])(\d{2}):(\d{2}))?"
 dateRegEx = re.compile("^{}$".format(dateRegExStr))
@@ -53,6 +67,12 @@ NUMBER_TYPES = ("BYTEINT", "BIGINT", "DECIMAL", "DOUBLE", "DOUBLE PRECISION",
 
 FLOAT_TYPES = ("FLOAT", "DOUBLE", "DOUBLE PRECISION", "REAL")
 
+INTEGER_TYPES = ("BYTEINT", "SMALLINT", "INTEGER", "INT", "BIGINT")
+
+# The ways values of JSON columns are returned, parsed into python objects,
+# as JSONValue instances parsed on first access or as the raw JSON text.
+JSON_PARSE, JSON_LAZY, JSON_RAW = "parse", "lazy", "raw"
+
 BINARY_TYPES = (
     "BLOB", "BYTE", "GRAPHIC", "LONG VARGRAPHIC", "VARBYTE", "VARGRAPHIC")
 
@@ -70,11 +90,66 @@ def _getInt(m, num):
     return int(m.group(num))
 
 
-def _getFloat(m, num):
-    return float(m.group(num))
+if hasattr(datetime.datetime, "fromisoformat"):
+    _dateFromString = datetime.date.fromisoformat
+    _timeFromString = datetime.time.fromisoformat
+    _timestampFromString = datetime.datetime.fromisoformat
+else:
+    # Python versions before 3.7 slice the fields at their fixed offsets.
+    def _getFraction(value, start):
+        return int(value[start:]) * 10 ** (start + 6 - len(value)) \
+            if len(value) > start else 0
+
+    def _dateFromString(value):
+        return datetime.date(int(value[0:4]), int(value[5:7]),
+                             int(value[8:10]))
+
+    def _timeFromString(value):
+        return datetime.time(int(value[0:2]), int(value[3:5]),
+                             int(value[6:8]), _getFraction(value, 9))
+
+    def _timestampFromString(value):
+        return datetime.datetime(int(value[0:4]), int(value[5:7]),
+                                 int(value[8:10]), int(value[11:13]),
+                                 int(value[14:16]), int(value[17:19]),
+                                 _getFraction(value, 20))
+
+
+def _isDateLayout(value):
+    # YYYY-MM-DD
+    return len(value) == 10 and value[4] == "-" and value[7] == "-"
+
+
+def _isTimeLayout(value, offset=0):
+    # HH:MM:SS[.ffffff] without a time zone.
+    length = len(value) - offset
+    return (length == 8 or 9 < length < 16 and value[offset + 8] == "." and
+            value[offset + 9:].isdigit()) and value[offset + 2] == ":" and \
+        value[offset + 5] == ":"
+
+
+def _isTimestampLayout(value):
+    # YYYY-MM-DD HH:MM:SS[.ffffff] without a time zone.
+    return len(value) > 10 and value[10] == " " and value[4] == "-" and \
+        value[7] == "-" and _isTimeLayout(value, 11)
+
+
+def _hasOffset(value):
+    # A trailing +HH:MM or -HH:MM time zone offset.
+    return len(value) > 6 and value[-3] == ":" and value[-6] in "+-" and \
+        value[-5:-3].isdigit() and value[-2:].isdigit()
+
+
+def _getOffset(value):
+    return getTimeZone(value[-6], int(value[-5:-3]), int(value[-2:]))
 
 
 def convertDate(value):
+    if _isDateLayout(value):
+        try:
+            return _dateFromString(value)
+        except ValueError:
+            pass
     m = dateRegEx.match(value)
     if m:
         return datetime.date(_getInt(m, 1), _getInt(m, 2), _getInt(m, 3))
@@ -84,11 +159,22 @@ def convertDate(value):
 
 
 def convertTime(value):
+    if _isTimeLayout(value):
+        try:
+            return _timeFromString(value)
+        except ValueError:
+            pass
+    elif _hasOffset(value) and _isTimeLayout(value[:-6]):
+        try:
+            return _timeFromString(value[:-6]).replace(
+                tzinfo=_getOffset(value))
+        except ValueError:
+            pass
     m = timeRegEx.match(value)
     if m:
         tz = None
         if m.group(7):
-            tz = TimeZone(m.group(7), _getInt(m, 8), _getInt(m, 9))
+            tz = getTimeZone(m.group(7), _getInt(m, 8), _getInt(m, 9))
         return datetime.time(_getInt(m, 1), _getInt(m, 2), _getInt(m, 3),
                              _getMs(m, 5), tz)
     else:
@@ -97,11 +183,22 @@ def convertTime(value):
 
 
 def convertTimestamp(value):
+    if _isTimestampLayout(value):
+        try:
+            return _timestampFromString(value)
+        except ValueError:
+            pass
+    elif _hasOffset(value) and _isTimestampLayout(value[:-6]):
+        try:
+            return _timestampFromString(value[:-6]).replace(
+                tzinfo=_getOffset(value))
+        except ValueError:
+            pass
     m = timestampRegEx.match(value)
     if m:
         tz = None
         if m.group(10):
-            tz = TimeZone(m.group(10), _getInt(m, 11), _getInt(m, 12))
+            tz = getTimeZone(m.group(10), _getInt(m, 11), _getInt(m, 12))
         return datetime.datetime(_getInt(m, 1), _getInt(m, 2), _getInt(m, 3),
                                  _getInt(m, 4), _getInt(m, 5), _getInt(m, 6),
                                  _getMs(m, 8), tz)
@@ -110,86 +207,159 @@ def convertTimestamp(value):
             "INVALID_TIMESTAMP", "Timestamp format invalid: {}".format(value))
 
 
-def _convertScalarInterval(dataType, value, *args):
-    return _convertInterval(dataType, value, scalarIntervalRegEx, *args)
-
-
-def _convertInterval(dataType, value, regEx, *args):
-    m = regEx.match(value)
-    if m:
-        kwargs = {}
-        index = 2
-        for field in args:
-            if field != "seconds":
-                kwargs[field] = _getInt(m, index)
-            else:
-                kwargs[field] = _getFloat(m, index)
-            index += 1
-        return Interval(negative=True if m.group(1) else False, **kwargs)
+# The format and fields of the values of each INTERVAL type.
+INTERVAL_FORMATS = {
+    "INTERVAL YEAR": (scalarIntervalRegEx, ("years",)),
+    "INTERVAL YEAR TO MONTH": (yearToMonthIntervalRegEx,
+                               ("years", "months")),
+    "INTERVAL MONTH": (scalarIntervalRegEx, ("months",)),
+    "INTERVAL DAY": (scalarIntervalRegEx, ("days",)),
+    "INTERVAL DAY TO HOUR": (dayToHourIntervalRegEx, ("days", "hours")),
+    "INTERVAL DAY TO MINUTE": (dayToMinuteIntervalRegEx,
+                               ("days", "hours", "minutes")),
+    "INTERVAL DAY TO SECOND": (dayToSecondIntervalRegEx,
+                               ("days", "hours", "minutes", "seconds")),
+    "INTERVAL HOUR": (scalarIntervalRegEx, ("hours",)),
+    "INTERVAL HOUR TO MINUTE": (hourToMinuteIntervalRegEx,
+                                ("hours", "minutes")),
+    "INTERVAL HOUR TO SECOND": (hourToSecondIntervalRegEx,
+                                ("hours", "minutes", "seconds")),
+    "INTERVAL MINUTE": (scalarIntervalRegEx, ("minutes",)),
+    "INTERVAL MINUTE TO SECOND": (minuteToSecondIntervalRegEx,
+                                  ("minutes", "seconds")),
+    "INTERVAL SECOND": (secondIntervalRegEx, ("seconds",))
+}
+
+# Seconds in a day, hour and minute for timedelta conversions.
+INTERVAL_SECONDS = {"days": 86400, "hours": 3600, "minutes": 60,
+                    "seconds": 1}
+
+_intervalConverters = {}
+_periodConverters = {}
+
+
+def _strip(value):
+    return None if value is None else value.strip()
+
+
+def intervalConverter(dataType, useTimedelta=False):
+    """Returns a function that converts values of the given INTERVAL type,
+     the format of the type is only looked up once. Day and time intervals
+     are converted to datetime.timedelta if useTimedelta is True, other
+     intervals to Interval. Values of unknown types are returned
+     stripped and nulls unchanged."""
+    key = (dataType, useTimedelta)
+    convert = _intervalConverters.get(key)
+    if convert is None:
+        convert = _intervalConverters.setdefault(
+            key, _createIntervalConverter(dataType, useTimedelta))
+    return convert
+
+
+def _createIntervalConverter(dataType, useTimedelta):
+    try:
+        regEx, fields = INTERVAL_FORMATS[dataType]
+    except KeyError:
+        return _strip
+    parsers = tuple(float if field == "seconds" else int for field in fields)
+    intervalType = dataType[len("INTERVAL "):]
+    if useTimedelta and "years" not in fields and "months" not in fields:
+        scales = tuple(INTERVAL_SECONDS[field] for field in fields)
     else:
-        raise InterfaceError("INVALID_INTERVAL",
-                             "{} format invalid: {}".format(dataType, value))
+        scales = None
+        indexes = tuple(Interval.__slots__.index(field) for field in fields)
+
+    def convert(value):
+        if value is None:
+            return None
+        m = regEx.match(value.strip())
+        if m is None:
+            raise InterfaceError(
+                "INVALID_INTERVAL",
+                "{} format invalid: {}".format(dataType, value))
+        groups = m.groups()
+        if scales is not None:
+            seconds = 0
+            for parse, group, scale in zip(parsers, groups[1:], scales):
+                seconds += parse(group) * scale
+            return datetime.timedelta(0, -seconds if groups[0] else seconds)
+        values = [groups[0] == "-", None, None, None, None, None, None,
+                  intervalType]
+        for index, parse, group in zip(indexes, parsers, groups[1:]):
+            values[index] = parse(group)
+        return Interval._create(values)
+    return convert
 
 
 def convertInterval(dataType, value):
-    value = value.strip()
-    if dataType == "INTERVAL YEAR":
-        return _convertScalarInterval(dataType, value, "years")
-    elif dataType == "INTERVAL YEAR TO MONTH":
-        return _convertInterval(dataType, value, yearToMonthIntervalRegEx,
-                                "years", "months")
-    elif dataType == "INTERVAL MONTH":
-        return _convertScalarInterval(dataType, value, "months")
-    elif dataType == "INTERVAL DAY":
-        return _convertScalarInterval(dataType, value, "days")
-    elif dataType == "INTERVAL DAY TO HOUR":
-        return _convertInterval(dataType, value, dayToHourIntervalRegEx,
-                                "days", "hours")
-    elif dataType == "INTERVAL DAY TO MINUTE":
-        return _convertInterval(dataType, value, dayToMinuteIntervalRegEx,
-                                "days", "hours", "minutes")
-    elif dataType == "INTERVAL DAY TO SECOND":
-        return _convertInterval(dataType, value, dayToSecondIntervalRegEx,
-                                "days", "hours", "minutes", "seconds")
-    elif dataType == "INTERVAL HOUR":
-        return _convertScalarInterval(dataType, value, "hours")
-    elif dataType == "INTERVAL HOUR TO MINUTE":
-        return _convertInterval(dataType, value, hourToMinuteIntervalRegEx,
-                                "hours", "minutes")
-    elif dataType == "INTERVAL HOUR TO SECOND":
-        return _convertInterval(dataType, value, hourToSecondIntervalRegEx,
-                                "hours", "minutes", "seconds")
-    elif dataType == "INTERVAL MINUTE":
-        return _convertScalarInterval(dataType, value, "minutes")
-    elif dataType == "INTERVAL MINUTE TO SECOND":
-        return _convertInterval(dataType, value, minuteToSecondIntervalRegEx,
-                                "minutes", "seconds")
-    elif dataType == "INTERVAL SECOND":
-        return _convertInterval(dataType, value, secondIntervalRegEx,
-                                "seconds")
-    return value
-
+    return intervalConverter(dataType)(value)
+
+
+def periodConverter(dataType):
+    """Returns a function that converts values of the given PERIOD type, the
+     type of its start and end is only looked up once. Nulls are returned
+     unchanged."""
+    convert = _periodConverters.get(dataType)
+    if convert is None:
+        convert = _periodConverters.setdefault(
+            dataType, _createPeriodConverter(dataType))
+    return convert
+
+
+def _createPeriodConverter(dataType):
+    if "TIMESTAMP" in dataType:
+        convertBound = convertTimestamp
+    elif "TIME" in dataType:
+        convertBound = convertTime
+    elif "DATE" in dataType:
+        convertBound = convertDate
+    else:
+        convertBound = None
 
-def convertPeriod(dataType, value):
-    m = periodRegEx.match(value)
-    if m:
-        if "TIMESTAMP" in dataType:
-            start = convertTimestamp(m.group(1))
-            end = convertTimestamp(m.group(2))
-        elif "TIME" in dataType:
-            start = convertTime(m.group(1))
-            end = convertTime(m.group(2))
-        elif "DATE" in dataType:
-            start = convertDate(m.group(1))
-            end = convertDate(m.group(2))
-        else:
+    def convert(value):
+        if value is None:
+            return None
+        m = periodRegEx.match(value)
+        if m is None:
+            raise InterfaceError(
+                "INVALID_PERIOD",
+                "{} format invalid: {}".format(dataType, value))
+        if convertBound is None:
             raise InterfaceError("INVALID_PERIOD",
                                  "Unknown PERIOD data type: {}".format(
                                      dataType, value))
-    else:
-        raise InterfaceError(
-            "INVALID_PERIOD", "{} format invalid: {}".format(dataType, value))
-    return Period(start, end)
+        return Period(convertBound(m.group(1)), convertBound(m.group(2)))
+    return convert
+
+
+def convertPeriod(dataType, value):
+    return periodConverter(dataType)(value)
+
+
+def columnArrayType(dataType):
+    """Returns the array type code for values of the given data type or None
+     if they can't be stored in an array."""
+    if dataType in INTEGER_TYPES:
+        return INTEGER_ARRAY_TYPE
+    elif dataType in FLOAT_TYPES:
+        return FLOAT_ARRAY_TYPE
+    return None
+
+
+def numericColumn(arrayType, values):
+    """Returns the values of an integer or float column as an array of the
+     given type, as a NumPy array if NumPy is installed or as a list if the
+     column contains nulls."""
+    if not isinstance(values, array.array):
+        convert = float if arrayType == FLOAT_ARRAY_TYPE else int
+        if None in values:
+            return [None if v is None else convert(v) for v in values]
+        values = array.array(arrayType, map(convert, values))
+    if numpy is not None:
+        if not values:
+            return numpy.zeros(0, values.typecode)
+        return numpy.frombuffer(values, values.typecode)
+    return values
 
 
 def zeroIfNone(value):
@@ -198,6 +368,93 @@ def zeroIfNone(value):
     return value
 
 
+def _convertNumber(value):
+    if value is None:
+        return None
+    try:
+        return NUMBER(value)
+    except:
+        # Handle infinity and NaN for older ODBC drivers.
+        if value == "1.#INF":
+            return NUMBER('Infinity')
+        elif value == "-1.#INF":
+            return NUMBER('-Infinity')
+        else:
+            return NUMBER('NaN')
+
+
+def _convertFloat(value):
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return float(_convertNumber(value))
+
+
+def _fromMillis(value):
+    return datetime.datetime.fromtimestamp(
+        value // SECS_IN_MILLISECS).replace(
+        microsecond=value % SECS_IN_MILLISECS * MILLISECS_IN_MICROSECS)
+
+
+def _convertTimestamp(value):
+    if value is None:
+        return None
+    if util.isString(value):
+        return convertTimestamp(value)
+    return _fromMillis(value)
+
+
+def _convertTime(value):
+    if value is None:
+        return None
+    if util.isString(value):
+        return convertTime(value)
+    return _fromMillis(value).time()
+
+
+def _convertDate(value):
+    if value is None:
+        return None
+    if util.isString(value):
+        return convertDate(value)
+    return _fromMillis(value).date()
+
+
+def _convertBinary(value):
+    if value is None:
+        return None
+    if util.isString(value):
+        return bytearray.fromhex(value)
+    return value
+
+
+def _convertJson(value):
+    if value is None:
+        return None
+    if util.isString(value):
+        return json.loads(value, parse_int=decimal.Decimal,
+                          parse_float=decimal.Decimal)
+    return value
+
+
+def _lazyJson(value):
+    if value is None:
+        return None
+    if util.isString(value):
+        return JSONValue(value)
+    return value
+
+
+def _convertInt(value):
+    return None if value is None else int(value)
+
+
+def _identity(value):
+    return value
+
+
 class DataTypeConverter:
 
     """Handles conversion of result set data types into python objects."""
@@ -213,13 +470,50 @@ class DataTypeConverter:
         raise NotImplementedError(
             "convertType must be implemented by sub-class")
 
+    def columnConverter(self, dbType, dataType, typeCode):
+        """Returns a function that converts the values of a result set
+         column, including nulls, it is called once per column when the
+         result set is read. By default values are converted with
+         convertValue."""
+        return functools.partial(
+            self.convertValue, dbType, dataType, typeCode)
+
+    def convertColumn(self, dbType, dataType, typeCode, values):
+        """Converts a block of values of a column, returning a sequence of the
+         python objects convertValue would return for each value. Cursors
+         call this for every column of the rows read by fetchmany and
+         fetchall, so sub-classes can convert a whole column at once. Blocks
+         of columns that need no conversion, such as strings, are returned
+         as they are, integer columns are still converted."""
+        convert = self.columnConverter(dbType, dataType, typeCode)
+        if convert is _identity:
+            return values
+        return list(map(convert, values))
+
 
 class DefaultDataTypeConverter (DataTypeConverter):
 
     """Handles conversion of result set data types into python objects."""
 
-    def __init__(self, useFloat=False):
+    def __init__(self, useFloat=False, useInt=False, useTimedelta=False,
+                 jsonMode=JSON_PARSE):
+        """useFloat converts FLOAT columns to float and useInt integer
+         columns (BYTEINT, SMALLINT, INTEGER and BIGINT) to int rather than
+         decimal.Decimal, DECIMAL and NUMBER columns are always converted to
+         decimal.Decimal. useTimedelta converts day and time INTERVAL
+         columns to datetime.timedelta rather than Interval. jsonMode is one
+         of JSON_PARSE, JSON_LAZY or JSON_RAW. The REST API returns JSON
+         columns as JSON strings, so with JSON_PARSE their text is decoded
+         by the response parser and parsed again here, JSON_LAZY or
+         JSON_RAW avoid the second pass. Documents that are already parsed
+         are returned as they are in every mode."""
+        if jsonMode not in (JSON_PARSE, JSON_LAZY, JSON_RAW):
+            raise InterfaceError(
+                CONFIG_ERROR, "Unknown JSON mode: {}".format(jsonMode))
         self.useFloat = useFloat
+        self.useInt = useInt
+        self.useTimedelta = useTimedelta
+        self.jsonMode = jsonMode
 
     def convertValue(self, dbType, dataType, typeCode, value):
         """Converts the value returned by the database into the desired
@@ -227,55 +521,49 @@ class DefaultDataTypeConverter (DataTypeConverter):
         logger.trace(
             "Converting \"%s\" to (%s, %s).", value, dataType, typeCode)
         if value is not None:
-            if typeCode == NUMBER:
-                try:
-                    return NUMBER(value)
-                except:
-                    # Handle infinity and NaN for older ODBC drivers.
-                    if value == "1.#INF":
-                        return NUMBER('Infinity')
-                    elif value == "-1.#INF":
-                        return NUMBER('-Infinity')
-                    else:
-                        return NUMBER('NaN')
-            elif typeCode == float:
-                return value if not util.isString else float(value)
-            elif typeCode == Timestamp:
-                if util.isString(value):
-                    return convertTimestamp(value)
-                else:
-                    return datetime.datetime.fromtimestamp(
-                        value // SECS_IN_MILLISECS).replace(
-                        microsecond=value % SECS_IN_MILLISECS *
-                        MILLISECS_IN_MICROSECS)
-            elif typeCode == Time:
-                if util.isString(value):
-                    return convertTime(value)
-                else:
-                    return datetime.datetime.fromtimestamp(
-                        value // SECS_IN_MILLISECS).replace(
-                        microsecond=value % SECS_IN_MILLISECS *
-                        MILLISECS_IN_MICROSECS).time()
-            elif typeCode == Date:
-                if util.isString(value):
-                    return convertDate(value)
-                else:
-                    return datetime.datetime.fromtimestamp(
-                        value // SECS_IN_MILLISECS).replace(
-                        microsecond=value % SECS_IN_MILLISECS *
-                        MILLISECS_IN_MICROSECS).date()
-            elif typeCode == BINARY:
-                if util.isString(value):
-                    return bytearray.fromhex(value)
-            elif dataType.startswith("INTERVAL"):
-                return convertInterval(dataType, value)
-            elif dataType.startswith("JSON") and util.isString(value):
-                return json.loads(value, parse_int=decimal.Decimal,
-                                  parse_float=decimal.Decimal)
-            elif dataType.startswith("PERIOD"):
-                return convertPeriod(dataType, value)
+            return self._columnConverter(dataType, typeCode)(value)
         return value
 
+    def columnConverter(self, dbType, dataType, typeCode):
+        """Returns a function specialized for the column's type that converts
+         its values and passes nulls through, so types are dispatched once
+         per column rather than for every value."""
+        convertValue = getattr(type(self).convertValue, "__func__",
+                               type(self).convertValue)
+        if convertValue is not DefaultDataTypeConverter.__dict__[
+                "convertValue"]:
+            # Honour convertValue overridden by a sub-class.
+            return DataTypeConverter.columnConverter(
+                self, dbType, dataType, typeCode)
+        return self._columnConverter(dataType, typeCode)
+
+    def _columnConverter(self, dataType, typeCode):
+        if typeCode == NUMBER:
+            return _convertNumber
+        elif typeCode == float:
+            return _convertFloat
+        elif typeCode == int:
+            return _convertInt
+        elif typeCode == Timestamp:
+            return _convertTimestamp
+        elif typeCode == Time:
+            return _convertTime
+        elif typeCode == Date:
+            return _convertDate
+        elif typeCode == BINARY:
+            return _convertBinary
+        elif dataType.startswith("INTERVAL"):
+            return intervalConverter(dataType, self.useTimedelta)
+        elif dataType.startswith("JSON"):
+            if self.jsonMode == JSON_LAZY:
+                return _lazyJson
+            elif self.jsonMode == JSON_RAW:
+                return _identity
+            return _convertJson
+        elif dataType.startswith("PERIOD"):
+            return periodConverter(dataType)
+        return _identity
+
     def convertType(self, dbType, dataType):
         """Converts the data type to a python type code."""
         typeCode = STRING
@@ -283,6 +571,8 @@ class DefaultDataTypeConverter (DataTypeConverter):
             typeCode = NUMBER
             if self.useFloat and dataType in FLOAT_TYPES:
                 typeCode = float
+            elif self.useInt and dataType in INTEGER_TYPES:
+                typeCode = int
         elif dataType in BINARY_TYPES:
             typeCode = BINARY
         elif dataType.startswith("DATE"):
@@ -294,15 +584,85 @@ class DefaultDataTypeConverter (DataTypeConverter):
         return typeCode
 
 
+class NumpyDataTypeConverter (DefaultDataTypeConverter):
+
+    """Converts the columns returned by fetchcolumns into NumPy arrays. DATE
+     and TIMESTAMP columns become datetime64[D] and datetime64[us] arrays
+     (TIMESTAMP WITH TIME ZONE values are converted to UTC), integer columns
+     int64 arrays and FLOAT and DECIMAL columns float64 arrays, or int64
+     arrays of the values scaled by 10 ** decimalScale if decimalScale is
+     given. Columns with nulls are returned as masked arrays. Other columns
+     and the values of individual rows are converted as by
+     DefaultDataTypeConverter."""
+
+    def __init__(self, decimalScale=None):
+        if numpy is None:
+            raise InterfaceError(
+                "NUMPY_NOT_INSTALLED",
+                "NumPy is required to use NumpyDataTypeConverter.")
+        DefaultDataTypeConverter.__init__(self)
+        self.decimalScale = decimalScale
+
+    def convertArray(self, dbType, dataType, typeCode, values):
+        """Converts the values of a column into a NumPy array, values is an
+         array for integer and float columns fetched into bound buffers."""
+        null = 0
+        if dataType in INTEGER_TYPES:
+            dtype, convert = numpy.int64, int
+        elif dataType in FLOAT_TYPES or (
+                typeCode == NUMBER and self.decimalScale is None):
+            dtype, convert = numpy.float64, float
+        elif typeCode == NUMBER:
+            dtype, convert = numpy.int64, self._scaleDecimal
+        elif typeCode in (Date, Timestamp):
+            dtype = "datetime64[D]" if typeCode == Date else "datetime64[us]"
+            null = "NaT"
+
+            def convert(value):
+                return self._convertDatetime(
+                    dbType, dataType, typeCode, value)
+        else:
+            return list(self.convertColumn(dbType, dataType, typeCode, values))
+        if isinstance(values, array.array):
+            return numpy.frombuffer(values, values.typecode).astype(
+                dtype, copy=False) if values else numpy.zeros(0, dtype)
+        mask = [value is None for value in values]
+        data = numpy.array([null if value is None else convert(value)
+                            for value in values], dtype)
+        if any(mask):
+            return numpy.ma.masked_array(data, mask)
+        return data
+
+    def _scaleDecimal(self, value):
+        return int(decimal.Decimal(value).scaleb(
+            self.decimalScale).to_integral_value())
+
+    def _convertDatetime(self, dbType, dataType, typeCode, value):
+        # NumPy parses ISO dates and timestamps without an offset itself.
+        if util.isString(value) and not dataType.endswith("ZONE"):
+            return value
+        value = self.convertValue(dbType, dataType, typeCode, value)
+        if typeCode == Timestamp and value.tzinfo is not None:
+            value = (value - value.utcoffset()).replace(tzinfo=None)
+        return value
+
+
 class TimeZone (datetime.tzinfo):
 
     """Represents a Fixed Time Zone offset from UTC."""
 
     def __init__(self, sign, hours, minutes):
+        self.sign = sign
+        self.hours = hours
+        self.minutes = minutes
         self.offset = datetime.timedelta(hours=hours, minutes=minutes)
         if sign == "-":
             self.offset = -self.offset
 
+    def __reduce__(self):
+        # Unpickled values share the interned instance of their offset.
+        return (getTimeZone, (self.sign, self.hours, self.minutes))
+
     def utcoffset(self, dt):
         return self.offset
 
@@ -313,6 +673,22 @@ class TimeZone (datetime.tzinfo):
         return 0
 
 
+# Interned time zones keyed by (sign, hours, minutes).
+_timeZones = {}
+
+
+def getTimeZone(sign, hours, minutes):
+    """Returns the shared TimeZone instance for the given offset, result sets
+     only contain a handful of distinct offsets so one instance is created
+     per offset rather than per value. Values sharing a time zone instance
+     are also compared without calling utcoffset."""
+    key = (sign, hours, minutes)
+    timeZone = _timeZones.get(key)
+    if timeZone is None:
+        timeZone = _timeZones.setdefault(key, TimeZone(sign, hours, minutes))
+    return timeZone
+
+
 def _appendInterval(arr, value, padding=2, separator=" "):
     if value is not None:
         if arr and separator:
@@ -321,10 +697,13 @@ def _appendInterval(arr, value, padding=2, separator=" "):
         arr.append(s)
 
 
-class Interval:
+class Interval (object):
 
     """Represents a SQL date/time interval."""
 
+    __slots__ = ("negative", "years", "months", "days", "hours", "minutes",
+                 "seconds", "type")
+
     def __init__(self, negative=False, years=None, months=None, days=None,
                  hours=None, minutes=None, seconds=None):
         self.negative = negative
@@ -370,8 +749,6 @@ class Interval:
                 self.minutes = zeroIfNone(minutes)
             elif minutes is not None:
                 self.type = "HOUR TO MINUTE"
-            elif hours is not None:
-                self.type = "DAY TO HOUR"
             else:
                 self.type = "HOUR"
         elif minutes is not None:
@@ -413,18 +790,85 @@ class Interval:
             s.insert(0, "-")
         return "".join(s)
 
+    @classmethod
+    def _create(cls, values):
+        # Creates an interval from the values of all its slots.
+        interval = cls.__new__(cls)
+        interval.negative, interval.years, interval.months, interval.days, \
+            interval.hours, interval.minutes, interval.seconds, \
+            interval.type = values
+        return interval
+
+    def _fields(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
     def __repr__(self):
-        return str(self.__dict__)
+        return str(self._fields())
 
     def __eq__(self, other):
-        try:
-            return self.__dict__ == other.__dict__
-        except AttributeError:
+        if not isinstance(other, Interval):
             return False
+        return self._fields() == other._fields()
+
+    def __ne__(self, other):
+        return not self == other
+
+
+class JSONValue (object):
+
+    """A JSON document whose text is only parsed when its content is first
+     accessed, it otherwise behaves like the parsed value. str() returns
+     the original text."""
+
+    __slots__ = ("text", "_value")
+
+    def __init__(self, text):
+        self.text = text
+        self._value = _UNPARSED
+
+    @property
+    def value(self):
+        if self._value is _UNPARSED:
+            self._value = _convertJson(self.text)
+        return self._value
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.value, name)
+
+    def __getitem__(self, key):
+        return self.value[key]
+
+    def __iter__(self):
+        return iter(self.value)
+
+    def __len__(self):
+        return len(self.value)
+
+    def __contains__(self, item):
+        return item in self.value
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return "JSONValue(" + repr(self.text) + ")"
+
+    def __eq__(self, other):
+        if isinstance(other, JSONValue):
+            other = other.value
+        return self.value == other
 
     def __ne__(self, other):
         return not self == other
 
+    __hash__ = None
+
+
+# Marks a JSONValue whose text has not been parsed yet.
+_UNPARSED = object()
+
 
 class Period:
 
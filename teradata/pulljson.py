@@ -63,9 +63,12 @@ JSON_UNEXPECTED_ELEMENT_ERROR = "JSON_UNEXPECTED_ELEMENT_ERROR"
 
 class JSONPullParser (object):
 
-    def __init__(self, stream, encoding="utf8", size=2 ** 16):
-        """Initialize pull parser with a JSON stream."""
+    def __init__(self, stream, encoding="utf8", size=2 ** 16,
+                 parseInt=decimal.Decimal):
+        """Initialize pull parser with a JSON stream. Numbers are parsed as
+           decimal.Decimal, integers are parsed with parseInt instead."""
         self.stream = stream
+        self.parseInt = parseInt
         self.size = size
         self.encoding = encoding
         self.node = None
@@ -323,7 +326,10 @@ class JSONPullParser (object):
                             self.halfToken = token
                             raise IndexError
                         elif token[0].isdigit() or token[0] == '-':
-                            self.value = decimal.Decimal(token)
+                            if token.lstrip("-").isdigit():
+                                self.value = self.parseInt(token)
+                            else:
+                                self.value = decimal.Decimal(token)
                             self.valueType = NUMBER
                         elif token == "null":
                             self.value = None
@@ -356,6 +362,17 @@ class JSONPullParser (object):
                     self.halfToken = None
 
     def _load(self, event):
+        return self._decode(self._loadText(event))
+
+    def _decode(self, text):
+        try:
+            return json.loads(text, parse_float=decimal.Decimal,
+                              parse_int=self.parseInt)
+        except ValueError as e:
+            raise JSONParseError(JSON_SYNTAX_ERROR, "".join(e.args))
+
+    def _loadText(self, event):
+        # Returns the text of the object or array started by event.
         if event.type == START_OBJECT:
             value = start = "{"
             end = "}"
@@ -374,7 +391,11 @@ class JSONPullParser (object):
         try:
             while True:
                 startIndex = tokenIndex
-                for token in tokens[startIndex:]:
+                # Tokens are read by index as slicing the remaining tokens
+                # for every value is quadratic in the number of values.
+                tokenCount = len(tokens)
+                while tokenIndex < tokenCount:
+                    token = tokens[tokenIndex]
                     tokenIndex += 1
                     if token == "":
                         pass
@@ -406,11 +427,7 @@ class JSONPullParser (object):
             pass
         self.tokens = tokens
         self.tokenIndex = tokenIndex
-        try:
-            return json.loads(value, parse_float=decimal.Decimal,
-                              parse_int=decimal.Decimal)
-        except ValueError as e:
-            raise JSONParseError(JSON_SYNTAX_ERROR, "".join(e.args))
+        return value
 
     def _push(self, nodeType, value=None):
         if self.node is not None and self.node.type == FIELD:
@@ -564,3 +581,32 @@ class JSONArrayIterator (object):
 
     def next(self):
         return self.__next__()
+
+    def nextBatch(self, size):
+        """Returns a list with up to size elements of the array, elements
+           that are objects or arrays are decoded together with a single
+           json.loads call."""
+        values = []
+        texts = []
+        indexes = []
+        parser = self.parser
+        while len(values) < size and not self.complete:
+            event = parser.nextEvent()
+            if event.type == START_OBJECT or event.type == START_ARRAY:
+                indexes.append(len(values))
+                texts.append(parser._loadText(event))
+                parser._pop()
+                values.append(None)
+            elif event.type == ARRAY_VALUE:
+                values.append(event.value)
+            elif event.type == END_ARRAY:
+                self.complete = True
+            else:
+                raise JSONParseError(
+                    JSON_UNEXPECTED_ELEMENT_ERROR,
+                    "Unexpected event: " + str(event))
+        if texts:
+            for index, value in zip(
+                    indexes, parser._decode("[" + ",".join(texts) + "]")):
+                values[index] = value
+        return values
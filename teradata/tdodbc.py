@@ -24,13 +24,25 @@
 # SOFTWARE.
 
 import sys
+import array
+import codecs
 import ctypes
 import logging
 import threading
 import atexit
 import platform
 import re
+import time
 import collections
+import functools
+import heapq
+import itertools
+
+try:
+    import asyncio
+    import concurrent.futures
+except ImportError:
+    asyncio = None
 
 from . import util, datatypes
 from .api import *  # @UnusedWildImport # noqa
@@ -40,10 +52,15 @@ logger = logging.getLogger(__name__)
 # ODBC Constants
 SQL_ATTR_ODBC_VERSION, SQL_OV_ODBC2, SQL_OV_ODBC3 = 200, 2, 3
 SQL_ATTR_QUERY_TIMEOUT, SQL_ATTR_AUTOCOMMIT = 0, 102
+SQL_ATTR_CONNECTION_DEAD, SQL_CD_TRUE = 1209, 1
+SQL_ATTR_ASYNC_ENABLE, SQL_ASYNC_ENABLE_OFF, SQL_ASYNC_ENABLE_ON = 4, 0, 1
+SQL_ATTR_ROWS_FETCHED_PTR, SQL_ATTR_ROW_ARRAY_SIZE = 26, 27
+SQL_POSITION, SQL_LOCK_NO_CHANGE = 0, 0
+SQL_GETDATA_EXTENSIONS, SQL_GD_BLOCK = 81, 4
 SQL_NULL_HANDLE, SQL_HANDLE_ENV, SQL_HANDLE_DBC, SQL_HANDLE_STMT = 0, 1, 2, 3
 SQL_SUCCESS, SQL_SUCCESS_WITH_INFO = 0, 1,
 SQL_ERROR, SQL_INVALID_HANDLE = -1, -2
-SQL_NEED_DATA, SQL_NO_DATA = 99, 100
+SQL_STILL_EXECUTING, SQL_NEED_DATA, SQL_NO_DATA = 2, 99, 100
 SQL_CLOSE, SQL_UNBIND, SQL_RESET_PARAMS = 0, 2, 3
 SQL_PARAM_TYPE_UNKNOWN = 0
 SQL_PARAM_INPUT, SQL_PARAM_INPUT_OUTPUT, SQL_PARAM_OUTPUT = 1, 2, 4
@@ -51,7 +68,11 @@ SQL_ATTR_PARAM_BIND_TYPE = 18
 SQL_ATTR_PARAMS_PROCESSED_PTR, SQL_ATTR_PARAM_STATUS_PTR = 21, 20
 SQL_ATTR_PARAMSET_SIZE = 22
 SQL_PARAM_BIND_BY_COLUMN = 0
-SQL_NULL_DATA, SQL_NTS = -1, -3
+SQL_PARAM_SUCCESS, SQL_PARAM_DIAG_UNAVAILABLE = 0, 1
+SQL_PARAM_ERROR, SQL_PARAM_SUCCESS_WITH_INFO, SQL_PARAM_UNUSED = 5, 6, 7
+SQL_DIAG_ROW_NUMBER = -1248
+SQL_NULL_DATA, SQL_NTS, SQL_NO_TOTAL = -1, -3, -4
+SQL_DATA_AT_EXEC = -2
 SQL_IS_POINTER, SQL_IS_UINTEGER, SQL_IS_INTEGER = -4, -5, -6
 
 SQL_C_BINARY, SQL_BINARY, SQL_VARBINARY, SQL_LONGVARBINARY = -2, -2, -3, -4
@@ -59,10 +80,12 @@ SQL_C_WCHAR, SQL_WVARCHAR, SQL_WLONGVARCHAR = -8, -9, -10
 SQL_FLOAT = 6
 SQL_C_FLOAT = SQL_REAL = 7
 SQL_C_DOUBLE = SQL_DOUBLE = 8
+SQL_C_SBIGINT = -25
 SQL_DESC_TYPE_NAME = 14
 SQL_COMMIT, SQL_ROLLBACK = 0, 1
 
 SQL_STATE_DATA_TRUNCATED = '01004'
+SQL_STATE_OPERATION_CANCELED = 'HY008'
 SQL_STATE_CONNECTION_NOT_OPEN = '08003'
 SQL_STATE_INVALID_TRANSACTION_STATE = '25000'
 
@@ -71,6 +94,7 @@ SQLULEN = ctypes.c_size_t
 SQLUSMALLINT = ctypes.c_ushort
 SQLSMALLINT = ctypes.c_short
 SQLINTEGER = ctypes.c_int
+SQLUINTEGER = ctypes.c_uint
 SQLFLOAT = ctypes.c_float
 SQLDOUBLE = ctypes.c_double
 SQLBYTE = ctypes.c_ubyte
@@ -82,7 +106,25 @@ SQLHANDLE = ctypes.c_void_p
 ADDR = ctypes.byref
 PTR = ctypes.POINTER
 SMALL_BUFFER_SIZE = 2 ** 12
-LARGE_BUFFER_SIZE = 2 ** 20
+# Fetch buffers are sized from the result set's column sizes up to this limit,
+# larger values are read in chunks.
+MAX_FETCH_BUFFER_SIZE = 2 ** 16
+# Characters added to column sizes for signs, decimal points and terminators.
+COLUMN_SIZE_PADDING = 3
+# The limit on the size of the buffers bound for block fetches.
+MAX_ROWSET_BUFFER_SIZE = 2 ** 22
+# The data types that can be streamed using OdbcLob.
+LOB_TYPES = ("BLOB", "CLOB")
+# The Teradata request message limit that batched parameter data must fit
+# within and the estimated per parameter overhead (length and indicators).
+MAX_REQUEST_SIZE = 2 ** 20
+PARAM_OVERHEAD = 4
+# The number of closed cursor statement handles kept per connection for reuse.
+STATEMENT_POOL_SIZE = 8
+# The initial and maximum number of seconds between polls of asynchronously
+# executing statements.
+MIN_POLL_INTERVAL = 0.001
+MAX_POLL_INTERVAL = 0.05
 TRUE = 1
 FALSE = 0
 
@@ -105,8 +147,13 @@ if osType == "Darwin" or osType == "Windows":
     _inputStr = lambda s, l = None: None if s is None else \
         ctypes.create_unicode_buffer((s if util.isString(s) else str(s)), l)
     _outputStr = lambda s: s.value
+
+    def _outputStrAt(address, length):
+        return ctypes.wstring_at(address, length // MAX_CHAR_SIZE)
+
     _convertParam = lambda s: None if s is None else (
         s if util.isString(s) else str(s))
+    MAX_CHAR_SIZE = ctypes.sizeof(ctypes.c_wchar)
 else:
     # Unix/Linux
     _createBuffer = lambda l: ctypes.create_string_buffer(l)
@@ -114,13 +161,30 @@ else:
         ctypes.create_string_buffer((s if util.isString(s) else str(s)).encode(
             'utf8'), l)
     _outputStr = lambda s: unicode(s.raw.partition(b'\00')[0], 'utf8')
+
+    def _outputStrAt(address, length):
+        return unicode(ctypes.string_at(address, length), 'utf8')
+
     _convertParam = lambda s: None if s is None else (
         (s if util.isString(s) else str(s)).encode('utf8'))
     SQLWCHAR = ctypes.c_char
+    # The maximum size of a UTF-8 encoded Teradata character.
+    MAX_CHAR_SIZE = 3
 
 connections = []
 
 
+def _createDecoder():
+    """Returns a function that decodes consecutive chunks of a character
+     value read into buffers, a UTF-8 character split between two chunks is
+     carried over to the next one."""
+    if osType == "Darwin" or osType == "Windows":
+        return lambda s, final=False: s.value
+    decoder = codecs.getincrementaldecoder("utf8")()
+    return lambda s, final=False: decoder.decode(
+        s.raw.partition(b'\00')[0], final)
+
+
 def cleanupConnections():
     """Cleanup open connections."""
     if connections:
@@ -128,12 +192,14 @@ def cleanupConnections():
             "%s open connections found on exit, attempting to close...",
             len(connections))
         for conn in list(connections):
+            conn.pool = None
             conn.close()
 
 
-def getDiagnosticInfo(handle, handleType=SQL_HANDLE_STMT):
+def getDiagnosticInfo(handle, handleType=SQL_HANDLE_STMT, rowNumbers=False):
     """Gets diagnostic information associated with ODBC calls, particularly
-     when errors occur."""
+     when errors occur. If rowNumbers is True, the parameter set number each
+     record is associated with is appended to the returned information."""
     info = []
     infoNumber = 1
     sqlState = _createBuffer(6)
@@ -150,9 +216,15 @@ def getDiagnosticInfo(handle, handleType=SQL_HANDLE_STMT):
             messageBuffer = _createBuffer(messageLength.value)
             continue
         if rc == SQL_SUCCESS or rc == SQL_SUCCESS_WITH_INFO:
-            info.append(
-                (_outputStr(sqlState), _outputStr(messageBuffer),
-                 abs(nativeError.value)))
+            record = (_outputStr(sqlState), _outputStr(messageBuffer),
+                      abs(nativeError.value))
+            if rowNumbers:
+                rowNumber = SQLLEN()
+                rc = odbc.SQLGetDiagFieldW(
+                    handleType, handle, infoNumber, SQL_DIAG_ROW_NUMBER,
+                    ADDR(rowNumber), 0, None)
+                record += (rowNumber.value if rc == SQL_SUCCESS else 0, )
+            info.append(record)
             infoNumber += 1
         elif rc == SQL_NO_DATA:
             return info
@@ -222,6 +294,8 @@ def initFunctionPrototypes():
     prototype(odbc.SQLGetDiagRecW, SQLSMALLINT, SQLHANDLE, SQLSMALLINT,
               PTR(SQLWCHAR), PTR(SQLINTEGER), PTR(SQLWCHAR), SQLSMALLINT,
               PTR(SQLSMALLINT))
+    prototype(odbc.SQLGetDiagFieldW, SQLSMALLINT, SQLHANDLE, SQLSMALLINT,
+              SQLSMALLINT, SQLPOINTER, SQLSMALLINT, PTR(SQLSMALLINT))
     prototype(odbc.SQLSetEnvAttr, SQLHANDLE,
               SQLINTEGER, SQLPOINTER, SQLINTEGER)
     prototype(odbc.SQLDriverConnectW, SQLHANDLE, SQLHANDLE,
@@ -237,6 +311,8 @@ def initFunctionPrototypes():
               SQLUSMALLINT, SQLPOINTER, SQLSMALLINT, PTR(SQLSMALLINT),
               PTR(SQLLEN))
     prototype(odbc.SQLFetch, SQLHANDLE)
+    prototype(odbc.SQLBindCol, SQLHANDLE, SQLUSMALLINT, SQLSMALLINT,
+              SQLPOINTER, SQLLEN, PTR(SQLLEN))
     prototype(odbc.SQLGetData, SQLHANDLE, SQLUSMALLINT,
               SQLSMALLINT, SQLPOINTER, SQLLEN, PTR(SQLLEN))
     prototype(odbc.SQLFreeStmt, SQLHANDLE, SQLUSMALLINT)
@@ -254,15 +330,27 @@ def initFunctionPrototypes():
     prototype(odbc.SQLDisconnect, SQLHANDLE)
     prototype(odbc.SQLSetConnectAttr, SQLHANDLE,
               SQLINTEGER, SQLPOINTER, SQLINTEGER)
+    prototype(odbc.SQLGetConnectAttr, SQLHANDLE,
+              SQLINTEGER, SQLPOINTER, SQLINTEGER, PTR(SQLINTEGER))
     prototype(odbc.SQLEndTran, SQLSMALLINT, SQLHANDLE, SQLSMALLINT)
     prototype(odbc.SQLRowCount, SQLHANDLE, PTR(SQLLEN))
+    prototype(odbc.SQLParamData, SQLHANDLE, PTR(SQLPOINTER))
+    prototype(odbc.SQLPutData, SQLHANDLE, SQLPOINTER, SQLLEN)
+    prototype(odbc.SQLCancel, SQLHANDLE)
+    prototype(odbc.SQLSetPos, SQLHANDLE, SQLULEN, SQLUSMALLINT, SQLUSMALLINT)
+    prototype(odbc.SQLGetInfoW, SQLHANDLE, SQLUSMALLINT, SQLPOINTER,
+              SQLSMALLINT, PTR(SQLSMALLINT))
 
 
 def initOdbcLibrary(odbcLibPath=None):
-    """Initialize the ODBC Library."""
+    """Initialize the ODBC Library, odbcLibPath is either the path of the
+     library to load or an object implementing the ODBC functions."""
     global odbc
     if odbc is None:
-        if osType == "Windows":
+        if odbcLibPath is not None and not util.isString(odbcLibPath):
+            # An already loaded library, e.g. the tests' OdbcStub.
+            odbc = odbcLibPath
+        elif osType == "Windows":
             odbc = ctypes.windll.odbc32
         else:
             if not odbcLibPath:
@@ -276,17 +364,20 @@ def initOdbcLibrary(odbcLibPath=None):
 
 
 def initOdbcEnv():
-    """Initialize ODBC environment handle."""
+    """Initialize ODBC environment handle. The handle is only published
+     once it has been fully initialized as init doesn't lock once it is
+     set."""
     global hEnv
     if hEnv is None:
-        hEnv = SQLPOINTER()
-        rc = odbc.SQLAllocHandle(SQL_HANDLE_ENV, SQL_NULL_HANDLE, ADDR(hEnv))
-        checkStatus(rc, hEnv=hEnv)
+        env = SQLPOINTER()
+        rc = odbc.SQLAllocHandle(SQL_HANDLE_ENV, SQL_NULL_HANDLE, ADDR(env))
+        checkStatus(rc, hEnv=env)
+        # Set the ODBC environment's compatibility level to ODBC 3.0
+        rc = odbc.SQLSetEnvAttr(env, SQL_ATTR_ODBC_VERSION, SQL_OV_ODBC3, 0)
+        checkStatus(rc, hEnv=env)
         atexit.register(cleanupOdbcEnv)
         atexit.register(cleanupConnections)
-        # Set the ODBC environment's compatibility level to ODBC 3.0
-        rc = odbc.SQLSetEnvAttr(hEnv, SQL_ATTR_ODBC_VERSION, SQL_OV_ODBC3, 0)
-        checkStatus(rc, hEnv=hEnv)
+        hEnv = env
 
 
 def cleanupOdbcEnv():
@@ -296,16 +387,21 @@ def cleanupOdbcEnv():
 
 
 def init(odbcLibPath=None):
+    # The lock is only needed until the library and environment have been
+    # initialized, after that connections can be created concurrently.
+    if hEnv is not None:
+        return
     try:
         lock.acquire()
-        initOdbcLibrary(odbcLibPath)
-        initFunctionPrototypes()
-        initOdbcEnv()
+        if hEnv is None:
+            initOdbcLibrary(odbcLibPath)
+            initFunctionPrototypes()
+            initOdbcEnv()
     finally:
         lock.release()
 
 
-class OdbcConnection:
+class OdbcConnection (object):
 
     """Represents a Connection to Teradata using ODBC."""
 
@@ -317,29 +413,24 @@ class OdbcConnection:
         """Creates an ODBC connection."""
         self.hDbc = SQLPOINTER()
         self.cursorCount = 0
-        self.sessionno = 0
+        self._sessionno = None
         self.cursors = []
+        self.statements = []
         self.dbType = dbType
         self.converter = dataTypeConverter
+        self.autoCommit = util.booleanValue(autoCommit)
+        self.queryBands = u""
+        self.pool = None
+        self.created = time.time()
+        self.asyncPolling = None
+        self.executor = None
+        self.cancelCount = 0
+        self._blockGetData = None
         connections.append(self)
 
         # Build connect string
-        extraParams = set(k.lower() for k in kwargs)
-        connectParams = collections.OrderedDict()
-        if "dsn" not in extraParams:
-            connectParams["DRIVER"] = dbType
-        if system:
-            connectParams["DBCNAME"] = system
-        if username:
-            connectParams["UID"] = username
-        if password:
-            connectParams["PWD"] = password
-        if transactionMode:
-            connectParams["SESSIONMODE"] = "Teradata" \
-                if transactionMode == "TERA" else transactionMode
-        connectParams.update(kwargs)
-        connectString = u";".join(u"{}={}".format(key, value)
-                                  for key, value in connectParams.items())
+        connectString = _buildConnectString(
+            dbType, system, username, password, transactionMode, kwargs)
 
         # Initialize connection handle
         init(odbcLibPath)
@@ -349,49 +440,147 @@ class OdbcConnection:
         # Create connection
         logger.debug("Creating connection using ODBC ConnectString: %s",
                      re.sub("PWD=.*?(;|$)", "PWD=XXX;", connectString))
-        try:
-            lock.acquire()
-            rc = odbc.SQLDriverConnectW(self.hDbc, 0, _inputStr(connectString),
-                                        SQL_NTS, None, 0, None, 0)
-        finally:
-            lock.release()
+        rc = odbc.SQLDriverConnectW(self.hDbc, 0, _inputStr(connectString),
+                                    SQL_NTS, None, 0, None, 0)
         checkStatus(rc, hDbc=self.hDbc, method="SQLDriverConnectW")
 
         # Setup autocommit, query bands, etc.
         try:
             logger.debug("Setting AUTOCOMMIT to %s",
-                         "True" if util.booleanValue(autoCommit) else "False")
+                         "True" if self.autoCommit else "False")
             rc = odbc.SQLSetConnectAttr(
                 self.hDbc, SQL_ATTR_AUTOCOMMIT,
-                TRUE if util.booleanValue(autoCommit) else FALSE, 0)
+                TRUE if self.autoCommit else FALSE, 0)
             checkStatus(
                 rc, hDbc=self.hDbc,
                 method="SQLSetConnectAttr - SQL_ATTR_AUTOCOMMIT")
             if dbType == "Teradata":
+                self._setupSession(queryBands)
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def sessionno(self):
+        """The session number, it is only requested from the database when it
+         is first needed."""
+        if self._sessionno is None and self.hDbc:
+            self._sessionno = 0
+            if self.dbType == "Teradata":
                 with self.cursor() as c:
-                    self.sessionno = c.execute(
+                    self._sessionno = c.execute(
                         "SELECT SESSION",
                         queryTimeout=QUERY_TIMEOUT).fetchone()[0]
-                    logger.debug("SELECT SESSION returned %s", self.sessionno)
-                    if queryBands:
-                        c.execute(u"SET QUERY_BAND = '{};' FOR SESSION".format(
-                            u";".join(u"{}={}".format(util.toUnicode(k),
-                                                      util.toUnicode(v))
-                                      for k, v in queryBands.items())),
-                                  queryTimeout=QUERY_TIMEOUT)
+                logger.debug("SELECT SESSION returned %s", self._sessionno)
+        return self._sessionno
+
+    def _setupSession(self, queryBands):
+        """Sets the query bands and, if it will be logged, gets the session
+         number using a single multi-statement request."""
+        queries = []
+        queryBandString = _queryBandString(queryBands)
+        if queryBandString:
+            queries.append(_setQueryBandSql(queryBandString))
+        fetchSession = logger.isEnabledFor(logging.DEBUG)
+        if fetchSession:
+            queries.append(u"SELECT SESSION")
+        if queries:
+            with self.cursor() as c:
+                try:
+                    c.execute(u";".join(queries), queryTimeout=QUERY_TIMEOUT)
+                except DatabaseError as e:
+                    if len(queries) == 1:
+                        raise
+                    logger.debug("Submitting session setup statements "
+                                 "individually: %s", e.msg)
+                    for query in queries:
+                        c.execute(query, queryTimeout=QUERY_TIMEOUT)
+                self.queryBands = queryBandString
+                if fetchSession:
+                    while c.description is None and c.nextset():
+                        pass
+                    self._sessionno = c.fetchone()[0]
+            if not self.autoCommit:
                 self.commit()
-                logger.debug("Created session %s.", self.sessionno)
-        except Exception:
-            self.close()
-            raise
+        if fetchSession:
+            logger.debug("Created session %s.", self._sessionno)
+
+    def setQueryBands(self, queryBands):
+        """Sets the session's query bands, nothing is submitted if they are
+         the same as the query bands that are already set."""
+        if self.dbType == "Teradata" and \
+                _queryBandString(queryBands) != self.queryBands:
+            with self.cursor() as c:
+                self._setQueryBands(c, queryBands)
+            if not self.autoCommit:
+                self.commit()
+
+    def _setQueryBands(self, cursor, queryBands):
+        queryBandString = _queryBandString(queryBands)
+        if queryBandString != self.queryBands:
+            cursor.execute(_setQueryBandSql(queryBandString),
+                           queryTimeout=QUERY_TIMEOUT)
+            self.queryBands = queryBandString
+
+    def isAlive(self):
+        """Returns False if the driver reports that the session was lost."""
+        if not self.hDbc:
+            return False
+        dead = SQLINTEGER()
+        rc = odbc.SQLGetConnectAttr(
+            self.hDbc, SQL_ATTR_CONNECTION_DEAD, ADDR(dead), 0, None)
+        try:
+            checkStatus(rc, hDbc=self.hDbc,
+                        method="SQLGetConnectAttr - SQL_ATTR_CONNECTION_DEAD")
+        except DatabaseError:
+            return False
+        return dead.value != SQL_CD_TRUE
+
+    def supportsBlockGetData(self):
+        """Returns True if the driver can read values of the rows of a
+         rowset with SQLGetData (SQL_GD_BLOCK), it is only asked once."""
+        if self._blockGetData is None:
+            extensions = SQLUINTEGER()
+            rc = odbc.SQLGetInfoW(
+                self.hDbc, SQL_GETDATA_EXTENSIONS, ADDR(extensions),
+                ctypes.sizeof(extensions), None)
+            try:
+                checkStatus(rc, hDbc=self.hDbc,
+                            method="SQLGetInfoW - SQL_GETDATA_EXTENSIONS")
+                self._blockGetData = bool(extensions.value & SQL_GD_BLOCK)
+            except DatabaseError:
+                self._blockGetData = False
+        return self._blockGetData
 
     def close(self):
-        """CLoses an ODBC Connection."""
+        """CLoses an ODBC Connection, pooled connections are returned to
+         their pool."""
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            self._disconnect()
+
+    def _runAsync(self, loop, func, *args, **kwargs):
+        """Runs a blocking function on the connection's worker thread and
+         returns an awaitable for its result."""
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(1)
+        return loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs))
+
+    def _disconnect(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
         if self.hDbc:
-            if self.sessionno:
-                logger.debug("Closing session %s...", self.sessionno)
+            if self._sessionno:
+                logger.debug("Closing session %s...", self._sessionno)
             for cursor in list(self.cursors):
                 cursor.close()
+            while self.statements:
+                hStmt = self.statements.pop()
+                rc = odbc.SQLFreeHandle(SQL_HANDLE_STMT, hStmt)
+                checkStatus(rc, hStmt=hStmt, method="SQLFreeHandle")
             rc = odbc.SQLDisconnect(self.hDbc)
             sqlState = checkStatus(
                 rc, hDbc=self.hDbc, method="SQLDisconnect",
@@ -399,7 +588,7 @@ class OdbcConnection:
                         SQL_STATE_INVALID_TRANSACTION_STATE])
             if SQL_STATE_INVALID_TRANSACTION_STATE in sqlState:
                 logger.warning("Rolling back open transaction for session %s "
-                               "so it can be closed.", self.sessionno)
+                               "so it can be closed.", self._sessionno)
                 rc = odbc.SQLEndTran(SQL_HANDLE_DBC, self.hDbc, SQL_ROLLBACK)
                 checkStatus(
                     rc, hDbc=self.hDbc,
@@ -411,8 +600,8 @@ class OdbcConnection:
                 checkStatus(rc, hDbc=self.hDbc, method="SQLFreeHandle")
             connections.remove(self)
             self.hDbc = None
-            if self.sessionno:
-                logger.debug("Session %s closed.", self.sessionno)
+            if self._sessionno:
+                logger.debug("Session %s closed.", self._sessionno)
 
     def commit(self):
         """Commits a transaction."""
@@ -433,6 +622,40 @@ class OdbcConnection:
         self.cursorCount += 1
         return cursor
 
+    def _allocStatement(self):
+        """Returns a statement handle, reusing a pooled one if available."""
+        try:
+            hStmt = self.statements.pop()
+            logger.trace("Reusing statement handle for session %s.",
+                         self._sessionno)
+        except IndexError:
+            hStmt = SQLPOINTER()
+            rc = odbc.SQLAllocHandle(SQL_HANDLE_STMT, self.hDbc, ADDR(hStmt))
+            checkStatus(rc, hDbc=self.hDbc, method="SQLAllocHandle")
+        return hStmt
+
+    def _releaseStatement(self, hStmt):
+        """Resets and returns a statement handle to the pool or frees it if
+         the pool is full."""
+        if self.hDbc and len(self.statements) < STATEMENT_POOL_SIZE:
+            try:
+                rc = odbc.SQLFreeStmt(hStmt, SQL_CLOSE)
+                checkStatus(rc, hStmt=hStmt, method="SQLFreeStmt - SQL_CLOSE")
+                rc = odbc.SQLFreeStmt(hStmt, SQL_RESET_PARAMS)
+                checkStatus(
+                    rc, hStmt=hStmt, method="SQLFreeStmt - SQL_RESET_PARAMS")
+                rc = odbc.SQLFreeStmt(hStmt, SQL_UNBIND)
+                checkStatus(rc, hStmt=hStmt, method="SQLFreeStmt - SQL_UNBIND")
+                rc = odbc.SQLSetStmtAttr(hStmt, SQL_ATTR_PARAMSET_SIZE, 1, 0)
+                checkStatus(rc, hStmt=hStmt, method="SQLSetStmtAttr")
+                self.statements.append(hStmt)
+                return
+            except DatabaseError as e:
+                logger.debug("Unable to reset statement handle, freeing "
+                             "it instead: %s", e.msg)
+        rc = odbc.SQLFreeHandle(SQL_HANDLE_STMT, hStmt)
+        checkStatus(rc, hStmt=hStmt, method="SQLFreeHandle")
+
     def __del__(self):
         self.close()
 
@@ -443,11 +666,340 @@ class OdbcConnection:
         self.close()
 
     def __repr__(self):
-        return "OdbcConnection(sessionno={})".format(self.sessionno)
+        return "OdbcConnection(sessionno={})".format(self._sessionno)
 
 connect = OdbcConnection
 
 
+def _buildConnectString(dbType, system, username, password, transactionMode,
+                        kwargs):
+    extraParams = set(k.lower() for k in kwargs)
+    connectParams = collections.OrderedDict()
+    if "dsn" not in extraParams:
+        connectParams["DRIVER"] = dbType
+    if system:
+        connectParams["DBCNAME"] = system
+    if username:
+        connectParams["UID"] = username
+    if password:
+        connectParams["PWD"] = password
+    if transactionMode:
+        connectParams["SESSIONMODE"] = "Teradata" \
+            if transactionMode == "TERA" else transactionMode
+    connectParams.update(kwargs)
+    return u";".join(u"{}={}".format(key, value)
+                     for key, value in connectParams.items())
+
+
+def _setQueryBandSql(queryBandString):
+    return u"SET QUERY_BAND = {} FOR SESSION".format(
+        u"'{}'".format(queryBandString) if queryBandString else u"NONE")
+
+
+def _queryBandString(queryBands):
+    if not queryBands:
+        return u""
+    return u"{};".format(u";".join(
+        u"{}={}".format(util.toUnicode(k), util.toUnicode(v))
+        for k, v in queryBands.items()))
+
+
+class OdbcConnectionPool:
+
+    """A pool of ODBC sessions keyed by connect string. Sessions are checked
+     for liveness when checked out and rolled back when returned, query bands
+     are only set again when they differ from those of the pooled session."""
+
+    def __init__(self, maxSize=10, maxIdle=600, maxLifetime=3600,
+                 timeout=None, validationQuery=None):
+        """Creates a pool that holds at most maxSize sessions for each connect
+         string.  Idle sessions are disconnected after maxIdle seconds and all
+         sessions are disconnected once they are older than maxLifetime
+         seconds (None to disable either).  Checkouts wait at most timeout
+         seconds for a session when the pool is exhausted."""
+        self.maxSize = maxSize
+        self.maxIdle = maxIdle
+        self.maxLifetime = maxLifetime
+        self.timeout = timeout
+        self.validationQuery = validationQuery
+        self.idle = {}
+        self.sizes = collections.defaultdict(int)
+        self.keys = {}
+        self.condition = threading.Condition()
+        self.checkouts = 0
+        self.waits = 0
+        self.waitTime = 0.0
+        self.maxWaitTime = 0.0
+        self.created = 0
+        self.evicted = 0
+
+    def connect(self, dbType="Teradata", system=None, username=None,
+                password=None, autoCommit=False, transactionMode=None,
+                queryBands=None, odbcLibPath=None,
+                dataTypeConverter=datatypes.DefaultDataTypeConverter(),
+                **kwargs):
+        """Checks out a session from the pool, creating one if no idle
+         session is available.  Accepts the same arguments as connect."""
+        key = (_buildConnectString(dbType, system, username, password,
+                                   transactionMode, kwargs),
+               util.booleanValue(autoCommit))
+        while True:
+            conn = self._checkout(key)
+            if conn is None:
+                try:
+                    conn = OdbcConnection(
+                        dbType=dbType, system=system, username=username,
+                        password=password, autoCommit=autoCommit,
+                        transactionMode=transactionMode,
+                        queryBands=queryBands, odbcLibPath=odbcLibPath,
+                        dataTypeConverter=dataTypeConverter, **kwargs)
+                except Exception:
+                    self._discard(key)
+                    raise
+                with self.condition:
+                    self.created += 1
+                    self.keys[id(conn)] = key
+                conn.pool = self
+                return PooledConnection(self, conn)
+            try:
+                if self._validate(conn):
+                    conn.converter = dataTypeConverter
+                    conn.setQueryBands(queryBands)
+                    conn.pool = self
+                    return PooledConnection(self, conn)
+            except Exception as e:
+                logger.debug("Unable to reuse session %s: %s",
+                             conn._sessionno, e)
+            self._disconnect(conn)
+
+    def warmup(self, count, parallelism=None, **kwargs):
+        """Checks out count sessions (at most maxSize) concurrently using up
+         to parallelism threads so that they are idle in the pool.  Accepts
+         the same arguments as connect and returns the number of sessions
+         that were checked out."""
+        count = min(count, self.maxSize)
+        parallelism = min(parallelism or count, count)
+        remaining = [count]
+        conns = []
+        errors = []
+
+        def logon():
+            while True:
+                with self.condition:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                try:
+                    conn = self.connect(**kwargs)
+                except Exception as e:
+                    errors.append(e)
+                    return
+                conns.append(conn)
+
+        start = time.time()
+        threads = [threading.Thread(target=logon)
+                   for i in range(0, parallelism)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.time() - start
+        for conn in conns:
+            conn.close()
+        logger.info("Opened %s sessions using %s threads in %.3f seconds "
+                    "(%.2f logons/second).", len(conns), parallelism,
+                    duration, len(conns) / duration if duration else 0)
+        if errors and not conns:
+            raise errors[0]
+        for e in errors:
+            logger.warning("Unable to open session during warm up: %s", e)
+        return len(conns)
+
+    def release(self, conn):
+        """Rolls back and returns a session to the pool, sessions that can't
+         be reset or that have exceeded their lifetime are disconnected.
+         Checkouts release their session when they are closed."""
+        with self.condition:
+            key = self.keys.get(id(conn))
+            if conn.pool is not self or key is None:
+                return
+            conn.pool = None
+        try:
+            for cursor in list(conn.cursors):
+                cursor.close()
+            if not conn.autoCommit:
+                conn.rollback()
+        except Exception as e:
+            logger.debug("Unable to reset session %s: %s", conn._sessionno, e)
+            self._disconnect(conn)
+            return
+        if self._expired(conn, time.time()):
+            self._disconnect(conn)
+            return
+        conn.lastUsed = time.time()
+        with self.condition:
+            self.idle.setdefault(key, collections.deque()).append(conn)
+            self.condition.notify()
+        logger.debug("Returned session %s to the pool.", conn._sessionno)
+
+    def close(self):
+        """Disconnects all idle sessions in the pool."""
+        with self.condition:
+            conns = [conn for idle in self.idle.values() for conn in idle]
+            self.idle.clear()
+        for conn in conns:
+            self._disconnect(conn)
+
+    def stats(self):
+        """Returns the pool's size and wait time statistics."""
+        with self.condition:
+            idle = sum(len(conns) for conns in self.idle.values())
+            size = sum(self.sizes.values())
+            return {"size": size, "idle": idle, "inUse": size - idle,
+                    "checkouts": self.checkouts, "created": self.created,
+                    "evicted": self.evicted, "waits": self.waits,
+                    "waitTime": self.waitTime,
+                    "maxWaitTime": self.maxWaitTime}
+
+    def _checkout(self, key):
+        """Returns an idle session or None if a new session should be
+         created, waits if the pool is exhausted."""
+        start = time.time()
+        conn = error = None
+        waited = False
+        with self.condition:
+            expired = self._evict(start)
+            while not self.idle.get(key) and self.sizes[key] >= self.maxSize:
+                remaining = None
+                if self.timeout is not None:
+                    remaining = self.timeout - (time.time() - start)
+                    if remaining <= 0:
+                        error = InterfaceError(
+                            POOL_TIMEOUT, "Timed out after {} seconds waiting "
+                            "for a pooled session.".format(self.timeout))
+                        break
+                waited = True
+                self.condition.wait(remaining)
+            if error is None:
+                if self.idle.get(key):
+                    conn = self.idle[key].pop()
+                else:
+                    self.sizes[key] += 1
+                self.checkouts += 1
+            duration = time.time() - start
+            if waited:
+                self.waits += 1
+                self.waitTime += duration
+                self.maxWaitTime = max(self.maxWaitTime, duration)
+            logger.debug(
+                "Pool checkout waited %.3f seconds (size=%s, idle=%s).",
+                duration, self.sizes[key], len(self.idle.get(key, ())))
+        # Expired sessions are disconnected outside of the lock.
+        for expiredConn in expired:
+            expiredConn.pool = None
+            expiredConn.close()
+        if error is not None:
+            raise error
+        return conn
+
+    def _evict(self, now):
+        """Removes expired idle sessions from the pool and returns them."""
+        expired = []
+        for key, conns in self.idle.items():
+            for conn in list(conns):
+                if self._expired(conn, now) or (
+                        self.maxIdle is not None and
+                        now - conn.lastUsed > self.maxIdle):
+                    conns.remove(conn)
+                    self.sizes[key] -= 1
+                    del self.keys[id(conn)]
+                    self.evicted += 1
+                    expired.append(conn)
+        if expired:
+            logger.debug("Evicting %s expired sessions from the pool.",
+                         len(expired))
+            self.condition.notify_all()
+        return expired
+
+    def _expired(self, conn, now):
+        return self.maxLifetime is not None and \
+            now - conn.created > self.maxLifetime
+
+    def _validate(self, conn):
+        if not conn.isAlive():
+            return False
+        if self.validationQuery:
+            with conn.cursor() as c:
+                c.execute(self.validationQuery, queryTimeout=QUERY_TIMEOUT)
+        return True
+
+    def _discard(self, key):
+        with self.condition:
+            self.sizes[key] -= 1
+            self.condition.notify()
+
+    def _disconnect(self, conn):
+        with self.condition:
+            key = self.keys.pop(id(conn), None)
+        if key is not None:
+            self._discard(key)
+        conn.pool = None
+        try:
+            conn.close()
+        except Exception as e:
+            logger.debug("Unable to disconnect session %s: %s",
+                         conn._sessionno, e)
+
+
+class PooledConnection (object):
+
+    """A checkout of a pooled session that behaves like the OdbcConnection.
+     Closing it returns the session to the pool, after that closing it again
+     does nothing and other uses raise InterfaceError, so a stale checkout
+     never affects the session once it is checked out again."""
+
+    def __init__(self, pool, conn):
+        super(PooledConnection, self).__setattr__("_pool", pool)
+        super(PooledConnection, self).__setattr__("_conn", conn)
+
+    @property
+    def connection(self):
+        """The checked out session, InterfaceError is raised if the checkout
+         was closed."""
+        conn = self._conn
+        if conn is None:
+            raise InterfaceError(
+                "CONNECTION_CLOSED", "The pooled connection was closed.")
+        return conn
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.connection, name, value)
+
+    def close(self):
+        """Returns the session to the pool, only the first call has an
+         effect."""
+        with self._pool.condition:
+            conn = self._conn
+            super(PooledConnection, self).__setattr__("_conn", None)
+        if conn is not None:
+            self._pool.release(conn)
+
+    def __del__(self):
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, t, value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return "PooledConnection({!r})".format(self._conn)
+
+
 class OdbcCursor (util.Cursor):
 
     """Represents an ODBC Cursor."""
@@ -456,14 +1008,15 @@ class OdbcCursor (util.Cursor):
         util.Cursor.__init__(self, connection, dbType, converter)
         self.num = num
         self.moreResults = None
+        self.streamLobs = False
+        self.fetchNumber = 0
+        # Set while the statement watchdog has a deadline for the cursor.
+        self.watched = False
         if num > 0:
             logger.debug(
                 "Creating cursor %s for session %s.", self.num,
-                self.connection.sessionno)
-        self.hStmt = SQLPOINTER()
-        rc = odbc.SQLAllocHandle(
-            SQL_HANDLE_STMT, connection.hDbc, ADDR(self.hStmt))
-        checkStatus(rc, hStmt=self.hStmt)
+                self.connection._sessionno)
+        self.hStmt = connection._allocStatement()
         connection.cursors.append(self)
 
     def callproc(self, procname, params, queryTimeout=0):
@@ -479,14 +1032,16 @@ class OdbcCursor (util.Cursor):
 
     def close(self):
         if self.hStmt:
+            self._stopPrefetch()
             if self.num > 0:
                 logger.debug(
                     "Closing cursor %s for session %s.", self.num,
-                    self.connection.sessionno)
-            rc = odbc.SQLFreeHandle(SQL_HANDLE_STMT, self.hStmt)
-            checkStatus(rc, hStmt=self.hStmt)
+                    self.connection._sessionno)
+            watchdog.unwatch(self)
+            self.connection._releaseStatement(self.hStmt)
             self.connection.cursors.remove(self)
             self.hStmt = None
+            self.iterator = None
 
     def _setQueryTimeout(self, queryTimeout):
         rc = odbc.SQLSetStmtAttr(
@@ -496,24 +1051,157 @@ class OdbcCursor (util.Cursor):
             rc, hStmt=self.hStmt,
             method="SQLSetStmtStmtAttr - SQL_ATTR_QUERY_TIMEOUT")
 
-    def execute(self, query, params=None, queryTimeout=0):
+    def cancel(self):
+        """Cancels the statement that is executing or being fetched, can be
+         called from another thread."""
+        hStmt = self.hStmt
+        if hStmt:
+            logger.info("Cancelling statement on session %s.",
+                        self.connection._sessionno)
+            rc = odbc.SQLCancel(hStmt)
+            checkStatus(rc, hStmt=hStmt, method="SQLCancel")
+            self.connection.cancelCount += 1
+
+    def execute(self, query, params=None, queryTimeout=0, streamLobs=False,
+                cancelTimeout=None, prefetch=0):
+        """Executes a query. If cancelTimeout is given, the statement is
+         cancelled if it has not been executed and fetched within that many
+         seconds. If prefetch is given, up to that many batches of arraysize
+         rows are fetched ahead on a background thread."""
+        self._stopPrefetch()
         if params:
-            self.executemany(query, [params, ], queryTimeout)
+            self.executemany(query, [params, ], queryTimeout=queryTimeout,
+                             streamLobs=streamLobs,
+                             cancelTimeout=cancelTimeout)
         else:
-            if self.connection.sessionno:
+            if self.connection._sessionno:
                 logger.debug(
                     "Executing query on session %s using SQLExecDirectW: %s",
-                    self.connection.sessionno, query)
+                    self.connection._sessionno, query)
             self._free()
+            self._watch(cancelTimeout)
             self._setQueryTimeout(queryTimeout)
             rc = odbc.SQLExecDirectW(
                 self.hStmt, _inputStr(_convertLineFeeds(query)), SQL_NTS)
             checkStatus(rc, hStmt=self.hStmt, method="SQLExecDirectW")
+        self.streamLobs = streamLobs
+        self.prefetch = prefetch
         self._handleResults()
         return self
 
-    def executemany(self, query, params, batch=False, queryTimeout=0):
+    def executeAsync(self, query, params=None, queryTimeout=0, loop=None,
+                     **kwargs):
+        """Executes a query without blocking the event loop and returns an
+         awaitable that resolves to the cursor. Queries without parameters
+         are polled using SQL_ATTR_ASYNC_ENABLE if the driver supports it,
+         otherwise the query is executed on the connection's worker
+         thread."""
+        loop = _getEventLoop(loop)
+        if params or kwargs or self.connection.asyncPolling is False or \
+                not self._setAsyncEnable(True):
+            future = self.connection._runAsync(
+                loop, self.execute, query, params, queryTimeout=queryTimeout,
+                **kwargs)
+            future.add_done_callback(self._cancelIfCancelled)
+            return future
+        future = loop.create_future()
+        future.add_done_callback(self._cancelIfCancelled)
+        try:
+            self._stopPrefetch()
+            self.prefetch = 0
+            self._free()
+            self._setQueryTimeout(queryTimeout)
+        except Exception as e:
+            self._setAsyncEnable(False)
+            future.set_exception(e)
+            return future
+        logger.debug("Executing query on session %s using asynchronous "
+                     "SQLExecDirectW: %s", self.connection._sessionno, query)
+        queryBuf = _inputStr(_convertLineFeeds(query))
+        interval = [MIN_POLL_INTERVAL]
+
+        def poll():
+            # A cancelled statement is still polled until the driver returns
+            # its result so that the handle leaves the asynchronous state.
+            try:
+                rc = odbc.SQLExecDirectW(self.hStmt, queryBuf, SQL_NTS)
+                if rc == SQL_STILL_EXECUTING:
+                    loop.call_later(interval[0], poll)
+                    interval[0] = min(interval[0] * 2, MAX_POLL_INTERVAL)
+                    return
+                self._setAsyncEnable(False)
+                checkStatus(rc, hStmt=self.hStmt, method="SQLExecDirectW")
+                self.streamLobs = False
+                self._handleResults()
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+                return
+            if not future.cancelled():
+                future.set_result(self)
+        poll()
+        return future
+
+    def _cancelIfCancelled(self, future):
+        """Cancels the statement if the awaitable executing it was cancelled
+         so it doesn't keep running on the database."""
+        if future.cancelled():
+            try:
+                self.cancel()
+            except Exception as e:
+                logger.warning("Unable to cancel statement: %s", e)
+
+    def fetchoneAsync(self, loop=None):
+        """Returns an awaitable for the next row, fetched on the connection's
+         worker thread."""
+        return self.connection._runAsync(_getEventLoop(loop), self.fetchone)
+
+    def fetchmanyAsync(self, size=None, loop=None):
+        """Returns an awaitable for the next set of rows, fetched on the
+         connection's worker thread."""
+        return self.connection._runAsync(
+            _getEventLoop(loop), self.fetchmany, size)
+
+    def fetchallAsync(self, loop=None):
+        """Returns an awaitable for the remaining rows, fetched on the
+         connection's worker thread."""
+        return self.connection._runAsync(_getEventLoop(loop), self.fetchall)
+
+    def _setAsyncEnable(self, enable):
+        """Turns asynchronous execution on or off for the statement, returns
+         False if the driver does not support it."""
+        rc = odbc.SQLSetStmtAttr(
+            self.hStmt, SQL_ATTR_ASYNC_ENABLE,
+            SQL_ASYNC_ENABLE_ON if enable else SQL_ASYNC_ENABLE_OFF, 0)
+        try:
+            checkStatus(rc, hStmt=self.hStmt,
+                        method="SQLSetStmtAttr - SQL_ATTR_ASYNC_ENABLE")
+        except DatabaseError as e:
+            if not enable:
+                raise
+            logger.debug("Asynchronous execution is not supported, using a "
+                         "worker thread instead: %s", e.msg)
+            self.connection.asyncPolling = False
+            return False
+        self.connection.asyncPolling = True
+        return True
+
+    def executemany(self, query, params, batch=False, queryTimeout=0,
+                    maxRequestSize=MAX_REQUEST_SIZE, batchSize=None,
+                    progressCallback=None, streamLobs=False,
+                    cancelTimeout=None):
+        """Executes a query for each parameter set. If batch is True, the
+         parameter sets are sent in chunks of up to batchSize sets that fit
+         within maxRequestSize bytes. Failures of individual parameter sets
+         are raised as a BatchError once all chunks have been executed. If a
+         chunk fails as a whole, its error is raised straight away and the
+         chunks before it have already been executed, progressCallback is
+         called with the number of parameter sets executed after each
+         chunk."""
+        self._stopPrefetch()
+        self.prefetch = 0
         self._free()
+        self._watch(cancelTimeout)
         # Prepare the query
         rc = odbc.SQLPrepareW(
             self.hStmt, _inputStr(_convertLineFeeds(query)), SQL_NTS)
@@ -526,6 +1214,7 @@ class OdbcCursor (util.Cursor):
         numParams = numParams.value
         # The argument types.
         dataTypes = []
+        paramSizes = []
         for paramNum in range(0, numParams):
             dataType = SQLSMALLINT()
             parameterSize = SQLULEN()
@@ -536,18 +1225,24 @@ class OdbcCursor (util.Cursor):
                 ADDR(decimalDigits), ADDR(nullable))
             checkStatus(rc, hStmt=self.hStmt, method="SQLDescribeParams")
             dataTypes.append(dataType.value)
+            paramSizes.append(parameterSize.value)
+        rowCount = None
         if batch:
             logger.debug(
                 "Executing query on session %s using batched SQLExecute: %s",
-                self.connection.sessionno, query)
-            self._executeManyBatch(params, numParams, dataTypes)
+                self.connection._sessionno, query)
+            rowCount = self._executeManyBatch(
+                params, numParams, dataTypes,
+                maxRequestSize - len(query) * MAX_CHAR_SIZE, batchSize,
+                progressCallback)
         else:
             logger.debug(
                 "Executing query on session %s using SQLExecute: %s",
-                self.connection.sessionno, query)
+                self.connection._sessionno, query)
             rc = odbc.SQLSetStmtAttr(self.hStmt, SQL_ATTR_PARAMSET_SIZE, 1, 0)
             checkStatus(rc, hStmt=self.hStmt, method="SQLSetStmtAttr")
             paramSetNum = 0
+            totalRowCount = 0
             for p in params:
                 paramSetNum += 1
                 logger.trace("ParamSet %s: %s", paramSetNum, p)
@@ -558,31 +1253,42 @@ class OdbcCursor (util.Cursor):
                         "parameters ({}).".format(len(p), numParams))
                 paramArray = []
                 lengthArray = []
+                streams = {}
                 for paramNum in range(0, numParams):
                     val = p[paramNum]
                     inputOutputType = _getInputOutputType(val)
                     valueType, paramType = _getParamValueType(
                         dataTypes[paramNum])
-                    param, length = _getParamValue(val, valueType, False)
-                    paramArray.append(param)
-                    if param is not None:
-                        if valueType == SQL_C_BINARY:
-                            bufSize = SQLLEN(length)
-                            lengthArray.append(SQLLEN(length))
-                            columnSize = SQLULEN(length)
-                        elif valueType == SQL_C_DOUBLE:
-                            bufSize = SQLLEN(length)
-                            lengthArray.append(SQLLEN(length))
-                            columnSize = SQLULEN(length)
-                            param = ADDR(param)
-                        else:
-                            bufSize = SQLLEN(ctypes.sizeof(param))
-                            lengthArray.append(SQLLEN(SQL_NTS))
-                            columnSize = SQLULEN(length)
-                    else:
+                    if _isStream(val):
+                        # Bind as a data-at-execution parameter, the
+                        # parameter number is passed back by SQLParamData.
+                        param = SQLPOINTER(paramNum + 1)
+                        paramArray.append(param)
+                        streams[paramNum + 1] = (val, valueType)
                         bufSize = SQLLEN(0)
-                        columnSize = SQLULEN(0)
-                        lengthArray.append(SQLLEN(SQL_NULL_DATA))
+                        columnSize = SQLULEN(paramSizes[paramNum])
+                        lengthArray.append(SQLLEN(SQL_DATA_AT_EXEC))
+                    else:
+                        param, length = _getParamValue(val, valueType, False)
+                        paramArray.append(param)
+                        if param is not None:
+                            if valueType == SQL_C_BINARY:
+                                bufSize = SQLLEN(length)
+                                lengthArray.append(SQLLEN(length))
+                                columnSize = SQLULEN(length)
+                            elif valueType == SQL_C_DOUBLE:
+                                bufSize = SQLLEN(length)
+                                lengthArray.append(SQLLEN(length))
+                                columnSize = SQLULEN(length)
+                                param = ADDR(param)
+                            else:
+                                bufSize = SQLLEN(ctypes.sizeof(param))
+                                lengthArray.append(SQLLEN(SQL_NTS))
+                                columnSize = SQLULEN(length)
+                        else:
+                            bufSize = SQLLEN(0)
+                            columnSize = SQLULEN(0)
+                            lengthArray.append(SQLLEN(SQL_NULL_DATA))
                     logger.trace("Binding parameter %s...", paramNum + 1)
                     rc = odbc.SQLBindParameter(
                         self.hStmt, paramNum + 1, inputOutputType, valueType,
@@ -592,40 +1298,47 @@ class OdbcCursor (util.Cursor):
                         rc, hStmt=self.hStmt, method="SQLBindParameter")
                 logger.debug("Executing prepared statement.")
                 rc = odbc.SQLExecute(self.hStmt)
+                if rc == SQL_NEED_DATA:
+                    rc = self._putStreams(streams)
                 for paramNum in range(0, numParams):
                     val = p[paramNum]
                     if isinstance(val, OutParam):
                         val.size = lengthArray[paramNum].value
                 checkStatus(rc, hStmt=self.hStmt, method="SQLExecute")
+                if progressCallback is not None:
+                    count = SQLLEN()
+                    rc = odbc.SQLRowCount(self.hStmt, ADDR(count))
+                    checkStatus(rc, hStmt=self.hStmt, method="SQLRowCount")
+                    totalRowCount += max(count.value, 0)
+                    if paramSetNum % (batchSize or 1) == 0:
+                        progressCallback(paramSetNum, totalRowCount)
+            if progressCallback is not None and \
+                    paramSetNum % (batchSize or 1) != 0:
+                progressCallback(paramSetNum, totalRowCount)
+        self.streamLobs = streamLobs
         self._handleResults()
+        if rowCount is not None:
+            self.rowcount = rowCount
         return self
 
-    def _executeManyBatch(self, params, numParams, dataTypes):
-        # Get the number of parameter sets.
-        paramSetSize = len(params)
+    def _executeManyBatch(self, params, numParams, dataTypes, maxChunkSize,
+                          batchSize=None, progressCallback=None):
         # Set the SQL_ATTR_PARAM_BIND_TYPE statement attribute to use
         # column-wise binding.
         rc = odbc.SQLSetStmtAttr(
             self.hStmt, SQL_ATTR_PARAM_BIND_TYPE, SQL_PARAM_BIND_BY_COLUMN, 0)
         checkStatus(rc, hStmt=self.hStmt, method="SQLSetStmtAttr")
-        # Specify the number of elements in each parameter array.
-        rc = odbc.SQLSetStmtAttr(
-            self.hStmt, SQL_ATTR_PARAMSET_SIZE, paramSetSize, 0)
-        checkStatus(rc, hStmt=self.hStmt, method="SQLSetStmtAttr")
-        # Specify a PTR to get the number of parameters processed.
-        # paramsProcessed = SQLULEN()
-        # rc = odbc.SQLSetStmtAttr(self.hStmt, SQL_ATTR_PARAMS_PROCESSED_PTR,
-        #                          ADDR(paramsProcessed), SQL_IS_POINTER)
-        # checkStatus(rc, hStmt=self.hStmt, method="SQLSetStmtAttr")
-        # Specify a PTR to get the status of the parameters processed.
-        # paramsStatus = (SQLUSMALLINT * paramSetSize)()
-        # rc = odbc.SQLSetStmtAttr(self.hStmt, SQL_ATTR_PARAM_STATUS_PTR,
-        #                          ADDR(paramsStatus), SQL_IS_POINTER)
-        # checkStatus(rc, hStmt=self.hStmt, method="SQLSetStmtAttr")
-        # Bind the parameters.
-        paramArrays = []
-        lengthArrays = []
-        paramSetSize = len(params)
+        valueTypes = [_getParamValueType(dataType) for dataType in dataTypes]
+        # Split the parameter sets into chunks that fit within the request
+        # size limit (and batchSize if specified), failures of individual
+        # parameter sets are collected and reported once all chunks have been
+        # executed. Only the current chunk is held in memory so params can be
+        # any iterable.
+        failures = []
+        rowCount = 0
+        chunk = []
+        chunkSize = 0
+        chunkOffset = 0
         paramSetNum = 0
         for p in params:
             paramSetNum += 1
@@ -635,63 +1348,176 @@ class OdbcCursor (util.Cursor):
                     "PARAMS_MISMATCH", "The number of supplied parameters "
                     "({}) does not match the expected number of parameters "
                     "({}).".format(len(p), numParams))
-        for paramNum in range(0, numParams):
-            p = []
-            valueType, paramType = _getParamValueType(dataTypes[paramNum])
-            maxLen = 0
-            for paramSetNum in range(0, paramSetSize):
-                param, length = _getParamValue(
-                    params[paramSetNum][paramNum], valueType, True)
-                if length > maxLen:
-                    maxLen = length
-                p.append(param)
-            logger.debug(
-                "Max length for parameter %s is %s.", paramNum + 1, maxLen)
-            if valueType == SQL_C_BINARY:
-                valueSize = SQLLEN(maxLen)
-                paramArrays.append((SQLBYTE * (paramSetSize * maxLen))())
-            elif valueType == SQL_C_DOUBLE:
-                valueSize = SQLLEN(maxLen)
-                paramArrays.append((SQLDOUBLE * paramSetSize)())
-            else:
-                maxLen += 1
-                valueSize = SQLLEN(ctypes.sizeof(SQLWCHAR) * maxLen)
-                paramArrays.append(_createBuffer(paramSetSize * maxLen))
-            lengthArrays.append((SQLLEN * paramSetSize)())
-            for paramSetNum in range(0, paramSetSize):
-                index = paramSetNum * maxLen
-                if p[paramSetNum] is not None:
-                    if valueType == SQL_C_DOUBLE:
-                        paramArrays[paramNum][paramSetNum] = p[paramSetNum]
-                    else:
-                        for c in p[paramSetNum]:
-                            paramArrays[paramNum][index] = c
-                            index += 1
-                        if valueType == SQL_C_BINARY:
-                            lengthArrays[paramNum][
-                                paramSetNum] = len(p[paramSetNum])
+            paramSet = []
+            paramSetSize = 0
+            for paramNum in range(0, numParams):
+                val = p[paramNum]
+                valueType = valueTypes[paramNum][0]
+                param, length = _getParamValue(val, valueType, True)
+                paramSet.append((param, length))
+                if valueType == SQL_C_WCHAR:
+                    # Depending on the session character set, a character
+                    # can take up to MAX_CHAR_SIZE bytes of the request.
+                    length = (len(val) if util.isString(val) else
+                              length) * MAX_CHAR_SIZE
+                paramSetSize += length + PARAM_OVERHEAD
+            if chunk and (chunkSize + paramSetSize > maxChunkSize or
+                          len(chunk) == batchSize):
+                rowCount += self._executeBatchChunk(
+                    chunk, chunkOffset, valueTypes, failures)
+                chunkOffset += len(chunk)
+                chunk = []
+                chunkSize = 0
+                if progressCallback is not None:
+                    progressCallback(chunkOffset, rowCount)
+            chunk.append(paramSet)
+            chunkSize += paramSetSize
+        if chunk:
+            rowCount += self._executeBatchChunk(
+                chunk, chunkOffset, valueTypes, failures)
+            if progressCallback is not None:
+                progressCallback(chunkOffset + len(chunk), rowCount)
+        if failures:
+            index, error = failures[0]
+            raise BatchError(
+                error.code, "{} of {} parameter sets failed, first failure "
+                "at index {}: {}".format(len(failures), paramSetNum, index,
+                                         error.msg), failures)
+        return rowCount
+
+    def _executeBatchChunk(self, chunk, offset, valueTypes, failures):
+        # Get the number of parameter sets.
+        paramSetSize = len(chunk)
+        logger.debug("Executing parameter sets %s to %s.", offset + 1,
+                     offset + paramSetSize)
+        # Specify the number of elements in each parameter array.
+        rc = odbc.SQLSetStmtAttr(
+            self.hStmt, SQL_ATTR_PARAMSET_SIZE, paramSetSize, 0)
+        checkStatus(rc, hStmt=self.hStmt, method="SQLSetStmtAttr")
+        # Specify a PTR to get the number of parameters processed.
+        paramsProcessed = SQLULEN()
+        rc = odbc.SQLSetStmtAttr(self.hStmt, SQL_ATTR_PARAMS_PROCESSED_PTR,
+                                 ADDR(paramsProcessed), SQL_IS_POINTER)
+        checkStatus(rc, hStmt=self.hStmt, method="SQLSetStmtAttr")
+        # Specify a PTR to get the status of the parameters processed.
+        paramsStatus = (SQLUSMALLINT * paramSetSize)()
+        rc = odbc.SQLSetStmtAttr(self.hStmt, SQL_ATTR_PARAM_STATUS_PTR,
+                                 ADDR(paramsStatus), SQL_IS_POINTER)
+        checkStatus(rc, hStmt=self.hStmt, method="SQLSetStmtAttr")
+        try:
+            # Bind the parameters.
+            paramArrays = []
+            lengthArrays = []
+            for paramNum in range(0, len(valueTypes)):
+                valueType, paramType = valueTypes[paramNum]
+                maxLen = 0
+                for paramSet in chunk:
+                    if paramSet[paramNum][1] > maxLen:
+                        maxLen = paramSet[paramNum][1]
+                logger.debug(
+                    "Max length for parameter %s is %s.", paramNum + 1,
+                    maxLen)
+                if valueType == SQL_C_BINARY:
+                    valueSize = SQLLEN(maxLen)
+                    paramArrays.append((SQLBYTE * (paramSetSize * maxLen))())
+                elif valueType == SQL_C_DOUBLE:
+                    valueSize = SQLLEN(maxLen)
+                    paramArrays.append((SQLDOUBLE * paramSetSize)())
+                else:
+                    maxLen += 1
+                    valueSize = SQLLEN(ctypes.sizeof(SQLWCHAR) * maxLen)
+                    paramArrays.append(_createBuffer(paramSetSize * maxLen))
+                lengthArrays.append((SQLLEN * paramSetSize)())
+                for paramSetNum in range(0, paramSetSize):
+                    index = paramSetNum * maxLen
+                    param = chunk[paramSetNum][paramNum][0]
+                    if param is not None:
+                        if valueType == SQL_C_DOUBLE:
+                            paramArrays[paramNum][paramSetNum] = param
                         else:
-                            lengthArrays[paramNum][
-                                paramSetNum] = SQLLEN(SQL_NTS)
+                            for c in param:
+                                paramArrays[paramNum][index] = c
+                                index += 1
+                            if valueType == SQL_C_BINARY:
+                                lengthArrays[paramNum][
+                                    paramSetNum] = len(param)
+                            else:
+                                lengthArrays[paramNum][
+                                    paramSetNum] = SQLLEN(SQL_NTS)
+                                paramArrays[paramNum][
+                                    index] = _convertParam("\x00")[0]
+                    else:
+                        lengthArrays[paramNum][
+                            paramSetNum] = SQLLEN(SQL_NULL_DATA)
+                        if valueType == SQL_C_WCHAR:
                             paramArrays[paramNum][
                                 index] = _convertParam("\x00")[0]
-                else:
-                    lengthArrays[paramNum][paramSetNum] = SQLLEN(SQL_NULL_DATA)
-                    if valueType == SQL_C_WCHAR:
-                        paramArrays[paramNum][index] = _convertParam("\x00")[0]
-            logger.trace("Binding parameter %s...", paramNum + 1)
-            rc = odbc.SQLBindParameter(self.hStmt, paramNum + 1,
-                                       SQL_PARAM_INPUT, valueType, paramType,
-                                       SQLULEN(maxLen), 0,
-                                       paramArrays[paramNum], valueSize,
-                                       lengthArrays[paramNum])
-            checkStatus(rc, hStmt=self.hStmt, method="SQLBindParameter")
-        # Execute the SQL statement.
-        logger.debug("Executing prepared statement.")
-        rc = odbc.SQLExecute(self.hStmt)
-        checkStatus(rc, hStmt=self.hStmt, method="SQLExecute")
+                logger.trace("Binding parameter %s...", paramNum + 1)
+                rc = odbc.SQLBindParameter(
+                    self.hStmt, paramNum + 1, SQL_PARAM_INPUT, valueType,
+                    paramType, SQLULEN(maxLen), 0, paramArrays[paramNum],
+                    valueSize, lengthArrays[paramNum])
+                checkStatus(rc, hStmt=self.hStmt, method="SQLBindParameter")
+            # Execute the SQL statement.
+            logger.debug("Executing prepared statement.")
+            rc = odbc.SQLExecute(self.hStmt)
+            error = None
+            try:
+                checkStatus(rc, hStmt=self.hStmt, method="SQLExecute")
+            except DatabaseError as e:
+                error = e
+            statuses = list(paramsStatus)
+            if error is not None and SQL_PARAM_ERROR not in statuses:
+                # The statement as a whole failed.
+                if offset > 0:
+                    logger.warning(
+                        "Executing parameter sets %s to %s failed, the "
+                        "parameter sets before them were already executed.",
+                        offset + 1, offset + paramSetSize)
+                raise error
+            if SQL_PARAM_ERROR in statuses:
+                self._collectBatchFailures(
+                    statuses, paramsProcessed.value, offset, error, failures)
+            rowCount = SQLLEN()
+            rc = odbc.SQLRowCount(self.hStmt, ADDR(rowCount))
+            checkStatus(rc, hStmt=self.hStmt, method="SQLRowCount")
+            return max(rowCount.value, 0)
+        finally:
+            # Unset the pointers so they are not written to once the arrays
+            # are released.
+            odbc.SQLSetStmtAttr(self.hStmt, SQL_ATTR_PARAMS_PROCESSED_PTR,
+                                None, SQL_IS_POINTER)
+            odbc.SQLSetStmtAttr(self.hStmt, SQL_ATTR_PARAM_STATUS_PTR,
+                                None, SQL_IS_POINTER)
+
+    def _collectBatchFailures(self, statuses, processed, offset, error,
+                              failures):
+        rowErrors = {}
+        for sqlState, msg, code, rowNumber in getDiagnosticInfo(
+                self.hStmt, rowNumbers=True):
+            if rowNumber > 0 and rowNumber not in rowErrors and \
+                    not sqlState.startswith("01"):
+                rowErrors[rowNumber] = DatabaseError(
+                    code, u"[{}] {}".format(sqlState, msg), sqlState)
+        for paramSetNum in range(0, len(statuses)):
+            status = statuses[paramSetNum]
+            if status == SQL_PARAM_ERROR:
+                rowError = rowErrors.get(paramSetNum + 1, error)
+            elif status == SQL_PARAM_UNUSED or \
+                    (processed and paramSetNum >= processed) or \
+                    (status == SQL_PARAM_DIAG_UNAVAILABLE and error):
+                rowError = error
+            else:
+                continue
+            if rowError is None:
+                rowError = DatabaseError(
+                    BATCH_ERROR, "Parameter set was not executed.")
+            logger.debug("ParamSet %s failed: %s", offset + paramSetNum + 1,
+                         rowError.msg)
+            failures.append((offset + paramSetNum, rowError))
 
     def _handleResults(self):
+        self._stopPrefetch()
         # Rest cursor attributes.
         self.description = None
         self.rowcount = -1
@@ -735,8 +1561,137 @@ class OdbcCursor (util.Cursor):
                     columnName, typeCode, None, columnSize.value,
                     decimalDigits.value, None, nullable.value))
         self.iterator = rowIterator(self)
+        # Streamed LOBs can only be read before the next row is fetched.
+        if self.description and not self.streamLobs:
+            self.iterator = self._prefetchRows(self.iterator)
+
+    def fetchcolumns(self, size=None):
+        """Fetches the next set of rows (arraysize by default) and returns a
+         list with the values of each column. Rowsets are fetched into
+         buffers bound to each column so integer and float columns are
+         copied straight into arrays without creating row objects. Result
+         sets with LOBs or large columns are fetched row by row."""
+        if size is None:
+            size = self.arraysize
+        fetchTypes = self._getRowsetTypes(bindIntegers=True)
+        if not fetchTypes:
+            return util.Cursor.fetchcolumns(self, size)
+        columns = [array.array(datatypes.columnArrayType(typeName))
+                   if dataType in (SQL_C_SBIGINT, SQL_C_DOUBLE) else []
+                   for (dataType, bufSize), (typeName, typeCode) in zip(
+                       fetchTypes, self.types)]
+        count = self._fetchRowsets(size, fetchTypes, columns)
+        self._advance(count)
+        return [self._createColumn(col, values)
+                for col, values in enumerate(columns)]
+
+    def _fetchRows(self, size):
+        """Fetches up to size rows for fetchmany and fetchall in rowsets of up
+         to size rows, the values are read with the same C types as when
+         rows are fetched one at a time."""
+        fetchTypes = self._getRowsetTypes(bindIntegers=False)
+        if not fetchTypes or size <= 0:
+            return util.Cursor._fetchRows(self, size)
+        columns = [[] for fetchType in fetchTypes]
+        count = self._fetchRowsets(size, fetchTypes, columns)
+        return self._createRows(columns, count)
+
+    def _getRowsetTypes(self, bindIntegers):
+        # moreResults is set once the rows of the result set are exhausted.
+        if self.description and self.iterator and \
+                self.moreResults is None and not isinstance(
+                    self.iterator, util.PrefetchIterator):
+            return _getBlockFetchTypes(self, bindIntegers)
+        return None
+
+    def _fetchRowsets(self, size, fetchTypes, columns):
+        """Fetches up to size rows into buffers bound to each column and
+         appends the values to columns, returns the number of rows
+         fetched."""
+        rowSize = sum(bufSize + ctypes.sizeof(SQLLEN)
+                      for dataType, bufSize in fetchTypes)
+        rowsetSize = max(1, min(size, MAX_ROWSET_BUFFER_SIZE // rowSize))
+        buffers = [((ctypes.c_char * (bufSize * rowsetSize))(),
+                    (SQLLEN * rowsetSize)()) for dataType, bufSize in
+                   fetchTypes]
+        rowsFetched = SQLULEN()
+        count = 0
+        exhausted = False
+        try:
+            for col, ((dataType, bufSize), (buf, lengths)) in enumerate(
+                    zip(fetchTypes, buffers)):
+                rc = odbc.SQLBindCol(
+                    self.hStmt, col + 1, dataType, buf, bufSize, lengths)
+                checkStatus(rc, hStmt=self.hStmt, method="SQLBindCol")
+            rc = odbc.SQLSetStmtAttr(self.hStmt, SQL_ATTR_ROWS_FETCHED_PTR,
+                                     ADDR(rowsFetched), SQL_IS_POINTER)
+            checkStatus(rc, hStmt=self.hStmt, method="SQLSetStmtAttr")
+            while count < size:
+                self._setRowArraySize(min(rowsetSize, size - count))
+                rc = odbc.SQLFetch(self.hStmt)
+                sqlState = checkStatus(
+                    rc, hStmt=self.hStmt, method="SQLFetch")
+                if rc == SQL_NO_DATA:
+                    exhausted = True
+                    break
+                self.fetchNumber += 1
+                fetched = rowsFetched.value
+                truncated = {}
+                if SQL_STATE_DATA_TRUNCATED in sqlState:
+                    truncated = self._getTruncatedValues(
+                        fetchTypes, buffers, fetched)
+                for col, ((dataType, bufSize), (buf, lengths)) in enumerate(
+                        zip(fetchTypes, buffers)):
+                    columns[col] = _appendRowset(
+                        columns[col], dataType, buf, bufSize, lengths,
+                        fetched)
+                for (col, row), value in truncated.items():
+                    columns[col][row - fetched] = value
+                count += fetched
+        finally:
+            odbc.SQLFreeStmt(self.hStmt, SQL_UNBIND)
+            odbc.SQLSetStmtAttr(self.hStmt, SQL_ATTR_ROWS_FETCHED_PTR, None,
+                                SQL_IS_POINTER)
+            self._setRowArraySize(1)
+        if exhausted:
+            # Let the row iterator move on to the next result set.
+            next(self.iterator, None)
+        return count
+
+    def _getTruncatedValues(self, fetchTypes, buffers, fetched):
+        """Reads the values of a fetched rowset that didn't fit in their
+         bound buffers one at a time with SQLGetData, as they are when rows
+         are fetched one at a time. Returns them by (column, row) and marks
+         them as null in the rowset so the truncated data isn't read."""
+        values = {}
+        buf = _createBuffer(MAX_FETCH_BUFFER_SIZE // ctypes.sizeof(SQLWCHAR))
+        length = SQLLEN()
+        for row in range(0, fetched):
+            positioned = False
+            for col, ((dataType, bufSize), (rowsetBuf, lengths)) in \
+                    enumerate(zip(fetchTypes, buffers)):
+                if dataType not in (SQL_C_WCHAR, SQL_C_BINARY) or (
+                        lengths[row] != SQL_NO_TOTAL and
+                        lengths[row] <= _boundSize(dataType, bufSize)):
+                    continue
+                if not positioned:
+                    rc = odbc.SQLSetPos(
+                        self.hStmt, row + 1, SQL_POSITION, SQL_LOCK_NO_CHANGE)
+                    checkStatus(rc, hStmt=self.hStmt, method="SQLSetPos")
+                    positioned = True
+                values[(col, row)] = _getData(
+                    self, col + 1, dataType, buf, ctypes.sizeof(buf), length)
+                lengths[row] = SQL_NULL_DATA
+        return values
+
+    def _setRowArraySize(self, rowArraySize):
+        rc = odbc.SQLSetStmtAttr(
+            self.hStmt, SQL_ATTR_ROW_ARRAY_SIZE, rowArraySize, 0)
+        checkStatus(rc, hStmt=self.hStmt,
+                    method="SQLSetStmtAttr - SQL_ATTR_ROW_ARRAY_SIZE")
 
     def nextset(self):
+        self._stopPrefetch()
         if self.moreResults is None:
             self._checkForMoreResults()
         if self.moreResults:
@@ -747,9 +1702,52 @@ class OdbcCursor (util.Cursor):
         rc = odbc.SQLMoreResults(self.hStmt)
         checkStatus(rc, hStmt=self.hStmt, method="SQLMoreResults")
         self.moreResults = rc == SQL_SUCCESS or rc == SQL_SUCCESS_WITH_INFO
+        if not self.moreResults:
+            watchdog.unwatch(self)
         return self.moreResults
 
+    def _putStreams(self, streams):
+        """Supplies the data for data-at-execution parameters by reading each
+         stream in chunks. Returns the return code of the execution."""
+        token = SQLPOINTER()
+        while True:
+            rc = odbc.SQLParamData(self.hStmt, ADDR(token))
+            if rc != SQL_NEED_DATA:
+                return rc
+            stream, valueType = streams[token.value]
+            logger.debug("Streaming data for parameter %s.", token.value)
+            # Characters split between the chunks of a binary text stream
+            # are carried over to the next chunk.
+            decoder = codecs.getincrementaldecoder("utf8")()
+            count = 0
+            while True:
+                data = stream.read(MAX_FETCH_BUFFER_SIZE)
+                end = not data
+                if valueType != SQL_C_BINARY and \
+                        isinstance(data, (bytes, bytearray)) and \
+                        not util.isString(data):
+                    data = decoder.decode(bytes(data), end)
+                if data or count == 0:
+                    if valueType == SQL_C_BINARY:
+                        data = bytes(data)
+                        rc = odbc.SQLPutData(self.hStmt, data, len(data))
+                    else:
+                        buf = _inputStr(data)
+                        rc = odbc.SQLPutData(
+                            self.hStmt, buf,
+                            ctypes.sizeof(buf) - ctypes.sizeof(SQLWCHAR))
+                    checkStatus(rc, hStmt=self.hStmt, method="SQLPutData")
+                    count += 1
+                if end:
+                    break
+
+    def _watch(self, cancelTimeout):
+        if cancelTimeout is not None:
+            watchdog.watch(self, cancelTimeout)
+
     def _free(self):
+        watchdog.unwatch(self)
+        self.fetchNumber += 1
         rc = odbc.SQLFreeStmt(self.hStmt, SQL_CLOSE)
         checkStatus(rc, hStmt=self.hStmt, method="SQLFreeStmt - SQL_CLOSE")
         rc = odbc.SQLFreeStmt(self.hStmt, SQL_RESET_PARAMS)
@@ -757,10 +1755,122 @@ class OdbcCursor (util.Cursor):
             rc, hStmt=self.hStmt, method="SQLFreeStmt - SQL_RESET_PARAMS")
 
 
+class StatementWatchdog (object):
+
+    """Cancels statements that have not completed by their deadline using
+     SQLCancel from a background thread."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.deadlines = []
+        self.watched = {}
+        self.cancelling = set()
+        self.sequence = itertools.count()
+        self.thread = None
+        self.cancelCount = 0
+
+    def watch(self, cursor, timeout):
+        """Cancels the cursor's current statement if it is still executing
+         or being fetched after timeout seconds."""
+        with self.condition:
+            self._waitForCancel(cursor)
+            seq = next(self.sequence)
+            self.watched[id(cursor)] = seq
+            cursor.watched = True
+            heapq.heappush(self.deadlines,
+                           (time.time() + timeout, seq, cursor))
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self._run, name="StatementWatchdog")
+                self.thread.daemon = True
+                self.thread.start()
+            self.condition.notify_all()
+
+    def unwatch(self, cursor):
+        """Stops watching the cursor's current statement. If the statement
+         is being cancelled, waits for that to finish so that its handle
+         can't be reused by another cursor in the meantime."""
+        # Only the thread using the cursor watches and unwatches it, so
+        # cursors without a deadline don't need the lock.
+        if not cursor.watched:
+            return
+        with self.condition:
+            cursor.watched = False
+            self._waitForCancel(cursor)
+            if self.watched.pop(id(cursor), None) is not None and \
+                    len(self.deadlines) > 2 * len(self.watched) + 16:
+                # Drop the deadlines of statements that are no longer watched
+                # rather than keep their cursors until the deadlines pass.
+                self.deadlines = [
+                    entry for entry in self.deadlines
+                    if self.watched.get(id(entry[2])) == entry[1]]
+                heapq.heapify(self.deadlines)
+
+    def _waitForCancel(self, cursor):
+        while id(cursor) in self.cancelling:
+            self.condition.wait()
+
+    def _run(self):
+        with self.condition:
+            while True:
+                now = time.time()
+                expired = []
+                while self.deadlines and self.deadlines[0][0] <= now:
+                    deadline, seq, cursor = heapq.heappop(self.deadlines)
+                    if self.watched.get(id(cursor)) == seq:
+                        del self.watched[id(cursor)]
+                        # Watching or unwatching the cursor waits until the
+                        # statement is cancelled, so it can't be replaced by
+                        # a new one in the meantime.
+                        self.cancelling.add(id(cursor))
+                        expired.append(cursor)
+                if expired:
+                    # Cancel without the lock so a slow cancel doesn't hold
+                    # up other cursors.
+                    self.condition.release()
+                    try:
+                        for cursor in expired:
+                            self._cancel(cursor)
+                    finally:
+                        self.condition.acquire()
+                        for cursor in expired:
+                            self.cancelling.discard(id(cursor))
+                        self.condition.notify_all()
+                    continue
+                self.condition.wait(
+                    self.deadlines[0][0] - now if self.deadlines else None)
+
+    def _cancel(self, cursor):
+        if not cursor.hStmt:
+            return
+        try:
+            logger.warning("Statement on session %s exceeded its deadline.",
+                           cursor.connection._sessionno)
+            cursor.cancel()
+            self.cancelCount += 1
+        except Exception as e:
+            logger.warning("Unable to cancel statement: %s", e)
+
+
+watchdog = StatementWatchdog()
+
+
+def _getEventLoop(loop):
+    if asyncio is None:
+        raise InterfaceError(
+            "ASYNC_NOT_SUPPORTED",
+            "Asynchronous execution requires the asyncio module.")
+    return loop or asyncio.get_event_loop()
+
+
 def _convertLineFeeds(query):
     return "\r".join(util.linesplit(query))
 
 
+def _isStream(val):
+    return hasattr(val, "read") and not isinstance(val, OutParam)
+
+
 def _getInputOutputType(val):
     inputOutputType = SQL_PARAM_INPUT
     if isinstance(val, InOutParam):
@@ -786,6 +1896,10 @@ def _getParamValueType(dataType):
 
 def _getParamValue(val, valueType, batch):
     length = 0
+    if batch and _isStream(val):
+        raise InterfaceError(
+            "STREAM_NOT_SUPPORTED",
+            "Streamed parameters are not supported in batch mode.")
     if val is None:
         param = None
     elif valueType == SQL_C_BINARY:
@@ -832,9 +1946,162 @@ def _getParamValue(val, valueType, batch):
     return param, length
 
 
+def _getFetchTypes(cursor):
+    """Returns the C data type and buffer size to fetch each column with."""
+    fetchTypes = []
+    for col in range(0, len(cursor.description)):
+        columnSize = cursor.description[col][3]
+        if cursor.description[col][1] == BINARY:
+            dataType = SQL_C_BINARY
+            bufSize = columnSize
+        elif cursor.types[col][0] in datatypes.FLOAT_TYPES:
+            dataType = SQL_C_DOUBLE
+            bufSize = ctypes.sizeof(SQLDOUBLE)
+        else:
+            dataType = SQL_C_WCHAR
+            bufSize = (columnSize + COLUMN_SIZE_PADDING) * MAX_CHAR_SIZE
+        if not columnSize:
+            bufSize = SMALL_BUFFER_SIZE
+        fetchTypes.append((dataType, min(bufSize, MAX_FETCH_BUFFER_SIZE)))
+    return fetchTypes
+
+
+def _getBlockFetchTypes(cursor, bindIntegers=True):
+    """Returns the C data type and buffer size to bind each column with for
+     block fetches or None if the result set has a column that can't be
+     bound. Integer columns are bound as 64 bit integers if bindIntegers is
+     True. Truncated values are read again with SQLGetData, so character and
+     binary columns are only bound if the driver supports SQL_GD_BLOCK."""
+    fetchTypes = []
+    blockGetData = None
+    for (dataType, bufSize), (typeName, typeCode), column in zip(
+            _getFetchTypes(cursor), cursor.types, cursor.description):
+        # Values that don't fit in the buffer can't be read from a rowset.
+        if typeName in LOB_TYPES or not column[3] or \
+                bufSize >= MAX_FETCH_BUFFER_SIZE:
+            return None
+        if bindIntegers and typeName in datatypes.INTEGER_TYPES:
+            dataType, bufSize = SQL_C_SBIGINT, ctypes.sizeof(ctypes.c_int64)
+        if dataType in (SQL_C_WCHAR, SQL_C_BINARY):
+            if blockGetData is None:
+                blockGetData = cursor.connection.supportsBlockGetData()
+            if not blockGetData:
+                return None
+        fetchTypes.append((dataType, bufSize))
+    return fetchTypes
+
+
+def _boundSize(dataType, bufSize):
+    """Returns the size of the largest value that fits in a bound buffer."""
+    if dataType == SQL_C_WCHAR:
+        return bufSize - ctypes.sizeof(SQLWCHAR)
+    return bufSize
+
+
+def _appendRowset(column, dataType, buf, bufSize, lengths, count):
+    """Appends the values of a column in a fetched rowset, integer and float
+     columns are kept as arrays until a null is found. Lengths are clamped
+     to the buffer so a length past its end is never read."""
+    address = ctypes.addressof(buf)
+    if dataType in (SQL_C_SBIGINT, SQL_C_DOUBLE):
+        if isinstance(column, array.array) and \
+                SQL_NULL_DATA not in lengths[:count]:
+            data = ctypes.string_at(address, count * bufSize)
+            if pyVer > 2:
+                column.frombytes(data)
+            else:
+                column.fromstring(data)
+            return column
+        valueType = ctypes.c_int64 if dataType == SQL_C_SBIGINT else SQLDOUBLE
+        values = (valueType * count).from_buffer(buf)
+        column = list(column)
+        column.extend(None if lengths[i] == SQL_NULL_DATA else values[i]
+                      for i in range(0, count))
+    elif dataType == SQL_C_BINARY:
+        column.extend(None if length == SQL_NULL_DATA else bytearray(
+            ctypes.string_at(address + i * bufSize, min(length, bufSize)))
+            for i, length in enumerate(lengths[:count]))
+    else:
+        size = _boundSize(dataType, bufSize)
+        column.extend(None if length == SQL_NULL_DATA else _outputStrAt(
+            address + i * bufSize, min(length, size))
+            for i, length in enumerate(lengths[:count]))
+    return column
+
+
+def _getTruncatedData(cursor, col, dataType, buf, bufSize, length, sqlState):
+    """Reads the remainder of a value that did not fit in the fetch buffer.
+     When the driver reports the total length, the remainder is read with a
+     single call into a preallocated buffer."""
+    logger.debug(
+        "Data truncated. Calling SQLGetData to get next part "
+        "of data for column %s of size %s.", col, length.value)
+    if dataType == SQL_C_BINARY:
+        if length.value != SQL_NO_TOTAL:
+            val = bytearray(length.value)
+            val[0:bufSize] = (ctypes.c_ubyte * bufSize).from_buffer(buf)
+            rc = odbc.SQLGetData(
+                cursor.hStmt, col, dataType,
+                (ctypes.c_ubyte * (len(val) - bufSize)).from_buffer(
+                    val, bufSize), len(val) - bufSize, ADDR(length))
+            checkStatus(rc, hStmt=cursor.hStmt, method="SQLGetData2")
+            return val
+        val = bytearray(buf)
+        while SQL_STATE_DATA_TRUNCATED in sqlState:
+            rc = odbc.SQLGetData(
+                cursor.hStmt, col, dataType, buf, bufSize, ADDR(length))
+            sqlState = checkStatus(
+                rc, hStmt=cursor.hStmt, method="SQLGetData2")
+            if length.value == SQL_NO_TOTAL or length.value > bufSize:
+                val += bytearray(buf)
+            else:
+                val += bytearray(buf)[:length.value]
+        return val
+    decode = _createDecoder()
+    if length.value != SQL_NO_TOTAL:
+        rest = _createBuffer(length.value // ctypes.sizeof(SQLWCHAR) + 1)
+        rc = odbc.SQLGetData(cursor.hStmt, col, dataType, rest,
+                             ctypes.sizeof(rest), ADDR(length))
+        checkStatus(rc, hStmt=cursor.hStmt, method="SQLGetData2")
+        return decode(buf) + decode(rest, True)
+    val = [decode(buf), ]
+    while SQL_STATE_DATA_TRUNCATED in sqlState:
+        rc = odbc.SQLGetData(
+            cursor.hStmt, col, dataType, buf, bufSize, ADDR(length))
+        sqlState = checkStatus(rc, hStmt=cursor.hStmt, method="SQLGetData2")
+        val.append(decode(buf, SQL_STATE_DATA_TRUNCATED not in sqlState))
+    return "".join(val)
+
+
+def _getData(cursor, col, dataType, buf, bufSize, length):
+    """Reads a column value of the current row with SQLGetData."""
+    rc = odbc.SQLGetData(
+        cursor.hStmt, col, dataType, buf, bufSize, ADDR(length))
+    sqlState = checkStatus(rc, hStmt=cursor.hStmt, method="SQLGetData")
+    if length.value == SQL_NULL_DATA:
+        return None
+    if SQL_STATE_DATA_TRUNCATED in sqlState:
+        return _getTruncatedData(
+            cursor, col, dataType, buf, bufSize, length, sqlState)
+    if dataType == SQL_C_BINARY:
+        return bytearray((ctypes.c_ubyte * length.value).from_buffer(buf))
+    elif dataType == SQL_C_DOUBLE:
+        return ctypes.c_double.from_buffer(buf).value
+    return _outputStr(buf)
+
+
 def rowIterator(cursor):
     """ Generator function for iterating over the rows in a result set. """
-    buf = _createBuffer(LARGE_BUFFER_SIZE)
+    fetchTypes = _getFetchTypes(cursor) if cursor.description else []
+    # A trailing LOB column can be streamed as SQLGetData is called for the
+    # columns in order.
+    lobColumn = None
+    if cursor.streamLobs and fetchTypes and \
+            cursor.types[-1][0] in LOB_TYPES:
+        lobColumn = len(fetchTypes)
+        fetchTypes[-1] = (fetchTypes[-1][0], 0)
+    bufSize = max([size for dataType, size in fetchTypes] or [0])
+    buf = _createBuffer(bufSize // ctypes.sizeof(SQLWCHAR) + 1)
     bufSize = ctypes.sizeof(buf)
     length = SQLLEN()
     while cursor.description is not None:
@@ -842,55 +2109,110 @@ def rowIterator(cursor):
         checkStatus(rc, hStmt=cursor.hStmt, method="SQLFetch")
         if rc == SQL_NO_DATA:
             break
+        cursor.fetchNumber += 1
         values = []
         # Get each column in the row.
-        for col in range(1, len(cursor.description) + 1):
+        col = 0
+        for dataType, size in fetchTypes:
+            col += 1
             val = None
-            dataType = SQL_C_WCHAR
-            if cursor.description[col - 1][1] == BINARY:
-                dataType = SQL_C_BINARY
-            elif cursor.types[col - 1][0] in datatypes.FLOAT_TYPES:
-                dataType = SQL_C_DOUBLE
-            rc = odbc.SQLGetData(
-                cursor.hStmt, col, dataType, buf, bufSize, ADDR(length))
-            sqlState = checkStatus(rc, hStmt=cursor.hStmt, method="SQLGetData")
-            if length.value != SQL_NULL_DATA:
-                if SQL_STATE_DATA_TRUNCATED in sqlState:
-                    logger.debug(
-                        "Data truncated. Calling SQLGetData to get next part "
-                        "of data for column %s of size %s.",
-                        col, length.value)
-                    if dataType == SQL_C_BINARY:
-                        val = bytearray(length.value)
-                        val[0:bufSize] = (
-                            ctypes.c_ubyte * bufSize).from_buffer(buf)
-                        newBufSize = len(val) - bufSize
-                        newBuffer = (ctypes.c_ubyte * newBufSize).from_buffer(
-                            val, bufSize)
-                        rc = odbc.SQLGetData(
-                            cursor.hStmt, col, dataType, newBuffer,
-                            newBufSize, ADDR(length))
-                        checkStatus(
-                            rc, hStmt=cursor.hStmt, method="SQLGetData2")
-                    else:
-                        val = [_outputStr(buf), ]
-                        while SQL_STATE_DATA_TRUNCATED in sqlState:
-                            rc = odbc.SQLGetData(
-                                cursor.hStmt, col, dataType, buf, bufSize,
-                                ADDR(length))
-                            sqlState = checkStatus(
-                                rc, hStmt=cursor.hStmt, method="SQLGetData2")
-                            val.append(_outputStr(buf))
-                        val = "".join(val)
-                else:
-                    if dataType == SQL_C_BINARY:
-                        val = bytearray(
-                            (ctypes.c_ubyte * length.value).from_buffer(buf))
-                    elif dataType == SQL_C_DOUBLE:
-                        val = ctypes.c_double.from_buffer(buf).value
-                    else:
-                        val = _outputStr(buf)
-            values.append(val)
+            if col == lobColumn:
+                # Only get the length so the LOB can be read later.
+                rc = odbc.SQLGetData(
+                    cursor.hStmt, col, dataType, buf, 0, ADDR(length))
+                checkStatus(rc, hStmt=cursor.hStmt, method="SQLGetData")
+                if length.value != SQL_NULL_DATA:
+                    val = OdbcLob(cursor, col, dataType, length.value)
+                values.append(val)
+                continue
+            values.append(
+                _getData(cursor, col, dataType, buf, bufSize, length))
         yield values
     if not cursor._checkForMoreResults():
         cursor._free()
+
+
+class OdbcLob (object):
+
+    """A file-like object for reading a CLOB or BLOB column in chunks rather
+     than as a single value. It can only be read until the cursor moves to
+     the next row."""
+
+    def __init__(self, cursor, col, dataType, length):
+        self.cursor = cursor
+        self.col = col
+        self.dataType = dataType
+        self.length = None if length == SQL_NO_TOTAL else length
+        self.fetchNumber = cursor.fetchNumber
+        self.eof = False
+        # The characters of a CLOB that have been decoded but not returned.
+        self.pending = u""
+        self.decode = _createDecoder()
+
+    def read(self, size=-1):
+        """Reads at most size bytes (BLOB) or characters (CLOB), reads the
+         remainder of the LOB if size is negative."""
+        if size is None or size < 0:
+            chunks = []
+            while True:
+                chunk = self._read(MAX_FETCH_BUFFER_SIZE)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            return self._empty().join(chunks)
+        return self._read(size)
+
+    def _read(self, size):
+        if self.cursor.hStmt is None or \
+                self.cursor.fetchNumber != self.fetchNumber:
+            raise InterfaceError(
+                "LOB_NOT_READABLE", "LOB values can only be read before the "
+                "next row is fetched.")
+        if size == 0:
+            return self._empty()
+        if self.dataType == SQL_C_BINARY:
+            return self._getData(size)
+        # A chunk can end with part of a character or hold more characters
+        # than were asked for, the rest is kept for the next read.
+        while len(self.pending) < size and not self.eof:
+            self.pending += self._getData(size)
+        val, self.pending = self.pending[:size], self.pending[size:]
+        return val
+
+    def _getData(self, size):
+        """Reads the next chunk of at most size bytes or characters."""
+        if self.eof:
+            return self._empty()
+        length = SQLLEN()
+        if self.dataType == SQL_C_BINARY:
+            buf = (SQLBYTE * size)()
+        else:
+            buf = _createBuffer(
+                size * MAX_CHAR_SIZE // ctypes.sizeof(SQLWCHAR) + 1)
+        rc = odbc.SQLGetData(self.cursor.hStmt, self.col, self.dataType, buf,
+                             ctypes.sizeof(buf), ADDR(length))
+        if rc == SQL_NO_DATA:
+            self.eof = True
+            return self._empty()
+        sqlState = checkStatus(
+            rc, hStmt=self.cursor.hStmt, method="SQLGetData")
+        if SQL_STATE_DATA_TRUNCATED not in sqlState:
+            self.eof = True
+        if self.dataType == SQL_C_BINARY:
+            if self.eof:
+                return bytearray(buf)[:length.value]
+            return bytearray(buf)
+        return self.decode(buf, self.eof)
+
+    def _empty(self):
+        return bytearray() if self.dataType == SQL_C_BINARY else u""
+
+    def __iter__(self):
+        while True:
+            chunk = self._read(MAX_FETCH_BUFFER_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+    def __repr__(self):
+        return "OdbcLob(column={}, length={})".format(self.col, self.length)
@@ -25,8 +25,11 @@ Teradata REST."""
 
 import atexit
 import base64
+import decimal
 import json
 import logging
+import select
+import socket
 import ssl
 import sys
 import time
@@ -47,6 +50,10 @@ REST_ERROR = "REST_ERROR"
 HTTP_STATUS_DATABASE_ERROR = 420
 ERROR_USER_GENERATED_TRANSACTION_ABORT = 3514
 MAX_CONNECT_RETRIES = 5
+# The maximum number of parameter sets sent per request by executemany.
+BATCH_SIZE = 10000
+# The number of idle HTTP connections kept per session for reuse by cursors.
+HTTP_POOL_SIZE = 4
 
 connections = []
 
@@ -75,6 +82,7 @@ class RestConnection:
         self.transactionMode = transactionMode
         self.dataTypeConverter = dataTypeConverter
         self.cursors = []
+        self.httpConns = []
         # Support TERA and Teradata as transaction mode to be consistent with
         # ODBC.
         if transactionMode == "Teradata":
@@ -91,8 +99,13 @@ class RestConnection:
         self.template = RestTemplate(
             protocol, host, port, webContext, username, password,
             accept='application/vnd.com.teradata.rest-v1.0+json',
-            verifyCerts=util.booleanValue(verifyCerts), sslContext=sslContext)
-        with self.template.connect() as conn:
+            verifyCerts=util.booleanValue(verifyCerts), sslContext=sslContext,
+            parseInt=int if getattr(
+                dataTypeConverter, "useInt", False) else decimal.Decimal)
+        # The HTTP connection used to create the session is kept open for the
+        # session's first cursor.
+        conn = self.template.connect()
+        try:
             if not self.implicit:
                 options = {}
                 options['autoCommit'] = autoCommit
@@ -105,18 +118,23 @@ class RestConnection:
                     session = conn.post(
                         '/systems/{0}/sessions'.format(self.system),
                         options).readObject()
+                    conn.drain()
                     self.sessionId = session['sessionId']
                     connections.append(self)
                     logger.info("Created explicit session: %s",  session)
                 except (pulljson.JSONParseError) as e:
                     raise InterfaceError(
                         e.code, "Error reading JSON response: " + e.msg)
+        except Exception:
+            conn.close()
+            raise
+        self._releaseHttpConnection(conn)
 
     def close(self):
         """ Closes an Explicit Session using the REST API for Teradata
          Database """
         if hasattr(self, 'sessionId') and self.sessionId is not None:
-            with self.template.connect() as conn:
+            with self._getHttpConnection() as conn:
                 try:
                     conn.delete(
                         '/systems/{0}/sessions/{1}'.format(
@@ -130,6 +148,8 @@ class RestConnection:
             connections.remove(self)
         for cursor in list(self.cursors):
             cursor.close()
+        while getattr(self, 'httpConns', None):
+            self.httpConns.pop().close()
 
     def commit(self):
         with self.cursor() as cursor:
@@ -149,6 +169,20 @@ class RestConnection:
     def cursor(self):
         return RestCursor(self)
 
+    def _getHttpConnection(self):
+        """Returns an idle HTTP connection or opens a new one."""
+        if self.httpConns:
+            return self.httpConns.pop()
+        return self.template.connect()
+
+    def _releaseHttpConnection(self, conn):
+        """Keeps an HTTP connection for reuse if its last response was fully
+         read, otherwise closes it."""
+        if len(self.httpConns) < HTTP_POOL_SIZE and conn.isIdle():
+            self.httpConns.append(conn)
+        else:
+            conn.close()
+
     def __del__(self):
         self.close()
 
@@ -167,10 +201,12 @@ class RestCursor (util.Cursor):
         self.conn = None
         util.Cursor.__init__(
             self, connection, connection.dbType, connection.dataTypeConverter)
-        self.conn = connection.template.connect()
+        self.conn = connection._getHttpConnection()
         connection.cursors.append(self)
 
     def callproc(self, procname, params, queryTimeout=None):
+        self._stopPrefetch()
+        self.prefetch = 0
         inparams = None
         outparams = None
         count = 0
@@ -198,22 +234,71 @@ class RestCursor (util.Cursor):
 
     def close(self):
         if self.conn:
-            self.conn.close()
+            self._stopPrefetch()
+            if self in self.connection.cursors:
+                self.connection.cursors.remove(self)
+                self.connection._releaseHttpConnection(self.conn)
+            else:
+                self.conn.close()
+            self.conn = None
 
-    def execute(self, query, params=None, queryTimeout=None):
+    def execute(self, query, params=None, queryTimeout=None, prefetch=0):
+        """Executes a query. If prefetch is given, up to that many batches of
+         arraysize rows are read ahead on a background thread."""
         if params is not None:
             params = [params]
+        self._stopPrefetch()
+        self.prefetch = prefetch
         self._handleResults(
             self._execute(query, params, queryTimeout=queryTimeout))
         return self
 
-    def executemany(self, query, params, batch=False, queryTimeout=None):
-        self._handleResults(
-            self._execute(query, params, batch=batch,
-                          queryTimeout=queryTimeout))
+    def executemany(self, query, params, batch=False, queryTimeout=None,
+                    batchSize=BATCH_SIZE, progressCallback=None):
+        """Executes the query for each parameter set, sending at most
+         batchSize parameter sets per request. The results of a request are
+         read before the next one is sent, so nextset only moves through the
+         results of the last request. rowcount is the sum of the row counts
+         of the results read so far and of the current result.
+         progressCallback(paramSetCount, rowCount) is called after each
+         request."""
+        self._stopPrefetch()
+        self.prefetch = 0
+        paramSetCount = 0
+        rowCount = 0
+        for chunk in util.chunksplit(params, batchSize):
+            if paramSetCount > 0:
+                # Read the remainder of the previous response so the HTTP
+                # connection can be reused.
+                rowCount += self._drainResults()
+            self._handleResults(
+                self._execute(query, chunk, batch=batch,
+                              queryTimeout=queryTimeout))
+            paramSetCount += len(chunk)
+            if self.rowcount > 0:
+                rowCount += self.rowcount
+            if progressCallback is not None:
+                progressCallback(paramSetCount, rowCount)
+        if paramSetCount == 0:
+            self.columns = None
+            self.description = None
+            self.iterator = None
+            self.rownumber = None
+        if self.rowcount >= 0 or paramSetCount == 0:
+            self.rowcount = rowCount
         return self
 
+    def _drainResults(self):
+        """Reads the remaining results of the last response and returns the
+         sum of their row counts."""
+        rowCount = 0
+        while self.nextset():
+            if self.rowcount > 0:
+                rowCount += self.rowcount
+        return rowCount
+
     def _handleResults(self, results, hasOutParams=False):
+        self._stopPrefetch()
         self.results = results
         try:
             results.expectObject()
@@ -282,7 +367,8 @@ class RestCursor (util.Cursor):
                 self.description.append(
                     (column["name"], type_code, None, None, None, None, None))
                 index += 1
-            self.iterator = results.expectField("data", pulljson.ARRAY)
+            self.iterator = self._prefetchRows(
+                results.expectField("data", pulljson.ARRAY))
         else:
             self.columns = None
             self.description = None
@@ -292,9 +378,18 @@ class RestCursor (util.Cursor):
                 self.rowcount = results.expectField("count")
         return outParams
 
+    def _fetchRows(self, size):
+        """Fetches up to size rows for fetchmany and fetchall, the rows of a
+         batch are decoded together rather than one at a time."""
+        if isinstance(self.iterator, pulljson.JSONArrayIterator) and size > 0:
+            block = self.iterator.nextBatch(size)
+            return self._createRows(list(zip(*block)), len(block))
+        return util.Cursor._fetchRows(self, size)
+
     def nextset(self):
         for row in self:  # @UnusedVariable
             pass
+        self._stopPrefetch()
         for event in self.results:
             if event.type == pulljson.START_OBJECT:
                 self._handleResultSet(self.results)
@@ -313,8 +408,10 @@ def _convertParam(p):
 class RestTemplate:
 
     def __init__(self, protocol, host, port, webContext, username, password,
-                 sslContext=None, verifyCerts=True, accept=None):
+                 sslContext=None, verifyCerts=True, accept=None,
+                 parseInt=decimal.Decimal):
         self.protocol = protocol
+        self.parseInt = parseInt
         self.host = host
         self.port = port
         self.webContext = webContext
@@ -339,6 +436,8 @@ class HttpConnection:
 
     def __init__(self, template):
         self.template = template
+        self.response = None
+        self.requestCount = 0
         if template.protocol.lower() == "http":
             self.conn = httplib.HTTPConnection(template.host, template.port)
         elif template.protocol.lower() == "https":
@@ -369,6 +468,27 @@ class HttpConnection:
         if self.conn:
             self.conn.close()
 
+    def isIdle(self):
+        """Returns True if the last response was fully read so the connection
+         can be used for another request."""
+        return self.response is None or self.response.isclosed()
+
+    def drain(self):
+        """Reads the remainder of the last response."""
+        if not self.isIdle():
+            self.response.read()
+
+    def _isDropped(self):
+        """Returns True if the server closed the idle connection, an idle
+         connection only becomes readable when the server closes it."""
+        sock = self.conn.sock
+        if sock is None:
+            return False
+        try:
+            return bool(select.select([sock], [], [], 0)[0])
+        except (ValueError, socket.error):
+            return True
+
     def post(self, uri, data={}):
         return self.send(uri, 'POST', data)
 
@@ -391,15 +511,36 @@ class HttpConnection:
             start = time.time()
             payload = json.dumps(data).encode('utf8') if data else None
             logger.trace("%s: %s, %s", method, url, payload)
-            self.conn.request(method, url, payload, self.template.headers)
+            if self.requestCount > 0 and self._isDropped():
+                logger.debug("Reconnecting as the server closed the idle "
+                             "connection.")
+                self.conn.close()
+            try:
+                self.conn.request(method, url, payload, self.template.headers)
+            except socket.timeout:
+                raise
+            except socket.error as e:
+                # The request was not completely written so the server did
+                # not act on it, retry once using a new connection.  Errors
+                # after this point are never retried as the request may
+                # already have been executed.
+                if self.requestCount == 0:
+                    raise
+                logger.debug("Reconnecting after error on reused connection: "
+                             "%s", e)
+                self.conn.close()
+                self.conn.request(method, url, payload, self.template.headers)
             response = self.conn.getresponse()
+            self.requestCount += 1
+            self.response = response
             duration = time.time() - start
             logger.debug("Roundtrip Duration: %.3f seconds", duration)
         except Exception as e:
             raise InterfaceError(
                 REST_ERROR, 'Error accessing {}.  ERROR:  {}'.format(url, e))
         if response.status < 300:
-            return pulljson.JSONPullParser(response)
+            return pulljson.JSONPullParser(
+                response, parseInt=self.template.parseInt)
         if response.status < 400:
             raise InterfaceError(
                 response.status,
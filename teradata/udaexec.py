@@ -36,6 +36,7 @@ import getpass
 import subprocess
 import collections
 import codecs
+import functools
 from .util import toUnicode
 from . import tdodbc, util, api, datatypes
 from . import tdrest  # @UnresolvedImport
@@ -82,6 +83,7 @@ class UdaExec:
                  configEncoding="utf8", parseCmdLineArgs=True,
                  gitPath="${gitPath}", production="${production}",
                  odbcLibPath="${odbcLibPath}",
+                 odbcPooling="${odbcPooling}",
                  dataTypeConverter=datatypes.DefaultDataTypeConverter()):
         """ Initializes the UdaExec framework """
         # Load configuration files.
@@ -120,6 +122,8 @@ class UdaExec:
         self._initQueryBands(self.config.resolve(production, default="false"))
         self._initCheckpoint(checkpointFile)
         self.odbcLibPath = self.config.resolve(odbcLibPath, default="")
+        self.odbcPool = tdodbc.OdbcConnectionPool() if util.booleanValue(
+            self.config.resolve(odbcPooling, default="false")) else None
         self.dataTypeConverter = dataTypeConverter
         logger.info(self)
         logger.debug(self.config)
@@ -165,11 +169,13 @@ class UdaExec:
                                          dataTypeConverter=dataTypeConverter,
                                          **args))
             elif method.lower() == METHOD_ODBC:
+                odbcConnect = self.odbcPool.connect if self.odbcPool else \
+                    tdodbc.connect
                 conn = UdaExecConnection(
-                    self, tdodbc.connect(queryBands=self.queryBands,
-                                         odbcLibPath=self.odbcLibPath,
-                                         dataTypeConverter=dataTypeConverter,
-                                         **args))
+                    self, odbcConnect(queryBands=self.queryBands,
+                                      odbcLibPath=self.odbcLibPath,
+                                      dataTypeConverter=dataTypeConverter,
+                                      **args))
             else:
                 raise api.InterfaceError(
                     api.CONFIG_ERROR,
@@ -183,6 +189,20 @@ class UdaExec:
             logger.exception("Unable to create connection: %s", paramsToLog)
             raise
 
+    def extract(self, query, column, externalDSN=None, partitions=4,
+                params=None, partitionBy="hash", bounds=None, orderBy=None,
+                parallelism=None, processes=False, batchSize=1000, **kwargs):
+        """Extracts the rows of a query in partitions executed concurrently
+         on separate sessions, see util.extract. The remaining arguments are
+         passed to connect, sessions are reused if odbcPooling is
+         enabled."""
+        return util.extract(
+            functools.partial(self.connect, externalDSN, **kwargs), query,
+            column, partitions=partitions, params=params,
+            partitionBy=partitionBy, bounds=bounds, orderBy=orderBy,
+            parallelism=parallelism, processes=processes,
+            batchSize=batchSize)
+
     def checkpoint(self, checkpointName=None):
         """ Sets or clears the current checkpoint."""
         if checkpointName is None:
@@ -810,6 +830,11 @@ class UdaExecCursor:
             return []
         return self.cursor.fetchall()
 
+    def fetchcolumns(self, size=None):
+        if self.skip:
+            return []
+        return self.cursor.fetchcolumns(size)
+
     def nextset(self):
         if self.skip:
             return None
@@ -841,7 +866,10 @@ class UdaExecCursor:
 
 def _getParamsString(params, logParamFrequency=1, logParamCharLimit=80):
     paramsStr = ""
-    if params and logParamFrequency > 0:
+    if params is not None and not hasattr(params, "__len__"):
+        # Parameters streamed from an iterator cannot be read for logging.
+        paramsStr = u", Params: <{}>".format(type(params).__name__)
+    elif params and logParamFrequency > 0:
         if isinstance(params[0], (list, tuple)):
             index = 0
             paramsStr = []
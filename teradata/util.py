@@ -30,9 +30,26 @@ import argparse
 import inspect
 import copy
 import getpass
+import itertools
+import threading
+import heapq
+import collections
+import numbers
+import multiprocessing
+import pickle
+import operator
 from .api import *  # @UnusedWildImport # noqa
 
+if sys.version_info[0] == 2:
+    import Queue as queue  # @UnresolvedImport #@UnusedImport
+else:
+    import queue  # @UnresolvedImport @UnusedImport @Reimport
+
 INVALID_ARGUMENT = "INVALID_ARGUMENT"
+EXTRACT_ERROR = "EXTRACT_ERROR"
+
+# The messages sent by partitioned extract workers.
+EXTRACT_COLUMNS, EXTRACT_ROWS, EXTRACT_DONE, EXTRACT_ERROR_MSG = range(0, 4)
 
 # Create new trace log level
 TRACE = 5
@@ -84,6 +101,16 @@ def booleanValue(value):
     return retval
 
 
+def columnConverter(converter, dbType, dataType, typeCode):
+    """Returns the function the converter uses for the values of a column,
+     including nulls, falling back to convertValue for converters that do not
+     implement columnConverter."""
+    if hasattr(converter, "columnConverter"):
+        return converter.columnConverter(dbType, dataType, typeCode)
+    return lambda value: converter.convertValue(
+        dbType, dataType, typeCode, value)
+
+
 class Cursor:
 
     """An abstract cursor for encapsulating shared functionality of connection
@@ -98,8 +125,17 @@ class Cursor:
         self.rowcount = -1
         self.description = None
         self.types = None
+        self._converters = None
+        self._converterTypes = None
+        self._rowType = None
+        self._rowTypeColumns = None
         self.iterator = None
         self.rownumber = None
+        self.prefetch = 0
+        # Convert values when they are first read from a row.
+        self.lazyConversion = False
+        # Return rows as immutable tuples of a type created per result set.
+        self.compactRows = False
 
     def callproc(self, procname, params):
         # Abstract method, defined by convention only
@@ -122,20 +158,119 @@ class Cursor:
     def fetchmany(self, size=None):
         if size is None:
             size = self.arraysize
-        rows = []
-        count = 0
-        for row in self:
-            rows.append(row)
-            count += 1
-            if count == size:
-                break
-        return rows
+        return self._fetchRows(size)
 
     def fetchall(self):
         rows = []
-        for row in self:
-            rows.append(row)
-        return rows
+        size = max(self.arraysize, 1)
+        while True:
+            block = self._fetchRows(size)
+            rows.extend(block)
+            if len(block) < size:
+                return rows
+
+    def fetchcolumns(self, size=None):
+        """Fetches the next set of rows (arraysize by default) and returns a
+         list with the values of each column. Integer and float columns are
+         returned as arrays (NumPy arrays if NumPy is installed) or as lists
+         if they contain nulls, other columns as lists of converted
+         values."""
+        if size is None:
+            size = self.arraysize
+        columns = [[] for t in self.types] if self.description else []
+        if self.iterator and columns:
+            count = 0
+            for values in itertools.islice(self.iterator, size):
+                for column, value in zip(columns, values):
+                    column.append(value)
+                count += 1
+            self._advance(count)
+        return [self._createColumn(col, values)
+                for col, values in enumerate(columns)]
+
+    def _advance(self, count):
+        """Moves rownumber past count rows fetched at once."""
+        if count:
+            self.rownumber = count - 1 if self.rownumber is None else \
+                self.rownumber + count
+
+    def _createColumn(self, col, values):
+        # Imported here as datatypes imports this module.
+        from . import datatypes
+        dataType, typeCode = self.types[col]
+        convertArray = getattr(self.converter, "convertArray", None)
+        if convertArray is not None:
+            return convertArray(self.dbType, dataType, typeCode, values)
+        arrayType = datatypes.columnArrayType(dataType)
+        if arrayType is not None:
+            return datatypes.numericColumn(arrayType, values)
+        return list(self._convertColumn(col, values))
+
+    def _fetchRows(self, size):
+        """Fetches up to size rows, backends override this to read the rows
+         in bulk."""
+        block = list(itertools.islice(self.iterator, size)) \
+            if self.iterator and size > 0 else []
+        return self._createRows(list(zip(*block)), len(block))
+
+    def _createRows(self, columns, count):
+        """Creates the rows for count fetched rows from the raw values of each
+         column, the values are converted a column at a time with the
+         converter's convertColumn."""
+        if not count:
+            return []
+        rowNum = 1 if self.rownumber is None else self.rownumber + 2
+        self._advance(count)
+        if self.lazyConversion:
+            converters = self._columnConverters()
+            return [LazyRow(self.columns, list(values), rowNum + i,
+                            converters)
+                    for i, values in enumerate(zip(*columns))]
+        columns = [self._convertColumn(col, values)
+                   for col, values in enumerate(columns)]
+        if self.compactRows:
+            return list(map(self._compactRowType(), zip(*columns)))
+        return [Row(self.columns, list(values), rowNum + i)
+                for i, values in enumerate(zip(*columns))]
+
+    def _compactRowType(self):
+        """Returns the row type of the current result set, it is created once
+         per result set."""
+        if self._rowTypeColumns is not self.columns:
+            self._rowType = createRowType(self.columns)
+            self._rowTypeColumns = self.columns
+        return self._rowType
+
+    def _convertColumn(self, col, values):
+        convertColumn = getattr(self.converter, "convertColumn", None)
+        if convertColumn is not None:
+            dataType, typeCode = self.types[col]
+            return convertColumn(self.dbType, dataType, typeCode, values)
+        return list(map(self._columnConverters()[col], values))
+
+    def _columnConverters(self):
+        """Returns the functions converting each column of the current result
+         set, they are looked up once per result set rather than per value."""
+        if self._converterTypes is not self.types:
+            self._converters = tuple(
+                columnConverter(self.converter, self.dbType, dataType,
+                                typeCode)
+                for dataType, typeCode in self.types)
+            self._converterTypes = self.types
+        return self._converters
+
+    def _prefetchRows(self, iterator):
+        """Returns an iterator that reads ahead up to prefetch batches of
+         arraysize rows on a background thread if prefetching is enabled."""
+        if self.prefetch > 0:
+            return PrefetchIterator(iterator, self.arraysize, self.prefetch)
+        return iterator
+
+    def _stopPrefetch(self):
+        """Stops reading ahead, this must be called before the statement or
+         response the rows are read from is used by the cursor itself."""
+        if isinstance(self.iterator, PrefetchIterator):
+            self.iterator.close()
 
     def nextset(self):
         # Abstract method, defined by convention only
@@ -157,9 +292,13 @@ class Cursor:
             else:
                 self.rownumber += 1
             values = next(self.iterator)
-            for i in range(0, len(values)):
-                values[i] = self.converter.convertValue(
-                    self.dbType, self.types[i][0], self.types[i][1], values[i])
+            if self.lazyConversion:
+                return LazyRow(self.columns, list(values),
+                               self.rownumber + 1, self._columnConverters())
+            values = [convert(value) for convert, value in
+                      zip(self._columnConverters(), values)]
+            if self.compactRows:
+                return self._compactRowType()(values)
             row = Row(self.columns, values, self.rownumber + 1)
             # logger.debug("%s", row)
             return row
@@ -175,6 +314,357 @@ class Cursor:
         self.close()
 
 
+class PrefetchIterator (object):
+
+    """Reads the rows of a result set into a bounded queue of batches on a
+     background thread so the next batch is fetched while the previous one
+     is processed. The thread waits while the queue is full."""
+
+    def __init__(self, iterator, batchSize, queueSize):
+        self.queue = queue.Queue(queueSize)
+        self.batch = iter(())
+        self.done = False
+        self.closed = False
+        self.thread = threading.Thread(
+            target=self._run, args=(iterator, batchSize), name="Prefetch")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self, iterator, batchSize):
+        # Iterators that can read a batch at once, e.g. the rows of a REST
+        # response, are read with nextBatch.
+        nextBatch = getattr(iterator, "nextBatch", None)
+        try:
+            while not self.closed:
+                batch = nextBatch(batchSize) if nextBatch else \
+                    list(itertools.islice(iterator, batchSize))
+                if not batch:
+                    break
+                self._put(batch)
+            self._put(None)
+        except Exception as e:
+            self._put(e)
+
+    def _put(self, item):
+        if not self.closed:
+            self.queue.put(item)
+
+    def close(self):
+        """Stops the background thread, discarding the rows it has read."""
+        self.closed = True
+        self.done = True
+        self.batch = iter(())
+        while self.thread.is_alive():
+            # Unblock the thread if it is waiting for room in the queue.
+            try:
+                self.queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self.thread.join()
+        # Wake a reader on another thread that is waiting for a batch.
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            values = next(self.batch, None)
+            if values is not None:
+                return values
+            if self.done:
+                raise StopIteration()
+            item = self.queue.get()
+            if item is None or isinstance(item, Exception):
+                self.done = True
+                if item is None:
+                    raise StopIteration()
+                raise item
+            self.batch = iter(item)
+
+    def next(self):
+        return self.__next__()
+
+
+def extract(connect, query, column, partitions=4, params=None,
+            partitionBy="hash", bounds=None, orderBy=None, parallelism=None,
+            processes=False, batchSize=1000, queueSize=4):
+    """Splits a query into partitions that are executed concurrently on
+     separate sessions and returns a PartitionedExtract that iterates over
+     the rows of all partitions. connect is called by each worker to get a
+     connection (e.g. a pool's connect method so sessions are reused).
+
+     With partitionBy="hash" rows are assigned to partitions by
+     HASHAMP(HASHBUCKET(HASHROW(column))), with partitionBy="range" by
+     ranges of column values split at bounds (partitions - 1 ascending
+     values). Bounds default to evenly spaced values between the minimum
+     and maximum of a numeric column, rounded down for integer columns,
+     and must be given for other columns (e.g. DATE or TIMESTAMP). If
+     orderBy (a column name) is given, each partition is sorted by it in
+     ascending order and the partitions are merged, otherwise rows are
+     returned in the order partitions produce them. Partitions run on
+     parallelism (by default partitions) worker threads, or worker
+     processes if processes is True in which case connect must be usable
+     in the child process. Merging needs a worker per partition, each of
+     which waits while queueSize of its batches are waiting to be
+     merged."""
+    if partitionBy not in ("hash", "range"):
+        raise InterfaceError(
+            INVALID_ARGUMENT, "Unknown partitionBy: {}".format(partitionBy))
+    params = list(params or ())
+    if partitionBy == "range" and bounds is None:
+        bounds = _rangeBounds(connect, query, column, partitions, params)
+    queries = _partitionQueries(
+        query, column, partitions, params, partitionBy, bounds, orderBy)
+    if orderBy is not None and parallelism is not None and \
+            parallelism < len(queries):
+        raise InterfaceError(
+            INVALID_ARGUMENT, "orderBy requires a worker per partition, "
+            "parallelism must be at least {}".format(len(queries)))
+    return PartitionedExtract(
+        connect, queries, parallelism or len(queries), processes, batchSize,
+        queueSize, orderBy)
+
+
+def _rangeBounds(connect, query, column, partitions, params):
+    """Returns bounds that split the range of a numeric column's values into
+     evenly sized partitions, integer columns are split at integers."""
+    # Imported here as datatypes imports this module.
+    from . import datatypes
+    with connect() as conn:
+        with conn.cursor() as cursor:
+            low, high = cursor.execute(
+                "SELECT MIN({0}), MAX({0}) FROM ({1}) AS extract_bounds"
+                .format(column, query), params or None).fetchone()
+            dataType = cursor.types[0][0]
+    if low is None or low == high:
+        return []
+    if isinstance(low, bool) or not isinstance(low, numbers.Number):
+        raise InterfaceError(
+            INVALID_ARGUMENT, "Bounds must be given to partition {} column "
+            "{} by range.".format(dataType, column))
+    if dataType.upper() in datatypes.INTEGER_TYPES or \
+            isinstance(low, numbers.Integral):
+        low, high = int(low), int(high)
+        return sorted(set(low + (high - low) * i // partitions
+                          for i in range(1, partitions)) - set([low]))
+    return [low + (high - low) * i / partitions
+            for i in range(1, partitions)]
+
+
+def _partitionQueries(query, column, partitions, params, partitionBy,
+                      bounds, orderBy):
+    """Returns the query and parameters for each partition."""
+    sql = "SELECT * FROM ({}) AS extract_partition WHERE ".format(query)
+    order = "" if orderBy is None else " ORDER BY {}".format(orderBy)
+    if partitionBy == "hash":
+        return [(sql + "HASHAMP(HASHBUCKET(HASHROW({}))) MOD {} = {}".format(
+            column, partitions, i) + order, params)
+            for i in range(0, partitions)]
+    queries = []
+    for i in range(0, len(bounds) + 1):
+        if i == 0:
+            where = "{0} < ? OR {0} IS NULL".format(column)
+            bound = bounds[:1]
+        elif i == len(bounds):
+            where = "{} >= ?".format(column)
+            bound = bounds[-1:]
+        else:
+            where = "{0} >= ? AND {0} < ?".format(column)
+            bound = bounds[i - 1:i + 1]
+        if not bounds:
+            where = "1 = 1"
+        queries.append((sql + where + order, params + bound))
+    return queries
+
+
+def _acquire(credits, stop):
+    """Waits for a credit to send a batch, returns False if stopped."""
+    while not credits.acquire(False):
+        if stop.wait(0.01):
+            return False
+    return True
+
+
+def _extractPartitions(connect, tasks, messages, stop, batchSize,
+                       processes, credits):
+    """Executes the partition queries taken from tasks on a single
+     connection and sends their rows to messages in batches. If credits is
+     given, each batch takes one of its partition's credits."""
+    partition = None
+    try:
+        with connect() as conn:
+            with conn.cursor() as cursor:
+                while not stop.is_set():
+                    task = tasks.get()
+                    if task is None:
+                        break
+                    partition, (query, params) = task
+                    cursor.execute(query, params or None)
+                    messages.put(
+                        (partition, EXTRACT_COLUMNS, cursor.description))
+                    while not stop.is_set():
+                        rows = cursor.fetchmany(batchSize)
+                        if not rows or credits is not None and \
+                                not _acquire(credits[partition], stop):
+                            break
+                        messages.put((partition, EXTRACT_ROWS,
+                                      [list(row) for row in rows]))
+                    messages.put((partition, EXTRACT_DONE, None))
+    except Exception as e:
+        if processes:
+            try:
+                pickle.dumps(e)
+            except Exception:
+                e = InterfaceError(EXTRACT_ERROR, str(e))
+        messages.put((partition, EXTRACT_ERROR_MSG, e))
+
+
+class PartitionedExtract (object):
+
+    """Iterates over the rows of partition queries executed by worker
+     threads or processes. The workers wait while queueSize batches per
+     worker are waiting to be read, or per partition if the partitions are
+     merged, close stops them."""
+
+    def __init__(self, connect, queries, parallelism, processes, batchSize,
+                 queueSize, orderBy):
+        # Merged partitions are read in turn, so each partition waits for
+        # its own batches to be merged rather than for room in the queue.
+        size = 0 if orderBy is not None else queueSize * parallelism
+        if processes:
+            self.tasks = multiprocessing.Queue()
+            self.messages = multiprocessing.Queue(size)
+            self.stop = multiprocessing.Event()
+            semaphore = multiprocessing.Semaphore
+            worker = multiprocessing.Process
+        else:
+            self.tasks = queue.Queue()
+            self.messages = queue.Queue(size)
+            self.stop = threading.Event()
+            semaphore = threading.Semaphore
+            worker = threading.Thread
+        self.credits = None
+        if orderBy is not None:
+            self.credits = [semaphore(queueSize) for q in queries]
+        self.partitions = len(queries)
+        self.columns = None
+        self.description = None
+        self.rowNum = 0
+        self.done = set()
+        self.buffers = [collections.deque() for q in queries]
+        self.closed = False
+        for task in enumerate(queries):
+            self.tasks.put(task)
+        self.workers = []
+        for i in range(0, min(parallelism, self.partitions)):
+            self.tasks.put(None)
+            w = worker(target=_extractPartitions, name="Extract",
+                       args=(connect, self.tasks, self.messages, self.stop,
+                             batchSize, processes, self.credits))
+            w.daemon = True
+            w.start()
+            self.workers.append(w)
+        if orderBy is None:
+            self.iterator = self._unordered()
+        else:
+            self.iterator = self._ordered(orderBy)
+
+    def _receive(self):
+        """Returns the next message from the workers, raising errors."""
+        partition, kind, value = self.messages.get()
+        if kind == EXTRACT_ERROR_MSG:
+            self.close()
+            raise value
+        elif kind == EXTRACT_COLUMNS:
+            if self.columns is None:
+                self.description = value
+                self.columns = dict((d[0].lower(), i)
+                                    for i, d in enumerate(value))
+        elif kind == EXTRACT_DONE:
+            self.done.add(partition)
+        return partition, kind, value
+
+    def _unordered(self):
+        while len(self.done) < self.partitions:
+            partition, kind, value = self._receive()
+            if kind == EXTRACT_ROWS:
+                for values in value:
+                    yield values
+
+    def _partitionRows(self, partition):
+        batches = self.buffers[partition]
+        while True:
+            while not batches:
+                if partition in self.done:
+                    return
+                # Buffer other partitions' batches until this one has some,
+                # their credits limit how many are waiting.
+                p, kind, value = self._receive()
+                if kind == EXTRACT_ROWS:
+                    self.buffers[p].append(value)
+            batch = batches.popleft()
+            self.credits[partition].release()
+            for values in batch:
+                yield values
+
+    def _sortedRows(self, partition, index):
+        # Nulls sort first, the partition number breaks ties.
+        for values in self._partitionRows(partition):
+            yield (values[index] is not None, values[index], partition,
+                   values)
+
+    def _ordered(self, orderBy):
+        # Wait for the column names to find the sort column.
+        while self.columns is None:
+            p, kind, value = self._receive()
+            if kind == EXTRACT_ROWS:
+                self.buffers[p].append(value)
+        index = self.columns[orderBy.lower()]
+        for key in heapq.merge(*[self._sortedRows(p, index)
+                                 for p in range(0, self.partitions)]):
+            yield key[3]
+
+    def close(self):
+        """Stops the workers, discarding the rows that haven't been read."""
+        if self.closed:
+            return
+        self.closed = True
+        self.stop.set()
+        while any(w.is_alive() for w in self.workers):
+            # Unblock workers waiting for room in the queue.
+            try:
+                self.messages.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for w in self.workers:
+            w.join()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            values = next(self.iterator)
+        except StopIteration:
+            self.close()
+            raise
+        self.rowNum += 1
+        return Row(self.columns, values, self.rowNum)
+
+    def next(self):
+        return self.__next__()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, t, value, traceback):
+        self.close()
+
+
 class Row (object):
 
     """Represents a table row."""
@@ -221,6 +711,107 @@ class Row (object):
         return self.values.__iter__()
 
 
+class LazyRow (Row):
+
+    """A table row whose values are converted when they are first read,
+     created by cursors with lazyConversion enabled. Reading a few columns
+     of a wide row only pays for converting those columns."""
+
+    def __init__(self, columns, values, rowNum, converters):
+        super(Row, self).__setattr__("columns", columns)
+        super(Row, self).__setattr__("rowNum", rowNum)
+        super(Row, self).__setattr__("_values", values)
+        super(Row, self).__setattr__("_pending", list(converters))
+
+    @property
+    def values(self):
+        for index in range(0, len(self._values)):
+            self._convert(index)
+        return self._values
+
+    def _convert(self, index):
+        convert = self._pending[index]
+        value = self._values[index]
+        if convert is not None:
+            value = convert(value)
+            self._values[index] = value
+            self._pending[index] = None
+        return value
+
+    def __getattr__(self, name):
+        try:
+            return self._convert(self.columns[name.lower()])
+        except KeyError:
+            raise AttributeError("No such attribute: " + name)
+
+    def __setattr__(self, name, value):
+        try:
+            self[self.columns[name.lower()]] = value
+        except KeyError:
+            raise AttributeError("No such attribute: " + name)
+
+    def __setitem__(self, key, value):
+        try:
+            self._pending[key] = None
+        except TypeError:
+            key = self.columns[key.lower()]
+            self._pending[key] = None
+        self._values[key] = value
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.values[key]
+        try:
+            return self._convert(key)
+        except TypeError:
+            return self._convert(self.columns[key.lower()])
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return (self._convert(index) for index in range(0, len(self._values)))
+
+
+class CompactRow (tuple):
+
+    """Base class of the compact row types created by createRowType. Values
+     can be read by index and by case-insensitive column name or attribute,
+     but rows are immutable and do not have a row number."""
+
+    __slots__ = ()
+
+    _columns = {}
+
+    def __getattr__(self, name):
+        try:
+            return tuple.__getitem__(self, self._columns[name.lower()])
+        except KeyError:
+            raise AttributeError("No such attribute: " + name)
+
+    def __getitem__(self, key):
+        try:
+            return tuple.__getitem__(self, key)
+        except TypeError:
+            return tuple.__getitem__(self, self._columns[key.lower()])
+
+    def __str__(self):
+        return "Row: [" + ", ".join(map(str, self)) + "]"
+
+
+def createRowType(columns):
+    """Creates a CompactRow sub-class for the rows of a result set, columns
+     maps the lower case column names to their index. The lower case names
+     are read with precomputed accessors, other spellings through a
+     case-insensitive lookup. Names of tuple and CompactRow attributes (e.g.
+     count or index) keep their meaning and are only read by key."""
+    attributes = {"__slots__": (), "_columns": columns}
+    for name, index in columns.items():
+        if not name.startswith("__") and not hasattr(CompactRow, name):
+            attributes[name] = property(operator.itemgetter(index))
+    return type("CompactRow", (CompactRow, ), attributes)
+
+
 class OutParams (object):
 
     """ Represents a set of Output parameters. """
@@ -346,6 +937,19 @@ def sqlsplit(sql, delimiter=";"):
         yield sql
 
 
+def chunksplit(iterable, size):
+    """A generator function for splitting an iterable into lists of at most
+     size elements without reading the entire iterable into memory."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
 def linesplit(sql, newline="\n"):
     """A generator function for splitting out SQL statements according to the
      specified delimiter. Ignores delimiter when in strings or comments."""
@@ -0,0 +1,792 @@
+"""A stand-in for the ODBC driver manager library that serves synthetic
+ result sets so tdodbc can be tested without a Teradata ODBC driver."""
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 by Teradata
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import ctypes
+import itertools
+import logging
+import re
+import threading
+import time
+import traceback
+
+from teradata import tdodbc, util
+from teradata.tdodbc import (
+    SQLWCHAR, SQLLEN, SQLULEN, SQLINTEGER, SQLDOUBLE, SQL_SUCCESS,
+    SQL_SUCCESS_WITH_INFO, SQL_ERROR, SQL_INVALID_HANDLE, SQL_NEED_DATA,
+    SQL_NO_DATA, SQL_HANDLE_ENV, SQL_HANDLE_DBC, SQL_HANDLE_STMT,
+    SQL_NULL_DATA, SQL_NTS, SQL_DATA_AT_EXEC, SQL_C_BINARY, SQL_C_DOUBLE,
+    SQL_WVARCHAR, SQL_VARBINARY, SQL_DOUBLE, SQL_C_SBIGINT, SQL_CLOSE,
+    SQL_UNBIND, SQL_RESET_PARAMS, SQL_PARAM_SUCCESS, SQL_PARAM_ERROR,
+    SQL_PARAM_UNUSED)
+
+logger = logging.getLogger(__name__)
+
+SQL_ATTR_PARAMSET_SIZE = tdodbc.SQL_ATTR_PARAMSET_SIZE
+SQL_ATTR_PARAMS_PROCESSED_PTR = tdodbc.SQL_ATTR_PARAMS_PROCESSED_PTR
+SQL_ATTR_PARAM_STATUS_PTR = tdodbc.SQL_ATTR_PARAM_STATUS_PTR
+SQL_DIAG_ROW_NUMBER = tdodbc.SQL_DIAG_ROW_NUMBER
+SQL_DESC_TYPE_NAME = tdodbc.SQL_DESC_TYPE_NAME
+SQL_ATTR_ASYNC_ENABLE = tdodbc.SQL_ATTR_ASYNC_ENABLE
+SQL_STILL_EXECUTING = tdodbc.SQL_STILL_EXECUTING
+SQL_ATTR_ROW_ARRAY_SIZE = tdodbc.SQL_ATTR_ROW_ARRAY_SIZE
+SQL_ATTR_ROWS_FETCHED_PTR = tdodbc.SQL_ATTR_ROWS_FETCHED_PTR
+
+# The column size reported for types that aren't given a size.
+DEFAULT_COLUMN_SIZES = {"BYTEINT": 4, "SMALLINT": 6, "INTEGER": 11,
+                        "BIGINT": 20, "FLOAT": 22, "DATE": 10, "TIME": 15,
+                        "TIMESTAMP": 26, "DECIMAL": 20, "NUMBER": 40,
+                        "CLOB": 2097088000, "BLOB": 2097088000}
+DEFAULT_COLUMN_SIZE = 255
+# The description of parameters if not given by the matching result.
+DEFAULT_PARAM_TYPE = (SQL_WVARCHAR, 32000)
+
+if ctypes.sizeof(SQLWCHAR) == 1:
+    ENCODING = "utf8"
+elif ctypes.sizeof(SQLWCHAR) == 2:
+    ENCODING = "utf-16-le"
+else:
+    ENCODING = "utf-32-le"
+CHAR_SIZE = ctypes.sizeof(SQLWCHAR)
+
+
+class OdbcStubError (Exception):
+
+    """Raised by result row functions to make a statement or an individual
+     parameter set fail with the given error."""
+
+    def __init__(self, code, msg, sqlState="HY000"):
+        Exception.__init__(self, code, msg)
+        self.code = code
+        self.msg = msg
+        self.sqlState = sqlState
+
+
+class Column (object):
+
+    """Describes a column of a synthetic result set."""
+
+    def __init__(self, name, typeName="VARCHAR", size=None, decimalDigits=0,
+                 nullable=1):
+        self.name = name
+        self.typeName = typeName
+        self.size = DEFAULT_COLUMN_SIZES.get(typeName, DEFAULT_COLUMN_SIZE) \
+            if size is None else size
+        self.decimalDigits = decimalDigits
+        self.nullable = nullable
+        if typeName in ("BLOB", "BYTE", "VARBYTE"):
+            self.sqlType = SQL_VARBINARY
+        elif typeName == "FLOAT":
+            self.sqlType = SQL_DOUBLE
+        else:
+            self.sqlType = SQL_WVARCHAR
+
+
+class StubResult (object):
+
+    """A synthetic result for statements matching a pattern. rows is a
+     sequence of rows or a function that is passed a parameter set and
+     returns the rows for it, it may raise OdbcStubError to fail the
+     statement or parameter set."""
+
+    def __init__(self, pattern, columns=None, rows=None, rowCount=None,
+                 paramTypes=None):
+        self.pattern = re.compile(pattern, re.IGNORECASE | re.DOTALL)
+        self.columns = [c if isinstance(c, Column) else Column(*c)
+                        for c in columns or ()]
+        self.rows = rows
+        self.rowCount = rowCount
+        self.paramTypes = paramTypes
+
+    def execute(self, paramSet):
+        if callable(self.rows):
+            return self.rows(paramSet)
+        return self.rows or ()
+
+
+class OdbcStub (object):
+
+    """Implements the ODBC functions used by tdodbc in Python. Pass an
+     instance as odbcLibPath to connect. Statements are matched against the
+     results added with addResult, every executed statement and its
+     parameter sets are recorded in executed unless recordParams is False.
+     """
+
+    def __init__(self, connectDelay=0, executeDelay=0, recordParams=True,
+                 cancelDelay=0):
+        self.connectDelay = connectDelay
+        self.executeDelay = executeDelay
+        self.cancelDelay = cancelDelay
+        self.cancelled = []
+        # Whether SQLGetData can read the rows of a rowset (SQL_GD_BLOCK).
+        self.blockGetData = True
+        self.recordParams = recordParams
+        self.results = []
+        self.executed = []
+        self.connectStrings = []
+        self.transactions = []
+        self.handles = {}
+        self.handleIds = itertools.count(1000)
+        self.sessionIds = itertools.count(1000)
+        self.lock = threading.Lock()
+        self.functions = {}
+        self.local = threading.local()
+        self.addResult(r"SELECT\s+SESSION\s*$", [Column("SESSION", "INTEGER")],
+                       lambda params: [(self.local.conn.session, )])
+
+    def addResult(self, pattern, columns=None, rows=None, rowCount=None,
+                  paramTypes=None):
+        """Adds a result for statements matching the regular expression
+         pattern. columns is a list of Column objects or (name, typeName,
+         size) tuples, paramTypes is a list of (sqlType, size) tuples."""
+        self.results.insert(0, StubResult(pattern, columns, rows, rowCount,
+                                          paramTypes))
+
+    def __getattr__(self, name):
+        if not name.startswith("SQL"):
+            raise AttributeError(name)
+        impl = getattr(self, "_" + name, None)
+        if impl is None:
+            raise AttributeError(name)
+        function = self.functions.get(name)
+        if function is None:
+            function = self.functions[name] = _Function(name, impl, self)
+        return function
+
+    def _allocHandle(self, handle):
+        with self.lock:
+            handleId = next(self.handleIds)
+            self.handles[handleId] = handle
+        return handleId
+
+    def _handle(self, handleId):
+        return self.handles.get(handleId)
+
+    def _match(self, query):
+        for result in self.results:
+            if result.pattern.match(query.strip()):
+                return result
+        return None
+
+    # Environment and connection functions.
+
+    def _SQLAllocHandle(self, handleType, inputHandle, outputHandle):
+        if handleType == SQL_HANDLE_ENV:
+            if self.connectDelay:
+                time.sleep(self.connectDelay)
+            handle = _Environment()
+        elif handleType == SQL_HANDLE_DBC:
+            # Like a driver manager, require an ODBC 3 environment.
+            env = self._handle(inputHandle)
+            if not isinstance(env, _Environment):
+                return SQL_INVALID_HANDLE
+            if tdodbc.SQL_ATTR_ODBC_VERSION not in env.attributes:
+                return env.error("HY010", "Function sequence error.", 0)
+            handle = _Connection()
+        elif handleType == SQL_HANDLE_STMT:
+            conn = self._handle(inputHandle)
+            if not isinstance(conn, _Connection):
+                return SQL_INVALID_HANDLE
+            handle = _Statement(conn)
+        else:
+            return SQL_ERROR
+        outputHandle[0] = self._allocHandle(handle)
+        return SQL_SUCCESS
+
+    def _SQLFreeHandle(self, handleType, handleId):
+        with self.lock:
+            handle = self.handles.pop(handleId, None)
+        return SQL_INVALID_HANDLE if handle is None else SQL_SUCCESS
+
+    def _SQLSetEnvAttr(self, hEnv, attribute, value, length):
+        self._handle(hEnv).attributes[attribute] = value or 0
+        return SQL_SUCCESS
+
+    def _SQLDriverConnectW(self, hDbc, hWnd, connectString, length, outString,
+                           outLength, outLengthPtr, completion):
+        conn = self._handle(hDbc)
+        connectString = _readString(_address(connectString), length)
+        params = dict(p.split("=", 1) for p in connectString.split(";")
+                      if "=" in p)
+        if self.connectDelay:
+            time.sleep(self.connectDelay)
+        if not params.get("DBCNAME") and not params.get("DSN"):
+            return conn.error("08001", "No system name was specified.", 0)
+        with self.lock:
+            self.connectStrings.append(connectString)
+            conn.session = next(self.sessionIds)
+        conn.connected = True
+        return SQL_SUCCESS
+
+    def _SQLDisconnect(self, hDbc):
+        conn = self._handle(hDbc)
+        if not conn.connected:
+            return conn.error("08003", "Connection not open.", 0)
+        conn.connected = False
+        return SQL_SUCCESS
+
+    def _SQLSetConnectAttr(self, hDbc, attribute, value, length):
+        self._handle(hDbc).attributes[attribute] = value or 0
+        return SQL_SUCCESS
+
+    def _SQLGetConnectAttr(self, hDbc, attribute, value, length, outLength):
+        conn = self._handle(hDbc)
+        if attribute == tdodbc.SQL_ATTR_CONNECTION_DEAD:
+            SQLINTEGER.from_address(value).value = 0 if conn.connected else 1
+        else:
+            SQLINTEGER.from_address(value).value = conn.attributes.get(
+                attribute, 0)
+        return SQL_SUCCESS
+
+    def _SQLGetInfoW(self, hDbc, infoType, value, bufferLength,
+                     stringLength):
+        conn = self._handle(hDbc)
+        if infoType != tdodbc.SQL_GETDATA_EXTENSIONS:
+            return conn.error("HY096", "Information type out of range.", 0)
+        ctypes.c_uint.from_address(value).value = \
+            tdodbc.SQL_GD_BLOCK if self.blockGetData else 0
+        return SQL_SUCCESS
+
+    def _SQLEndTran(self, handleType, handleId, completionType):
+        self.transactions.append(completionType)
+        return SQL_SUCCESS
+
+    # Diagnostic functions.
+
+    def _SQLGetDiagRecW(self, handleType, handleId, recNumber, sqlState,
+                        nativeError, messageText, bufferLength, textLength):
+        handle = self._handle(handleId)
+        if handle is None:
+            return SQL_INVALID_HANDLE
+        if recNumber > len(handle.diagnostics):
+            return SQL_NO_DATA
+        state, message, code, rowNumber = handle.diagnostics[recNumber - 1]
+        _writeString(_address(sqlState), 6 * CHAR_SIZE, state)
+        nativeError[0] = code
+        textLength[0] = len(message)
+        _writeString(_address(messageText), bufferLength * CHAR_SIZE,
+                     message)
+        return SQL_SUCCESS
+
+    def _SQLGetDiagFieldW(self, handleType, handleId, recNumber,
+                          diagIdentifier, diagInfo, bufferLength,
+                          stringLength):
+        handle = self._handle(handleId)
+        if handle is None:
+            return SQL_INVALID_HANDLE
+        if recNumber > len(handle.diagnostics) or \
+                diagIdentifier != SQL_DIAG_ROW_NUMBER:
+            return SQL_NO_DATA
+        SQLLEN.from_address(diagInfo).value = \
+            handle.diagnostics[recNumber - 1][3]
+        return SQL_SUCCESS
+
+    # Statement functions.
+
+    def _SQLSetStmtAttr(self, hStmt, attribute, value, length):
+        self._handle(hStmt).attributes[attribute] = value or 0
+        return SQL_SUCCESS
+
+    def _SQLFreeStmt(self, hStmt, option):
+        stmt = self._handle(hStmt)
+        if option == SQL_CLOSE:
+            stmt.results = []
+            stmt.result = None
+        elif option == SQL_UNBIND:
+            stmt.bindings = {}
+        elif option == SQL_RESET_PARAMS:
+            stmt.params = {}
+        return SQL_SUCCESS
+
+    def _SQLExecDirectW(self, hStmt, query, length):
+        stmt = self._handle(hStmt)
+        if stmt.attributes.get(SQL_ATTR_ASYNC_ENABLE) and self.executeDelay:
+            # Return SQL_STILL_EXECUTING until executeDelay has elapsed.
+            if stmt.started is None:
+                stmt.started = time.time()
+            if stmt.cancelled:
+                stmt.started = None
+                stmt.cancelled = False
+                return stmt.error(tdodbc.SQL_STATE_OPERATION_CANCELED,
+                                  "Operation canceled.", 0)
+            if time.time() - stmt.started < self.executeDelay:
+                return SQL_STILL_EXECUTING
+            stmt.started = None
+            stmt.query = _readString(_address(query), length)
+            stmt.params = {}
+            return self._execute(stmt, delay=False)
+        stmt.query = _readString(_address(query), length)
+        stmt.params = {}
+        return self._execute(stmt)
+
+    def _SQLPrepareW(self, hStmt, query, length):
+        stmt = self._handle(hStmt)
+        stmt.query = _readString(_address(query), length)
+        return SQL_SUCCESS
+
+    def _SQLNumParams(self, hStmt, paramCount):
+        stmt = self._handle(hStmt)
+        paramCount[0] = len(re.findall(r"\?", re.sub(
+            r"'[^']*'", "", stmt.query)))
+        return SQL_SUCCESS
+
+    def _SQLDescribeParam(self, hStmt, paramNumber, dataType, paramSize,
+                          decimalDigits, nullable):
+        stmt = self._handle(hStmt)
+        paramType = DEFAULT_PARAM_TYPE
+        for statement in _splitStatements(stmt.query):
+            result = self._match(statement)
+            if result is not None and result.paramTypes and \
+                    paramNumber <= len(result.paramTypes):
+                paramType = result.paramTypes[paramNumber - 1]
+                break
+        dataType[0], paramSize[0] = paramType
+        decimalDigits[0] = 0
+        nullable[0] = 1
+        return SQL_SUCCESS
+
+    def _SQLBindParameter(self, hStmt, paramNumber, inputOutputType,
+                          valueType, paramType, columnSize, decimalDigits,
+                          value, bufferLength, lengthPtr):
+        stmt = self._handle(hStmt)
+        stmt.params[paramNumber] = (valueType, value, bufferLength,
+                                    _address(lengthPtr))
+        return SQL_SUCCESS
+
+    def _SQLExecute(self, hStmt):
+        stmt = self._handle(hStmt)
+        stmt.pending = [num for num, param in sorted(stmt.params.items())
+                        if SQLLEN.from_address(param[3]).value ==
+                        SQL_DATA_AT_EXEC]
+        if stmt.pending:
+            stmt.streamed = {}
+            stmt.current = None
+            return SQL_NEED_DATA
+        return self._execute(stmt)
+
+    def _SQLParamData(self, hStmt, token):
+        stmt = self._handle(hStmt)
+        if stmt.pending:
+            stmt.current = stmt.pending.pop(0)
+            stmt.streamed[stmt.current] = []
+            token[0] = stmt.params[stmt.current][1]
+            return SQL_NEED_DATA
+        return self._execute(stmt)
+
+    def _SQLPutData(self, hStmt, data, length):
+        stmt = self._handle(hStmt)
+        if stmt.current is None:
+            return stmt.error("HY010", "Function sequence error.", 0)
+        if length > 0:
+            stmt.streamed[stmt.current].append(ctypes.string_at(data, length))
+        return SQL_SUCCESS
+
+    def _SQLNumResultCols(self, hStmt, columnCount):
+        stmt = self._handle(hStmt)
+        columnCount[0] = len(stmt.result.columns) if stmt.result else 0
+        return SQL_SUCCESS
+
+    def _SQLRowCount(self, hStmt, rowCount):
+        stmt = self._handle(hStmt)
+        rowCount[0] = stmt.result.rowCount if stmt.result else -1
+        return SQL_SUCCESS
+
+    def _SQLDescribeColW(self, hStmt, columnNumber, columnName, bufferLength,
+                         nameLength, dataType, columnSize, decimalDigits,
+                         nullable):
+        column = self._handle(hStmt).result.columns[columnNumber - 1]
+        _writeString(_address(columnName), bufferLength * CHAR_SIZE,
+                     column.name)
+        nameLength[0] = len(column.name)
+        dataType[0] = column.sqlType
+        columnSize[0] = column.size
+        decimalDigits[0] = column.decimalDigits
+        nullable[0] = column.nullable
+        return SQL_SUCCESS
+
+    def _SQLColAttributeW(self, hStmt, columnNumber, fieldIdentifier,
+                          characterAttribute, bufferLength, stringLength,
+                          numericAttribute):
+        column = self._handle(hStmt).result.columns[columnNumber - 1]
+        if fieldIdentifier == SQL_DESC_TYPE_NAME:
+            _writeString(characterAttribute, bufferLength * CHAR_SIZE,
+                         column.typeName)
+        return SQL_SUCCESS
+
+    def _SQLMoreResults(self, hStmt):
+        stmt = self._handle(hStmt)
+        if not stmt.results:
+            stmt.result = None
+            return SQL_NO_DATA
+        stmt.result = stmt.results.pop(0)
+        return SQL_SUCCESS
+
+    def _SQLFetch(self, hStmt):
+        stmt = self._handle(hStmt)
+        if stmt.result is None or stmt.result.rows is None:
+            return stmt.error("24000", "Invalid cursor state.", 0)
+        if stmt.bindings:
+            return self._fetchRowset(stmt)
+        try:
+            row = next(stmt.result.rows)
+        except StopIteration:
+            return SQL_NO_DATA
+        stmt.row = [_Value(v) for v in row]
+        return SQL_SUCCESS
+
+    def _SQLBindCol(self, hStmt, columnNumber, targetType, targetValue,
+                    bufferLength, lengthPtr):
+        self._handle(hStmt).bindings[columnNumber] = (
+            targetType, _address(targetValue), bufferLength,
+            _address(lengthPtr))
+        return SQL_SUCCESS
+
+    def _fetchRowset(self, stmt):
+        """Writes the next rowset into the column-wise bound buffers. Like a
+         driver, values that don't fit are truncated at the end of the
+         buffer, their full length is returned and the fetch succeeds with
+         01004."""
+        rowArraySize = stmt.attributes.get(SQL_ATTR_ROW_ARRAY_SIZE) or 1
+        rows = list(itertools.islice(stmt.result.rows, rowArraySize))
+        fetchedPtr = stmt.attributes.get(SQL_ATTR_ROWS_FETCHED_PTR)
+        if fetchedPtr:
+            SQLULEN.from_address(fetchedPtr).value = len(rows)
+        if not rows:
+            return SQL_NO_DATA
+        stmt.row = None
+        stmt.rowset = rows
+        truncated = False
+        for index, row in enumerate(rows):
+            for columnNumber, (targetType, address, bufferLength,
+                               lengthPtr) in stmt.bindings.items():
+                value = _Value(row[columnNumber - 1])
+                length = SQL_NULL_DATA
+                if value.value is not None:
+                    value.encode(targetType)
+                    length = len(value.data)
+                    terminator = CHAR_SIZE if targetType not in (
+                        SQL_C_BINARY, SQL_C_DOUBLE, SQL_C_SBIGINT) else 0
+                    size = min(length, bufferLength - terminator)
+                    size -= size % (CHAR_SIZE if terminator else 1)
+                    truncated = truncated or size < length
+                    ctypes.memmove(address + index * bufferLength,
+                                   value.data[:size] + b"\0" * terminator,
+                                   size + terminator)
+                SQLLEN.from_address(
+                    lengthPtr + index * ctypes.sizeof(SQLLEN)).value = length
+        if truncated:
+            return stmt.info(tdodbc.SQL_STATE_DATA_TRUNCATED,
+                             "String data, right truncated.")
+        return SQL_SUCCESS
+
+    def _SQLSetPos(self, hStmt, rowNumber, operation, lockType):
+        stmt = self._handle(hStmt)
+        if not self.blockGetData:
+            return stmt.error("HYC00", "Optional feature not implemented.", 0)
+        if operation != tdodbc.SQL_POSITION or not stmt.rowset or \
+                not 0 < rowNumber <= len(stmt.rowset):
+            return stmt.error("HY107", "Row value out of range.", 0)
+        stmt.row = [_Value(v) for v in stmt.rowset[rowNumber - 1]]
+        return SQL_SUCCESS
+
+    def _SQLGetData(self, hStmt, columnNumber, targetType, targetValue,
+                    bufferLength, lengthPtr):
+        stmt = self._handle(hStmt)
+        value = stmt.row[columnNumber - 1]
+        if value.value is None:
+            lengthPtr[0] = SQL_NULL_DATA
+            return SQL_SUCCESS
+        if value.data is None:
+            value.encode(targetType)
+        elif value.offset >= len(value.data) and value.offset > 0:
+            return SQL_NO_DATA
+        remaining = len(value.data) - value.offset
+        lengthPtr[0] = remaining
+        if targetType == SQL_C_DOUBLE:
+            ctypes.memmove(targetValue, value.data, len(value.data))
+            value.offset = len(value.data)
+            return SQL_SUCCESS
+        terminator = 0 if targetType == SQL_C_BINARY else CHAR_SIZE
+        available = max(bufferLength - terminator, 0)
+        size = min(remaining, available)
+        if targetType != SQL_C_BINARY:
+            # Like a driver, multibyte UTF-8 characters can be split between
+            # calls.
+            size -= size % CHAR_SIZE
+        if bufferLength > 0:
+            ctypes.memmove(targetValue, value.data[value.offset:], size)
+            if terminator and bufferLength >= terminator:
+                ctypes.memset(targetValue + size, 0, terminator)
+        value.offset += size
+        if size < remaining:
+            return stmt.info(tdodbc.SQL_STATE_DATA_TRUNCATED,
+                             "String data, right truncated.")
+        return SQL_SUCCESS
+
+    # Statement execution.
+
+    def _SQLCancel(self, hStmt):
+        if self.cancelDelay:
+            time.sleep(self.cancelDelay)
+        self._handle(hStmt).cancelled = True
+        self.cancelled.append(hStmt)
+        return SQL_SUCCESS
+
+    def _execute(self, stmt, delay=True):
+        """Executes each statement of a (possibly multi-statement) request
+         for each parameter set and queues the results."""
+        paramSets = stmt.readParams()
+        stmt.cancelled = False
+        if self.executeDelay and delay:
+            end = time.time() + self.executeDelay
+            while time.time() < end and not stmt.cancelled:
+                time.sleep(min(0.01, end - time.time()))
+        if stmt.cancelled:
+            return stmt.error(tdodbc.SQL_STATE_OPERATION_CANCELED,
+                              "Operation canceled.", 0)
+        if self.recordParams:
+            self.executed.append((stmt.query, paramSets))
+        statuses = [SQL_PARAM_SUCCESS] * len(paramSets)
+        results = []
+        self.local.conn = stmt.conn
+        for statement in _splitStatements(stmt.query):
+            result = self._match(statement)
+            columns = result.columns if result else []
+            rows = []
+            rowCount = 0
+            for index, paramSet in enumerate(paramSets):
+                try:
+                    setRows = result.execute(paramSet) if result else ()
+                    if columns:
+                        rows = itertools.chain(rows, setRows)
+                    else:
+                        rowCount += 1
+                except OdbcStubError as e:
+                    statuses[index] = SQL_PARAM_ERROR
+                    stmt.error(e.sqlState, e.msg, e.code, index + 1)
+            if result is not None and result.rowCount is not None:
+                rowCount = result.rowCount
+            results.append(_Result(columns, iter(rows) if columns else None,
+                                   rowCount))
+        stmt.writeStatus(statuses, len(paramSets))
+        stmt.results = results
+        stmt.result = results.pop(0) if results else None
+        if SQL_PARAM_ERROR in statuses:
+            return SQL_ERROR
+        return SQL_SUCCESS
+
+
+class _Function (object):
+
+    """A ctypes function pointer for a Python implementation of an ODBC
+     function, it is created once tdodbc sets the function prototype."""
+
+    def __init__(self, name, impl, stub):
+        self.name = name
+        self.impl = impl
+        self.stub = stub
+        self.restype = None
+        self.cfunc = None
+
+    @property
+    def argtypes(self):
+        return self._argtypes
+
+    @argtypes.setter
+    def argtypes(self, argtypes):
+        self._argtypes = argtypes
+        self.cfunc = ctypes.CFUNCTYPE(self.restype, *argtypes)(self._call)
+
+    def _call(self, *args):
+        handle = self.stub._handle(args[1] if self.name in (
+            "SQLAllocHandle", "SQLFreeHandle", "SQLEndTran") else args[0])
+        if handle is not None and not self.name.startswith("SQLGetDiag"):
+            handle.diagnostics = []
+        try:
+            return self.impl(*args)
+        except Exception:
+            logger.exception("Error in stub function %s", self.name)
+            if handle is not None:
+                return handle.error("HY000", traceback.format_exc(), 0)
+            return SQL_ERROR
+
+    def __call__(self, *args):
+        return self.cfunc(*args)
+
+
+class _Handle (object):
+
+    def __init__(self):
+        self.diagnostics = []
+        self.attributes = {}
+
+    def error(self, sqlState, message, code, rowNumber=0):
+        self.diagnostics.append((sqlState, message, code, rowNumber))
+        return SQL_ERROR
+
+    def info(self, sqlState, message):
+        self.diagnostics.append((sqlState, message, 0, 0))
+        return SQL_SUCCESS_WITH_INFO
+
+
+class _Environment (_Handle):
+    pass
+
+
+class _Connection (_Handle):
+
+    def __init__(self):
+        _Handle.__init__(self)
+        self.connected = False
+        self.session = 0
+
+
+class _Statement (_Handle):
+
+    def __init__(self, conn):
+        _Handle.__init__(self)
+        self.conn = conn
+        self.query = None
+        self.params = {}
+        self.results = []
+        self.result = None
+        self.row = None
+        self.pending = []
+        self.streamed = {}
+        self.current = None
+        self.started = None
+        self.cancelled = False
+        self.bindings = {}
+        self.rowset = None
+
+    def readParams(self):
+        """Reads the bound parameter arrays into a list of parameter sets."""
+        if not self.params:
+            return [[]]
+        paramSetSize = self.attributes.get(SQL_ATTR_PARAMSET_SIZE) or 1
+        paramSets = []
+        for index in range(0, paramSetSize):
+            paramSet = []
+            for num in sorted(self.params):
+                valueType, address, bufferLength, lengthPtr = \
+                    self.params[num]
+                length = SQLLEN.from_address(
+                    lengthPtr + index * ctypes.sizeof(SQLLEN)).value
+                if length == SQL_NULL_DATA:
+                    value = None
+                elif length == SQL_DATA_AT_EXEC:
+                    value = b"".join(self.streamed.get(num, ()))
+                    if valueType != SQL_C_BINARY:
+                        value = value.decode(ENCODING)
+                    else:
+                        value = bytearray(value)
+                elif valueType == SQL_C_DOUBLE:
+                    value = SQLDOUBLE.from_address(
+                        address + index * ctypes.sizeof(SQLDOUBLE)).value
+                elif valueType == SQL_C_BINARY:
+                    value = bytearray(ctypes.string_at(
+                        address + index * bufferLength, length))
+                else:
+                    value = _readString(
+                        address + index * bufferLength, length, bufferLength)
+                paramSet.append(value)
+            paramSets.append(paramSet)
+        return paramSets
+
+    def writeStatus(self, statuses, processed):
+        statusPtr = self.attributes.get(SQL_ATTR_PARAM_STATUS_PTR)
+        if statusPtr:
+            size = self.attributes.get(SQL_ATTR_PARAMSET_SIZE) or 1
+            statuses = (statuses + [SQL_PARAM_UNUSED] * size)[:size]
+            (ctypes.c_ushort * size).from_address(statusPtr)[:] = statuses
+        processedPtr = self.attributes.get(SQL_ATTR_PARAMS_PROCESSED_PTR)
+        if processedPtr:
+            ctypes.c_size_t.from_address(processedPtr).value = processed
+
+
+class _Result (object):
+
+    def __init__(self, columns, rows, rowCount):
+        self.columns = columns
+        self.rows = rows
+        self.rowCount = rowCount
+
+
+class _Value (object):
+
+    """A column value of the current row and how much of it has been read."""
+
+    def __init__(self, value):
+        self.value = value
+        self.data = None
+        self.offset = 0
+
+    def encode(self, targetType):
+        value = self.value
+        if targetType == SQL_C_BINARY:
+            self.data = bytes(value) if isinstance(
+                value, (bytes, bytearray)) else \
+                util.toUnicode(value).encode("utf8")
+        elif targetType == SQL_C_DOUBLE:
+            self.data = bytes(bytearray(SQLDOUBLE(float(value))))
+        elif targetType == SQL_C_SBIGINT:
+            self.data = bytes(bytearray(ctypes.c_int64(int(value))))
+        else:
+            if isinstance(value, (bytes, bytearray)) and \
+                    not util.isString(value):
+                value = "".join("{:02x}".format(b) for b in bytearray(value))
+            self.data = util.toUnicode(value).encode(ENCODING)
+
+
+def _address(pointer):
+    """Returns the address of a ctypes pointer argument or 0 if NULL."""
+    if pointer is None or isinstance(pointer, int):
+        return pointer or 0
+    return ctypes.cast(pointer, ctypes.c_void_p).value or 0
+
+
+def _readString(address, length, bufferLength=None):
+    if length is None or length == SQL_NTS or length < 0:
+        if CHAR_SIZE == 1:
+            data = ctypes.string_at(address)
+        else:
+            return ctypes.wstring_at(address)
+    else:
+        data = ctypes.string_at(address, length * (
+            1 if bufferLength is not None else CHAR_SIZE))
+    return data.decode(ENCODING)
+
+
+def _writeString(address, bufferLength, value):
+    if not address or bufferLength <= 0:
+        return
+    data = value.encode(ENCODING)[:bufferLength - CHAR_SIZE]
+    ctypes.memmove(address, data, len(data))
+    ctypes.memset(address + len(data), 0, CHAR_SIZE)
+
+
+def _splitStatements(query):
+    """Splits a multi-statement request on semicolons outside of quotes."""
+    statements = re.findall(r"(?:'[^']*'|[^;'])+", query)
+    return [s for s in statements if s.strip()] or [query]
@@ -0,0 +1,861 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 by Teradata
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import unittest
+import array
+import datetime
+import decimal
+import functools
+import io
+import multiprocessing
+import time
+import threading
+import teradata
+import odbcstub
+from teradata import tdodbc, datatypes, util
+
+
+class StubTestCase (unittest.TestCase):
+
+    """Loads the stand-in ODBC library for the tests of a class, these don't
+     require an ODBC driver or database."""
+
+    @classmethod
+    def setUpClass(cls):
+        if tdodbc.odbc is not None:
+            raise unittest.SkipTest("Another ODBC library is already loaded.")
+        tdodbc.init(stub)
+
+    @classmethod
+    def tearDownClass(cls):
+        # Unload the stub so other tests can load the ODBC library.
+        tdodbc.odbc = tdodbc.hEnv = None
+
+    def setUp(self):
+        del stub.executed[:]
+
+    def connect(self, **kwargs):
+        return tdodbc.connect(system="stub", odbcLibPath=stub, **kwargs)
+
+
+class OdbcStubTest (StubTestCase):
+
+    """Tests tdodbc against the stand-in ODBC library."""
+
+    def testSessionSetup(self):
+        with self.connect(autoCommit=True, queryBands={"a": 1}) as conn:
+            self.assertEqual(
+                stub.executed, [("SET QUERY_BAND = 'a=1;' FOR SESSION",
+                                 [[]])])
+            self.assertTrue(conn.sessionno >= 1000)
+            self.assertEqual(stub.executed[-1][0], "SELECT SESSION")
+
+    def testFetchTypes(self):
+        rows = [(1, u"仅恢" * 20, 1.5, bytearray(b"\x01\x02") * 50,
+                 "x" * 100000), (2, None, None, None, None)]
+        stub.addResult(
+            r"SELECT \* FROM testFetchTypes",
+            [("id", "INTEGER"), ("name", "VARCHAR", 10), ("f", "FLOAT"),
+             ("b", "VARBYTE", 4), ("c", "CLOB")], rows)
+        with self.connect() as conn:
+            with conn.cursor() as cursor:
+                result = cursor.execute(
+                    "SELECT * FROM testFetchTypes").fetchall()
+        self.assertEqual([list(row) for row in result],
+                         [list(row) for row in rows])
+
+    def testFetchRowsets(self):
+        rows = [(i, u"仅恢" * (i % 3), i / 4.0, bytearray(b"\x01") * (i % 4),
+                 "2015-01-02 03:04:05.%06d" % i, str(i) + ".25")
+                if i % 5 else (i, None, None, None, None, None)
+                for i in range(0, 23)]
+        stub.addResult(
+            r"SELECT \* FROM testFetchRowsets",
+            [("id", "INTEGER"), ("name", "VARCHAR", 10), ("f", "FLOAT"),
+             ("b", "VARBYTE", 4), ("ts", "TIMESTAMP", 26),
+             ("d", "DECIMAL", 18)], rows)
+        with self.connect() as conn:
+            with conn.cursor() as cursor:
+                expected = list(cursor.execute(
+                    "SELECT * FROM testFetchRowsets"))
+                cursor.execute("SELECT * FROM testFetchRowsets")
+                fetchNumber = cursor.fetchNumber
+                result = cursor.fetchmany(10)
+                # Rowsets are fetched with one SQLFetch call each.
+                self.assertEqual(cursor.fetchNumber - fetchNumber, 1)
+                result += [cursor.fetchone()]
+                cursor.arraysize = 5
+                result += cursor.fetchall()
+                self.assertEqual(cursor.rownumber, 22)
+                self.assertEqual(cursor.fetchall(), [])
+                self.assertFalse(cursor.nextset())
+        self.assertEqual([list(row) for row in result],
+                         [list(row) for row in expected])
+        self.assertEqual([row.rowNum for row in result], list(range(1, 24)))
+
+    def testRowsetTruncation(self):
+        # The column sizes understate the data, as they can with character
+        # set expansion.
+        rows = [(i, u"\u4ec5\u6062" * (i % 7), bytearray(b"\x01\x02") * i,
+                 "x" * (i % 3)) for i in range(0, 12)]
+        rows.append((12, None, None, None))
+        stub.addResult(
+            r"SELECT \* FROM testRowsetTruncation",
+            [("id", "INTEGER"), ("name", "VARCHAR", 2), ("b", "VARBYTE", 3),
+             ("s", "VARCHAR", 1)], rows)
+        # Without SQL_GD_BLOCK the stub fails SQLSetPos, so the rows must
+        # be fetched one at a time.
+        for blockGetData in (True, False):
+            stub.blockGetData = blockGetData
+            try:
+                with self.connect() as conn:
+                    with conn.cursor() as cursor:
+                        expected = list(cursor.execute(
+                            "SELECT * FROM testRowsetTruncation"))
+                        result = cursor.execute(
+                            "SELECT * FROM testRowsetTruncation").fetchmany(5)
+                        result += cursor.fetchall()
+                        columns = cursor.execute(
+                            "SELECT * FROM testRowsetTruncation"
+                        ).fetchcolumns(20)
+                    self.assertEqual(conn.supportsBlockGetData(),
+                                     blockGetData)
+            finally:
+                stub.blockGetData = True
+            self.assertEqual([list(row) for row in expected],
+                             [list(row) for row in rows])
+            self.assertEqual([list(row) for row in result],
+                             [list(row) for row in rows])
+            self.assertEqual(list(zip(*columns)), rows)
+
+    def testExecuteManyBatchErrors(self):
+        def insert(params):
+            if params[1] is None:
+                raise odbcstub.OdbcStubError(3811, "Column is NOT NULL.")
+            return ()
+        stub.addResult(r"INSERT INTO testBatchErrors", rows=insert)
+        with self.connect() as conn:
+            with conn.cursor() as cursor:
+                params = [(i, None if i in (3, 7) else str(i))
+                          for i in range(0, 10)]
+                with self.assertRaises(teradata.BatchError) as cm:
+                    cursor.executemany(
+                        "INSERT INTO testBatchErrors VALUES (?, ?)", params,
+                        batch=True, batchSize=4)
+        self.assertEqual([i for i, e in cm.exception.failures], [3, 7])
+        self.assertEqual([len(paramSets) for q, paramSets in stub.executed
+                          if q.startswith("INSERT")], [4, 4, 2])
+
+    def testExecuteManyRequestSize(self):
+        stub.addResult(r"INSERT INTO testRequestSize", rows=lambda p: ())
+        query = "INSERT INTO testRequestSize VALUES (?)"
+        with self.connect() as conn:
+            with conn.cursor() as cursor:
+                # Chunks must fit whatever the session character set is.
+                cursor.executemany(
+                    query, [(u"x" * 100, )] * 10, batch=True,
+                    maxRequestSize=len(query) * tdodbc.MAX_CHAR_SIZE + 1000)
+        sizes = [len(paramSets) for q, paramSets in stub.executed
+                 if q.startswith("INSERT")]
+        self.assertEqual(sum(sizes), 10)
+        self.assertEqual(max(sizes), 1000 // (
+            100 * tdodbc.MAX_CHAR_SIZE + tdodbc.PARAM_OVERHEAD))
+
+    def testFetchColumns(self):
+        rows = [(i, i / 2.0, str(i), None if i % 2 else i, i * 3)
+                for i in range(0, 1200)]
+        stub.addResult(
+            r"SELECT \* FROM testFetchColumns",
+            [("id", "INTEGER"), ("f", "FLOAT"), ("name", "VARCHAR", 10),
+             ("n", "BIGINT"), ("d", "DECIMAL", 18)], rows)
+        with self.connect() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT * FROM testFetchColumns")
+                self.assertEqual(cursor.fetchone()[0], 0)
+                columns = [[] for i in range(0, 5)]
+                for size in (500, 500, 500):
+                    for col, values in enumerate(cursor.fetchcolumns(size)):
+                        if col in (0, 1):
+                            self.assertIsInstance(
+                                values, array.array if datatypes.numpy is
+                                None else datatypes.numpy.ndarray)
+                        columns[col].extend(values)
+                self.assertEqual(cursor.rownumber, 1199)
+                self.assertEqual(len(cursor.fetchcolumns()[0]), 0)
+                self.assertIsNone(cursor.fetchone())
+                self.assertEqual(
+                    [q for q, p in stub.executed if "testFetchColumns" in q],
+                    ["SELECT * FROM testFetchColumns"])
+        self.assertEqual(list(zip(*columns)), [
+            (i, f, s, n, decimal.Decimal(d)) for i, f, s, n, d in rows[1:]])
+
+    @unittest.skipIf(datatypes.numpy is None, "NumPy is not installed.")
+    def testNumpyConverter(self):
+        numpy = datatypes.numpy
+        rows = [(1, 1.5, "1.25", "2015-01-02", "2015-01-02 03:04:05.123456",
+                 "2015-01-02 03:04:05+02:00", "a"),
+                (None, None, None, None, None, None, None)]
+        stub.addResult(
+            r"SELECT \* FROM testNumpyConverter",
+            [("i", "INTEGER"), ("f", "FLOAT"), ("d", "DECIMAL", 18),
+             ("dt", "DATE"), ("ts", "TIMESTAMP"),
+             ("tz", "TIMESTAMP WITH TIME ZONE", 25), ("s", "VARCHAR")],
+            rows)
+        with self.connect(dataTypeConverter=datatypes.NumpyDataTypeConverter(
+                decimalScale=2)) as conn:
+            with conn.cursor() as cursor:
+                i, f, d, dt, ts, tz, s = cursor.execute(
+                    "SELECT * FROM testNumpyConverter").fetchcolumns()
+                row = cursor.execute(
+                    "SELECT * FROM testNumpyConverter").fetchone()
+        self.assertEqual(i.dtype, numpy.int64)
+        self.assertEqual(f.dtype, numpy.float64)
+        self.assertEqual(d.tolist(), [125, None])
+        self.assertEqual(list(i.mask), [False, True])
+        self.assertEqual(dt[0], numpy.datetime64("2015-01-02"))
+        self.assertEqual(ts[0], numpy.datetime64("2015-01-02T03:04:05.123456"))
+        self.assertEqual(tz[0], numpy.datetime64("2015-01-02T01:04:05"))
+        self.assertEqual(tz.dtype, numpy.dtype("datetime64[us]"))
+        self.assertEqual(s, ["a", None])
+        self.assertEqual(row.d, decimal.Decimal("1.25"))
+
+    def testColumnConverters(self):
+        class UpperConverter (datatypes.DefaultDataTypeConverter):
+
+            def convertValue(self, dbType, dataType, typeCode, value):
+                if value is not None and dataType == "VARCHAR":
+                    return value.upper()
+                return super(UpperConverter, self).convertValue(
+                    dbType, dataType, typeCode, value)
+        stub.addResult(
+            r"SELECT \* FROM testColumnConverters",
+            [("s", "VARCHAR"), ("f", "FLOAT"), ("d", "DATE"),
+             ("ts", "TIMESTAMP"), ("tz", "TIMESTAMP WITH TIME ZONE", 25)],
+            [("a", "1.5", "2015-01-02", "2015-01-02 03:04:05.12",
+              "2015-01-02 03:04:05-05:30"), (None, None, None, None, None)])
+        for converter, s in ((datatypes.DefaultDataTypeConverter(True), "a"),
+                             (UpperConverter(True), "A")):
+            with self.connect(dataTypeConverter=converter) as conn:
+                with conn.cursor() as cursor:
+                    rows = cursor.execute(
+                        "SELECT * FROM testColumnConverters").fetchall()
+            self.assertEqual(list(rows[0])[:4],
+                             [s, 1.5, datetime.date(2015, 1, 2),
+                              datetime.datetime(2015, 1, 2, 3, 4, 5, 120000)])
+            self.assertEqual(rows[0].tz.utcoffset(),
+                             datetime.timedelta(hours=-5, minutes=-30))
+            self.assertIs(rows[0].tz.tzinfo,
+                          datatypes.getTimeZone("-", 5, 30))
+            self.assertEqual(list(rows[1]), [None] * 5)
+
+    def testConvertNullValues(self):
+        class NullConverter (datatypes.DefaultDataTypeConverter):
+
+            def convertValue(self, dbType, dataType, typeCode, value):
+                if value is None:
+                    return "NULL"
+                return super(NullConverter, self).convertValue(
+                    dbType, dataType, typeCode, value)
+        stub.addResult(
+            r"SELECT \* FROM testConvertNullValues",
+            [("s", "VARCHAR"), ("d", "DATE")],
+            [("a", None), (None, "2015-01-02")])
+        expected = [["a", "NULL"], ["NULL", datetime.date(2015, 1, 2)]]
+        with self.connect(dataTypeConverter=NullConverter()) as conn:
+            for lazy in (False, True):
+                with conn.cursor() as cursor:
+                    cursor.lazyConversion = lazy
+                    cursor.execute("SELECT * FROM testConvertNullValues")
+                    self.assertEqual(list(cursor.fetchone()), expected[0])
+                    self.assertEqual([list(row) for row in cursor.fetchall()],
+                                     expected[1:])
+
+    def testNativeNumbers(self):
+        stub.addResult(r"SELECT \* FROM testNativeNumbers",
+                       [("i", "INTEGER"), ("b", "BIGINT"), ("f", "FLOAT"),
+                        ("d", "DECIMAL", 18)],
+                       [(1, 2 ** 40, 1.5, "1.25"), (None, None, None, None)])
+        converter = datatypes.DefaultDataTypeConverter(useFloat=True,
+                                                       useInt=True)
+        with self.connect(dataTypeConverter=converter) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT * FROM testNativeNumbers")
+                self.assertEqual([d[1] for d in cursor.description],
+                                 [int, int, float, decimal.Decimal])
+                row = cursor.fetchone()
+                self.assertEqual(list(cursor.fetchone()), [None] * 4)
+        self.assertEqual([type(v) for v in row],
+                         [int, int, float, decimal.Decimal])
+        self.assertEqual(list(row), [1, 2 ** 40, 1.5, decimal.Decimal("1.25")])
+
+    def testIntervals(self):
+        stub.addResult(r"SELECT \* FROM testIntervals",
+                       [("ym", "INTERVAL YEAR TO MONTH"),
+                        ("h", "INTERVAL HOUR"),
+                        ("ds", "INTERVAL DAY TO SECOND"),
+                        ("p", "PERIOD(DATE)")],
+                       [("  3-03", " -4", " -1 02:03:04.5",
+                         "('2015-01-02', '2015-03-04')")])
+        for useTimedelta in (False, True):
+            converter = datatypes.DefaultDataTypeConverter(
+                useTimedelta=useTimedelta)
+            with self.connect(dataTypeConverter=converter) as conn:
+                with conn.cursor() as cursor:
+                    row = cursor.execute(
+                        "SELECT * FROM testIntervals").fetchone()
+            self.assertEqual(row.ym, datatypes.Interval(years=3, months=3))
+            self.assertEqual(row.p, datatypes.Period(
+                datetime.date(2015, 1, 2), datetime.date(2015, 3, 4)))
+            delta = -datetime.timedelta(days=1, hours=2, minutes=3,
+                                        seconds=4.5)
+            if useTimedelta:
+                self.assertEqual(row.h, datetime.timedelta(hours=-4))
+                self.assertEqual(row.ds, delta)
+            else:
+                self.assertEqual(row.h, datatypes.Interval(negative=True,
+                                                           hours=4))
+                self.assertEqual(row.h.type, "HOUR")
+                self.assertEqual(row.ds.timedelta(), delta)
+                self.assertEqual(str(row.ds), "-1 02:03:04.5")
+
+    def testJsonModes(self):
+        text = '{"a": [1, 2.5], "b": "c"}'
+        stub.addResult(r"SELECT \* FROM testJsonModes",
+                       [("doc", "JSON", 1024)], [(text, ), (None, )])
+        rows = {}
+        for jsonMode in (datatypes.JSON_PARSE, datatypes.JSON_LAZY,
+                         datatypes.JSON_RAW):
+            converter = datatypes.DefaultDataTypeConverter(jsonMode=jsonMode)
+            with self.connect(dataTypeConverter=converter) as conn:
+                with conn.cursor() as cursor:
+                    rows[jsonMode] = cursor.execute(
+                        "SELECT * FROM testJsonModes").fetchall()
+        parsed = {"a": [1, decimal.Decimal("2.5")], "b": "c"}
+        self.assertEqual(rows[datatypes.JSON_PARSE][0].doc, parsed)
+        self.assertEqual(rows[datatypes.JSON_RAW][0].doc, text)
+        lazy = rows[datatypes.JSON_LAZY][0].doc
+        self.assertIsInstance(lazy, datatypes.JSONValue)
+        self.assertEqual(str(lazy), text)
+        self.assertIs(lazy._value, datatypes._UNPARSED)
+        self.assertEqual(lazy["a"][1], decimal.Decimal("2.5"))
+        self.assertEqual(lazy, parsed)
+        self.assertEqual(sorted(lazy.keys()), ["a", "b"])
+        self.assertTrue("b" in lazy)
+        for mode in rows:
+            self.assertIsNone(rows[mode][1].doc)
+        with self.assertRaises(teradata.InterfaceError):
+            datatypes.DefaultDataTypeConverter(jsonMode="eager")
+
+    def testCompactRows(self):
+        stub.addResult(r"SELECT \* FROM testCompactRows",
+                       [("Id", "INTEGER"), ("Name", "VARCHAR")],
+                       [(i, str(i)) for i in range(0, 5)])
+        with self.connect() as conn:
+            with conn.cursor() as cursor:
+                cursor.compactRows = True
+                cursor.execute("SELECT * FROM testCompactRows")
+                rows = [cursor.fetchone()] + cursor.fetchmany(2) + \
+                    cursor.fetchall()
+                self.assertEqual(cursor.rownumber, 4)
+                cursor.execute("SELECT * FROM testCompactRows")
+                again = cursor.fetchone()
+        self.assertEqual(len(rows), 5)
+        self.assertIsInstance(rows[0], util.CompactRow)
+        self.assertIs(type(rows[0]), type(rows[4]))
+        self.assertIsNot(type(rows[0]), type(again))
+        self.assertEqual(rows[3], (3, "3"))
+        self.assertEqual((rows[3].id, rows[3].NAME, rows[3]["name"],
+                          rows[3][-1]), (3, "3", "3", "3"))
+        with self.assertRaises(AttributeError):
+            rows[0].missing
+        with self.assertRaises(TypeError):
+            rows[0][0] = 1
+
+    def testCompactRowNames(self):
+        names = ("columns", "_columns", "count", "index", "__str__")
+        stub.addResult(r"SELECT \* FROM testCompactRowNames",
+                       [(name, "VARCHAR") for name in names], [names])
+        with self.connect() as conn:
+            with conn.cursor() as cursor:
+                cursor.compactRows = True
+                row = cursor.execute(
+                    "SELECT * FROM testCompactRowNames").fetchone()
+        self.assertEqual([row[name] for name in names], list(names))
+        self.assertEqual((row.columns, row.COUNT), ("columns", "count"))
+        self.assertEqual((row.count("index"), row.index("count")), (1, 2))
+        self.assertEqual(str(row), "Row: [" + ", ".join(names) + "]")
+
+    def testConvertColumn(self):
+        class BlockConverter (datatypes.DefaultDataTypeConverter):
+
+            def __init__(self):
+                datatypes.DefaultDataTypeConverter.__init__(self)
+                self.blocks = []
+
+            def convertColumn(self, dbType, dataType, typeCode, values):
+                self.blocks.append((dataType, len(values)))
+                return datatypes.DefaultDataTypeConverter.convertColumn(
+                    self, dbType, dataType, typeCode, values)
+        stub.addResult(r"SELECT \* FROM testConvertColumn",
+                       [("id", "INTEGER"), ("name", "VARCHAR")],
+                       [(i, None if i % 2 else str(i)) for i in range(0, 25)])
+        converter = BlockConverter()
+        with self.connect(dataTypeConverter=converter) as conn:
+            with conn.cursor() as cursor:
+                cursor.arraysize = 10
+                cursor.execute("SELECT * FROM testConvertColumn")
+                first = cursor.fetchone()
+                rows = cursor.fetchmany(4) + cursor.fetchall()
+                self.assertEqual(cursor.rownumber, 24)
+        self.assertEqual(first.id, 0)
+        self.assertEqual([row.id for row in rows], list(range(1, 25)))
+        self.assertEqual([row.name for row in rows[:3]], [None, "2", None])
+        self.assertEqual(rows[-1].rowNum, 25)
+        self.assertEqual(converter.blocks,
+                         [("INTEGER", 4), ("VARCHAR", 4), ("INTEGER", 10),
+                          ("VARCHAR", 10), ("INTEGER", 10),
+                          ("VARCHAR", 10)])
+
+    def testLazyConversion(self):
+        calls = []
+
+        class CountingConverter (datatypes.DefaultDataTypeConverter):
+
+            def convertValue(self, dbType, dataType, typeCode, value):
+                calls.append(value)
+                return super(CountingConverter, self).convertValue(
+                    dbType, dataType, typeCode, value)
+        stub.addResult(r"SELECT \* FROM testLazyConversion",
+                       [("id", "INTEGER"), ("d", "DATE"), ("s", "VARCHAR")],
+                       [(1, "2015-01-02", None), (2, "2015-01-03", "b")])
+        with self.connect(dataTypeConverter=CountingConverter()) as conn:
+            with conn.cursor() as cursor:
+                cursor.lazyConversion = True
+                cursor.execute("SELECT * FROM testLazyConversion")
+                first = cursor.fetchone()
+                second = cursor.fetchall()[0]
+        self.assertEqual(calls, [])
+        self.assertEqual(first.D, datetime.date(2015, 1, 2))
+        self.assertEqual(first[1], datetime.date(2015, 1, 2))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(first["s"], None)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(first[1:], [datetime.date(2015, 1, 2), None])
+        second.d = "x"
+        second[0] = 3
+        self.assertEqual(list(second), [3, "x", "b"])
+        self.assertEqual((first.rowNum, second.rowNum), (1, 2))
+        self.assertEqual(len(calls), 4)
+
+    def testPrefetch(self):
+        def rows(params):
+            for i in range(0, 2500):
+                yield (i, str(i))
+            raise odbcstub.OdbcStubError(2646, "No more spool space.")
+        stub.addResult(r"SELECT \* FROM testPrefetch",
+                       [("id", "INTEGER"), ("name", "VARCHAR")], rows)
+        with self.connect() as conn:
+            with conn.cursor() as cursor:
+                cursor.arraysize = 100
+                cursor.execute("SELECT * FROM testPrefetch", prefetch=2)
+                prefetcher = cursor.iterator
+                self.assertIsInstance(prefetcher, util.PrefetchIterator)
+                time.sleep(0.1)
+                self.assertEqual(prefetcher.queue.qsize(), 2)
+                self.assertEqual([r.id for r in cursor.fetchmany(1000)],
+                                 list(range(0, 1000)))
+                with self.assertRaises(teradata.DatabaseError):
+                    cursor.fetchall()
+                cursor.execute("SELECT * FROM testPrefetch", prefetch=2)
+                prefetcher = cursor.iterator
+                self.assertEqual(cursor.fetchone().id, 0)
+            self.assertFalse(prefetcher.thread.is_alive())
+
+    def testExtract(self):
+        columns = [("id", "INTEGER"), ("name", "VARCHAR")]
+        for i in range(0, 4):
+            stub.addResult(r".*testExtract.*MOD 4 = {}".format(i), columns,
+                           [(x, str(x)) for x in range(i, 1000, 4)])
+        pool = tdodbc.OdbcConnectionPool()
+        connect = functools.partial(pool.connect, system="stub",
+                                    odbcLibPath=stub)
+        try:
+            with util.extract(connect, "SELECT * FROM testExtract", "id",
+                              batchSize=100) as rows:
+                self.assertEqual(sorted(r.id for r in rows),
+                                 list(range(0, 1000)))
+            created = pool.stats()["created"]
+            self.assertLessEqual(created, 4)
+            rows = util.extract(connect, "SELECT * FROM testExtract", "id",
+                                orderBy="id", batchSize=100)
+            self.assertEqual([(r.id, r.name) for r in rows],
+                             [(x, str(x)) for x in range(0, 1000)])
+            self.assertLessEqual(pool.stats()["created"], 4)
+            with self.assertRaises(tdodbc.InterfaceError):
+                util.extract(connect, "SELECT * FROM testExtract", "id",
+                             orderBy="id", parallelism=2)
+        finally:
+            pool.close()
+
+    @unittest.skipIf(multiprocessing.get_start_method() != "fork",
+                     "The stub's results are only shared with forked "
+                     "processes.")
+    def testExtractProcesses(self):
+        columns = [("id", "INTEGER"), ("ts", "TIMESTAMP WITH TIME ZONE", 25)]
+        for i in range(0, 2):
+            stub.addResult(
+                r".*testExtractProcesses.*MOD 2 = {}".format(i), columns,
+                [(x, "2015-01-02 03:04:05+0{}:30".format(x))
+                 for x in range(i, 6, 2)])
+        with util.extract(self.connect, "SELECT * FROM testExtractProcesses",
+                          "id", partitions=2, orderBy="id",
+                          processes=True) as rows:
+            rows = list(rows)
+        self.assertEqual([r.id for r in rows], list(range(0, 6)))
+        self.assertIs(rows[1].ts.tzinfo, datatypes.getTimeZone("+", 1, 30))
+        self.assertEqual(rows[5].ts.utcoffset(),
+                         datetime.timedelta(hours=5, minutes=30))
+
+    def testExtractBackpressure(self):
+        columns = [("id", "INTEGER")]
+        for i in range(0, 4):
+            stub.addResult(r".*testExtractBackpressure.*MOD 4 = {}".format(i),
+                           columns, [(x, ) for x in range(i * 250,
+                                                          (i + 1) * 250)])
+        with util.extract(self.connect, "SELECT * FROM "
+                          "testExtractBackpressure", "id", orderBy="id",
+                          batchSize=10, queueSize=2) as rows:
+            self.assertEqual([next(rows).id for i in range(0, 240)],
+                             list(range(0, 240)))
+            time.sleep(0.2)
+            # Partitions merged later wait rather than being buffered.
+            self.assertEqual([len(b) <= 2 for b in rows.buffers], [True] * 4)
+            self.assertEqual([r.id for r in rows], list(range(240, 1000)))
+
+    def testExtractRanges(self):
+        columns = [("id", "INTEGER"), ("name", "VARCHAR")]
+        stub.addResult(r".*MIN\(id\), MAX\(id\)", columns[:1] * 2,
+                       [(0, 999)])
+
+        for where, test in (
+                (r"id < \?", lambda x, p: x < float(p[0])),
+                (r"id >= \? AND", lambda x, p: float(p[0]) <= x < float(p[1])),
+                (r"id >= \? ORDER", lambda x, p: x >= float(p[0]))):
+            stub.addResult(
+                r".*testExtractRanges.* WHERE " + where, columns,
+                lambda p, test=test: [(x, str(x)) for x in range(0, 1000)
+                                      if test(x, p)])
+        with util.extract(
+                self.connect, "SELECT * FROM "
+                "testExtractRanges", "id", partitionBy="range",
+                orderBy="id") as rows:
+            self.assertEqual([r.id for r in rows], list(range(0, 1000)))
+        self.assertEqual(
+            sorted(p for q, p in stub.executed if "extract_partition" in q),
+            [[["249"]], [["249", "499"]], [["499", "749"]], [["749"]]])
+        stub.addResult(r".*MIN\(d\), MAX\(d\)", [("d", "DATE")] * 2,
+                       [("2015-01-01", "2015-12-31")])
+        with self.assertRaises(tdodbc.InterfaceError):
+            util.extract(self.connect, "SELECT * FROM testExtractRanges", "d",
+                         partitionBy="range")
+
+    def testStreamLobs(self):
+        stub.addResult(r"INSERT INTO testStreamLobs",
+                       paramTypes=[(tdodbc.SQL_WLONGVARCHAR, 2097088000),
+                                   (tdodbc.SQL_LONGVARBINARY, 2097088000)])
+        b = u"0123456789" * 100000
+        c = bytearray(range(0, 256)) * 4000
+        stub.addResult(r"SELECT b, c FROM testStreamLobs",
+                       [("b", "CLOB"), ("c", "BLOB")], [(b, c)])
+        with self.connect() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("INSERT INTO testStreamLobs VALUES (?, ?)",
+                               (io.StringIO(b), io.BytesIO(c)))
+                self.assertEqual(stub.executed[-1][1], [[b, c]])
+                row = cursor.execute("SELECT b, c FROM testStreamLobs",
+                                     streamLobs=True).fetchone()
+                self.assertEqual(row.b, b)
+                self.assertEqual(row.c.length, len(c))
+                self.assertEqual(row.c.read(1000), c[:1000])
+                self.assertEqual(row.c.read(), c[1000:])
+                self.assertEqual(row.c.read(), bytearray())
+
+    def testSplitCharacters(self):
+        stub.addResult(r"INSERT INTO testSplitCharacters",
+                       paramTypes=[(tdodbc.SQL_WLONGVARCHAR, 2097088000)])
+        # A character straddles the end of the first 64 KB chunk.
+        text = u"x" * (tdodbc.MAX_FETCH_BUFFER_SIZE - 1) + u"\u4ec5\u6062" * 3
+        clob = u"ab" + u"\u4ec5" * 30000
+        stub.addResult(r"SELECT c FROM testSplitCharacters",
+                       [("c", "CLOB")], [(clob, )])
+        with self.connect() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("INSERT INTO testSplitCharacters VALUES (?)",
+                               (io.BytesIO(text.encode("utf8")), ))
+                self.assertEqual(stub.executed[-1][1], [[text]])
+                row = cursor.execute(
+                    "SELECT c FROM testSplitCharacters").fetchone()
+                self.assertEqual(row.c, clob)
+                row = cursor.execute("SELECT c FROM testSplitCharacters",
+                                     streamLobs=True).fetchone()
+                self.assertEqual(row.c.read(100), clob[:100])
+                self.assertEqual(row.c.read(1), clob[100:101])
+                self.assertEqual(row.c.read(), clob[101:])
+                self.assertEqual(row.c.read(), u"")
+
+    def testConnectionPool(self):
+        pool = tdodbc.OdbcConnectionPool(maxSize=2)
+        try:
+            self.assertEqual(pool.warmup(
+                2, system="stub", odbcLibPath=stub, autoCommit=True), 2)
+            with pool.connect(system="stub", odbcLibPath=stub,
+                              autoCommit=True, queryBands={"a": 1}) as conn:
+                conn.setQueryBands({"a": 1})
+            self.assertEqual(
+                [q for q, p in stub.executed if "QUERY_BAND" in q],
+                ["SET QUERY_BAND = 'a=1;' FOR SESSION"])
+            self.assertEqual(pool.stats()["created"], 2)
+        finally:
+            pool.close()
+
+    def testPooledConnectionCloseTwice(self):
+        pool = tdodbc.OdbcConnectionPool(maxSize=1)
+        connect = functools.partial(pool.connect, system="stub",
+                                    odbcLibPath=stub, autoCommit=True)
+        try:
+            first = connect()
+            session = first.connection
+            first.close()
+            first.close()
+            self.assertEqual(pool.stats()["idle"], 1)
+            second = connect()
+            self.assertIs(second.connection, session)
+            cursor = second.cursor()
+            # A stale checkout neither releases nor disconnects the session.
+            first.close()
+            self.assertEqual((pool.stats()["idle"], pool.stats()["inUse"]),
+                             (0, 1))
+            self.assertEqual(cursor.execute("SELECT SESSION").fetchone()[0],
+                             session.sessionno)
+            with self.assertRaises(tdodbc.InterfaceError):
+                first.cursor()
+            second.close()
+            second.close()
+            self.assertEqual(pool.stats()["idle"], 1)
+            self.assertTrue(session.isAlive())
+        finally:
+            pool.close()
+
+    @unittest.skipIf(tdodbc.asyncio is None, "asyncio is not available.")
+    def testExecuteAsync(self):
+        stub.addResult(r"SELECT \?", [("x", "INTEGER")], lambda p: [p])
+        stub.executeDelay = 0.2
+        conns = [self.connect() for i in range(0, 10)]
+        try:
+            cursors = [conn.cursor() for conn in conns]
+            asyncio = tdodbc.asyncio
+            loop = asyncio.new_event_loop()
+            try:
+                start = time.time()
+                results = loop.run_until_complete(asyncio.gather(
+                    *(c.executeAsync("SELECT SESSION", loop=loop)
+                      for c in cursors)))
+                rows = loop.run_until_complete(asyncio.gather(
+                    *(c.fetchallAsync(loop=loop) for c in results)))
+                duration = time.time() - start
+                loop.run_until_complete(cursors[0].executeAsync(
+                    "SELECT ?", (1, ), loop=loop))
+                row = loop.run_until_complete(
+                    cursors[0].fetchoneAsync(loop=loop))
+            finally:
+                loop.close()
+                stub.executeDelay = 0
+            self.assertLess(duration, 1)
+            self.assertEqual([r[0][0] for r in rows],
+                             [conn.sessionno for conn in conns])
+            self.assertEqual(row[0], 1)
+        finally:
+            for conn in conns:
+                conn.close()
+
+    def testCancel(self):
+        stub.executeDelay = 5
+        try:
+            with self.connect() as conn:
+                with conn.cursor() as cursor:
+                    cancelCount = tdodbc.watchdog.cancelCount
+                    start = time.time()
+                    with self.assertRaises(teradata.DatabaseError) as cm:
+                        cursor.execute("SELECT SESSION", cancelTimeout=0.1)
+                    self.assertLess(time.time() - start, 2)
+                    self.assertEqual(cm.exception.sqlState,
+                                     tdodbc.SQL_STATE_OPERATION_CANCELED)
+                    self.assertEqual(tdodbc.watchdog.cancelCount,
+                                     cancelCount + 1)
+                    timer = threading.Timer(0.1, cursor.cancel)
+                    timer.start()
+                    with self.assertRaises(teradata.DatabaseError):
+                        cursor.execute("SELECT SESSION")
+                    timer.join()
+                    self.assertEqual(conn.cancelCount, 2)
+                    stub.executeDelay = 0
+                    cursor.execute("SELECT SESSION",
+                                   cancelTimeout=0.1).fetchall()
+                    self.assertEqual(len(tdodbc.watchdog.watched), 0)
+                    # Deadlines of completed statements aren't kept.
+                    for i in range(0, 100):
+                        cursor.execute("SELECT SESSION",
+                                       cancelTimeout=3600).fetchall()
+                    self.assertLess(len(tdodbc.watchdog.deadlines), 20)
+        finally:
+            stub.executeDelay = 0
+
+
+class ConcurrencyTest (StubTestCase):
+
+    """Tests the code paths of tdodbc that are run from several threads."""
+
+    def testInit(self):
+        env = tdodbc.hEnv
+        errors = []
+
+        def connect():
+            try:
+                tdodbc.init(stub)
+                self.connect().close()
+            except Exception as e:
+                errors.append(e)
+        # Connect from several threads while the environment is created.
+        tdodbc.hEnv = None
+        stub.connectDelay = 0.05
+        try:
+            threads = [threading.Thread(target=connect)
+                       for i in range(0, 8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+        finally:
+            stub.connectDelay = 0
+        self.assertEqual(errors, [])
+        self.assertIsNot(tdodbc.hEnv, env)
+        self.assertFalse(any(thread.is_alive() for thread in threads))
+
+    @unittest.skipIf(tdodbc.asyncio is None, "asyncio is not available.")
+    def testCancelAsync(self):
+        asyncio = tdodbc.asyncio
+        stub.addResult(r"SELECT \?", [("x", "INTEGER")], lambda p: [p])
+        stub.executeDelay = 5
+        loop = asyncio.new_event_loop()
+        try:
+            start = time.time()
+            with self.connect() as conn:
+                with conn.cursor() as cursor:
+                    hStmt = cursor.hStmt.value
+                    for query, params in (("SELECT SESSION", None),
+                                          ("SELECT ?", (1, ))):
+                        future = cursor.executeAsync(query, params, loop=loop)
+                        loop.run_until_complete(asyncio.sleep(0.1))
+                        future.cancel()
+                        loop.run_until_complete(asyncio.sleep(0.2))
+                        self.assertEqual(stub.cancelled[-1:], [hStmt])
+                        del stub.cancelled[:]
+                    stub.executeDelay = 0
+                    self.assertEqual(cursor.execute("SELECT ?", (2, ))
+                                     .fetchone()[0], 2)
+            self.assertLess(time.time() - start, 2)
+        finally:
+            loop.close()
+            stub.executeDelay = 0
+
+    def testUnwatchDuringCancel(self):
+        stub.cancelDelay = 0.3
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+                hStmt = cursor.hStmt.value
+                cursor.execute("SELECT SESSION", cancelTimeout=0.05)
+                time.sleep(0.15)
+                # The watchdog is cancelling the statement, the handle must
+                # not be reused until it is done.
+                cursor.close()
+                self.assertEqual(stub.cancelled[-1:], [hStmt])
+                with conn.cursor() as cursor:
+                    self.assertEqual(cursor.hStmt.value, hStmt)
+                    self.assertEqual(cursor.execute(
+                        "SELECT SESSION").fetchone()[0], conn.sessionno)
+        finally:
+            stub.cancelDelay = 0
+
+    def testSlowCancel(self):
+        stub.cancelDelay = 0.5
+        try:
+            with self.connect() as conn, self.connect() as other:
+                cursor = conn.cursor()
+                cursor.execute("SELECT SESSION", cancelTimeout=0.05)
+                time.sleep(0.15)
+                # Other cursors are freed while the statement is cancelled.
+                start = time.time()
+                with other.cursor() as c:
+                    c.execute("SELECT SESSION", cancelTimeout=10).fetchall()
+                with other.cursor() as c:
+                    self.assertFalse(c.execute("SELECT SESSION").watched)
+                self.assertLess(time.time() - start, 0.3)
+                cursor.close()
+                self.assertGreaterEqual(time.time() - start, 0.3)
+        finally:
+            stub.cancelDelay = 0
+
+    def testCloseDuringPrefetch(self):
+        def rows(params):
+            for i in range(0, 1000):
+                if i == 150:
+                    time.sleep(0.3)
+                yield (i, )
+        stub.addResult(r"SELECT \* FROM testCloseDuringPrefetch",
+                       [("id", "INTEGER")], rows)
+        fetched = []
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.arraysize = 100
+            cursor.execute("SELECT * FROM testCloseDuringPrefetch",
+                           prefetch=2)
+            prefetcher = cursor.iterator
+            reader = threading.Thread(
+                target=lambda: fetched.extend(cursor.fetchall()))
+            reader.daemon = True
+            reader.start()
+            time.sleep(0.1)
+            # The reader waits for a batch when the cursor is closed.
+            cursor.close()
+            reader.join(5)
+            self.assertFalse(reader.is_alive())
+            self.assertFalse(prefetcher.thread.is_alive())
+        # Only the rows read before the cursor was closed are returned.
+        self.assertLessEqual(len(fetched), 100)
+        self.assertEqual([r.id for r in fetched], list(range(0, len(fetched))))
+
+
+stub = odbcstub.OdbcStub()
+
+if __name__ == '__main__':
+    unittest.main()
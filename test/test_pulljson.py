@@ -20,6 +20,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 from teradata import pulljson
+import decimal
 import unittest
 from io import BytesIO
 
@@ -364,6 +365,37 @@ class TestJSONPullParser (unittest.TestCase):
             self.assertEqual(len(x["key" + str(i) + "}"]), 3)
             i += 1
 
+    def testNextBatch(self):
+        text = (b'[[1, "a\\"]"], {"key": [2.5, null]}, 3, "}", [], '
+                b'[true, {"x": "]"}]]')
+        expected = list(pulljson.JSONPullParser(BytesIO(text)).expectArray())
+        reader = pulljson.JSONPullParser(BytesIO(text))
+        arr = reader.expectArray()
+        self.assertEqual(arr.nextBatch(4), expected[0:4])
+        self.assertEqual(next(arr), expected[4])
+        self.assertEqual(arr.nextBatch(4), expected[5:])
+        self.assertEqual(arr.nextBatch(4), [])
+        stream = BytesIO(b'[[1, 2], [3, }]]')
+        arr = pulljson.JSONPullParser(stream).expectArray()
+        with self.assertRaises(pulljson.JSONParseError):
+            arr.nextBatch(2)
+
+    def testParseInt(self):
+        stream = BytesIO(b'[[1, -2, 1.5, 10E2], {"count": 3}, [4, [5.0]]]')
+        reader = pulljson.JSONPullParser(stream, parseInt=int)
+        values = list(reader.expectArray())
+        self.assertEqual(values[0], [1, -2, decimal.Decimal("1.5"),
+                                     decimal.Decimal("10E2")])
+        self.assertEqual(values[1], {"count": 3})
+        self.assertEqual(values[2], [4, [decimal.Decimal("5.0")]])
+        self.assertEqual([type(v) for v in values[0]],
+                         [int, int, decimal.Decimal, decimal.Decimal])
+        stream = BytesIO(b'{"count": 3, "value": 4.5}')
+        reader = pulljson.JSONPullParser(stream, parseInt=int)
+        reader.expectObject()
+        self.assertIs(type(reader.expectField("count")), int)
+        self.assertIs(type(reader.expectField("value")), decimal.Decimal)
+
 
 if __name__ == '__main__':
     unittest.main()
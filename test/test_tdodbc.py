@@ -21,6 +21,7 @@
 # SOFTWARE.
 import unittest
 import os
+import io
 import teradata
 from teradata import tdodbc, util
 
@@ -53,6 +54,16 @@ class TdOdbcTest (unittest.TestCase):
         self.assertIsNotNone(conn)
         conn.close()
 
+    def testSessionNumber(self):
+        with tdodbc.connect(system=system, username=self.username,
+                            password=self.password, autoCommit=True,
+                            queryBands={"test": "1"}) as conn:
+            with conn.cursor() as cursor:
+                self.assertEqual(conn.sessionno, cursor.execute(
+                    "SELECT SESSION").fetchone()[0])
+                self.assertIn("test=1", cursor.execute(
+                    "SELECT GetQueryBand()").fetchone()[0])
+
     def testCursorBasics(self):
         with tdodbc.connect(system=system, username=self.username,
                             password=self.password, autoCommit=True) as conn:
@@ -94,6 +105,67 @@ class TdOdbcTest (unittest.TestCase):
                 self.assertEqual(cursor.description[1][1], tdodbc.STRING)
                 self.assertEqual(count, 3)
 
+    def testCursorStatementReuse(self):
+        with tdodbc.connect(system=system, username=self.username,
+                            password=self.password, autoCommit=True) as conn:
+            with conn.cursor() as cursor:
+                hStmt = cursor.hStmt.value
+                cursor.executemany("SELECT ?", [(1, ), (2, )], batch=True)
+            self.assertEqual(len(conn.statements), 1)
+            for i in range(0, 10):
+                with conn.cursor() as cursor:
+                    self.assertEqual(cursor.hStmt.value, hStmt)
+                    self.assertEqual(
+                        cursor.execute("SELECT ?", (i, )).fetchone()[0], i)
+            self.assertEqual(len(conn.statements), 1)
+        self.assertEqual(len(conn.statements), 0)
+
+    def testFetchValuesLargerThanBuffer(self):
+        with tdodbc.connect(system=system, username=self.username,
+                            password=self.password, autoCommit=True) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "CREATE TABLE testFetchValuesLargerThanBuffer (id INT, "
+                    "a VARCHAR(32000) CHARACTER SET UNICODE, b CLOB, "
+                    "c BLOB)")
+                a = u"\u4EC5\u6062" * 16000
+                b = "0123456789" * 100000
+                c = bytearray(range(0, 256)) * 4000
+                cursor.execute(
+                    "INSERT INTO testFetchValuesLargerThanBuffer "
+                    "VALUES (?, ?, ?, ?)", (1, a, b, c))
+                row = cursor.execute(
+                    "SELECT * FROM testFetchValuesLargerThanBuffer").fetchone()
+                self.assertEqual(row.a, a)
+                self.assertEqual(row.b, b)
+                self.assertEqual(row.c, c)
+
+    def testStreamLobs(self):
+        with tdodbc.connect(system=system, username=self.username,
+                            password=self.password, autoCommit=True) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "CREATE TABLE testStreamLobs (id INT, b CLOB, c BLOB)")
+                b = u"0123456789" * 100000
+                c = bytearray(range(0, 256)) * 4000
+                cursor.execute(
+                    "INSERT INTO testStreamLobs VALUES (?, ?, ?)",
+                    (1, io.StringIO(b), io.BytesIO(c)))
+                row = cursor.execute(
+                    "SELECT id, b, c FROM testStreamLobs",
+                    streamLobs=True).fetchone()
+                self.assertEqual(row.b, b)
+                self.assertEqual(row.c.length, len(c))
+                self.assertEqual(row.c.read(1000), c[:1000])
+                self.assertEqual(row.c.read(), c[1000:])
+                self.assertEqual(row.c.read(), bytearray())
+                cursor.execute("SELECT c FROM testStreamLobs",
+                               streamLobs=True)
+                row = cursor.fetchone()
+                cursor.fetchone()
+                with self.assertRaises(teradata.InterfaceError):
+                    row.c.read()
+
     def testExecuteWithParamsMismatch(self):
         with self.assertRaises(teradata.InterfaceError) as cm:
             with tdodbc.connect(system=system, username=self.username,
@@ -110,6 +182,93 @@ class TdOdbcTest (unittest.TestCase):
         self.assertEqual(
             cm.exception.code, "PARAMS_MISMATCH", cm.exception.msg)
 
+    def testExecuteManyBatchChunks(self):
+        rowCount = 1000
+        with tdodbc.connect(system=system, username=self.username,
+                            password=self.password, autoCommit=True) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "CREATE TABLE testExecuteManyBatchChunks (id INT, "
+                    "name VARCHAR(128))")
+                cursor.executemany(
+                    "INSERT INTO testExecuteManyBatchChunks VALUES (?, ?)",
+                    [(x, str(x) * 10) for x in range(0, rowCount)],
+                    batch=True, maxRequestSize=2 ** 14)
+                self.assertEqual(cursor.rowcount, rowCount)
+                self.assertEqual(cursor.execute(
+                    "SELECT COUNT(*) FROM testExecuteManyBatchChunks"
+                ).fetchone()[0], rowCount)
+
+    def testExecuteManyBatchErrors(self):
+        rowCount = 100
+        badRows = (10, 55)
+        with tdodbc.connect(system=system, username=self.username,
+                            password=self.password, autoCommit=True,
+                            transactionMode="ANSI") as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "CREATE TABLE testExecuteManyBatchErrors (id INT, "
+                    "name VARCHAR(128) NOT NULL) UNIQUE PRIMARY INDEX (id)")
+                params = [(x, None if x in badRows else str(x))
+                          for x in range(0, rowCount)]
+                with self.assertRaises(teradata.BatchError) as cm:
+                    cursor.executemany(
+                        "INSERT INTO testExecuteManyBatchErrors "
+                        "VALUES (?, ?)", params, batch=True)
+                failed = [index for index, error in cm.exception.failures]
+                self.assertEqual(failed, list(badRows))
+                cursor.executemany(
+                    "INSERT INTO testExecuteManyBatchErrors VALUES (?, ?)",
+                    [(params[i][0], "retry") for i in failed], batch=True)
+                self.assertEqual(cursor.execute(
+                    "SELECT COUNT(*) FROM testExecuteManyBatchErrors"
+                ).fetchone()[0], rowCount)
+
+    def testConnectionPool(self):
+        pool = tdodbc.OdbcConnectionPool(maxSize=1, timeout=1)
+        try:
+            conn = pool.connect(system=system, username=self.username,
+                                password=self.password, autoCommit=True,
+                                queryBands={"test": "1"})
+            sessionno = conn.sessionno
+            conn.close()
+            self.assertEqual(pool.stats()["idle"], 1)
+            with pool.connect(system=system, username=self.username,
+                              password=self.password, autoCommit=True,
+                              queryBands={"test": "2"}) as conn:
+                self.assertEqual(conn.sessionno, sessionno)
+                self.assertEqual(conn.queryBands, "test=2;")
+                with conn.cursor() as cursor:
+                    self.assertIn("test=2", cursor.execute(
+                        "SELECT GetQueryBand()").fetchone()[0])
+                with self.assertRaises(teradata.InterfaceError) as cm:
+                    pool.connect(system=system, username=self.username,
+                                 password=self.password, autoCommit=True)
+                self.assertEqual(cm.exception.code, teradata.POOL_TIMEOUT)
+            stats = pool.stats()
+            self.assertEqual(stats["size"], 1)
+            self.assertEqual(stats["created"], 1)
+            self.assertEqual(stats["waits"], 1)
+        finally:
+            pool.close()
+        self.assertEqual(pool.stats()["size"], 0)
+
+    def testConnectionPoolWarmup(self):
+        pool = tdodbc.OdbcConnectionPool(maxSize=4)
+        try:
+            self.assertEqual(pool.warmup(
+                8, parallelism=4, system=system, username=self.username,
+                password=self.password, autoCommit=True), 4)
+            stats = pool.stats()
+            self.assertEqual(stats["idle"], 4)
+            self.assertEqual(stats["created"], 4)
+            with pool.connect(system=system, username=self.username,
+                              password=self.password, autoCommit=True):
+                self.assertEqual(pool.stats()["created"], 4)
+        finally:
+            pool.close()
+
+
 configFiles = [os.path.join(os.path.dirname(__file__), 'udaexec.ini')]
 udaExec = teradata.UdaExec(configFiles=configFiles, configureLogging=False)
 dsn = 'ODBC'
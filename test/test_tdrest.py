@@ -20,7 +20,10 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 import unittest
+import json
 import os
+import socket
+import threading
 import teradata
 from teradata import tdrest, util
 
@@ -72,6 +75,18 @@ class TdRestTest (unittest.TestCase):
         self.assertIsNotNone(conn)
         conn.close()
 
+    def testHttpConnectionReuse(self):
+        with tdrest.connect(host=host, system=system, username=self.username,
+                            password=self.password) as conn:
+            self.assertEqual(len(conn.httpConns), 1)
+            httpConn = conn.httpConns[0]
+            with conn.cursor() as cursor:
+                self.assertIs(cursor.conn, httpConn)
+                self.assertEqual(
+                    cursor.execute("SELECT 1").fetchone()[0], 1)
+            self.assertEqual(conn.httpConns, [httpConn])
+        self.assertEqual(conn.httpConns, [])
+
     def testCursorBasics(self):
         with tdrest.connect(host=host, system=system, username=self.username,
                             password=self.password) as conn:
@@ -138,6 +153,105 @@ class TdRestTest (unittest.TestCase):
                     "/systems/{}/sessions/{}".format(conn.system,
                                                      conn.sessionId))
 
+
+class HttpConnectionTest (unittest.TestCase):
+    """Tests HttpConnection against a local server that can drop
+    connections. Actions are "ok", "close", "drop" or a function that
+    returns the JSON response for the JSON request."""
+
+    def setUp(self):
+        try:
+            from http.server import BaseHTTPRequestHandler, HTTPServer
+        except ImportError:
+            from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+        requests = self.requests = []
+        actions = self.actions = []
+        closed = self.closed = threading.Event()
+
+        class Handler (BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                requests.append(self.path)
+                action = actions.pop(0)
+                response = b"{}"
+                if callable(action):
+                    response = json.dumps(
+                        action(json.loads(body.decode("utf8")))).encode()
+                    action = "ok"
+                if action != "drop":
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(response)))
+                    self.end_headers()
+                    self.wfile.write(response)
+                    self.wfile.flush()
+                if action != "ok":
+                    self.connection.shutdown(socket.SHUT_RDWR)
+                    closed.set()
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  args=(0.05,))
+        thread.daemon = True
+        thread.start()
+        self.template = tdrest.RestTemplate(
+            "http", "127.0.0.1", self.server.server_address[1], "", "user",
+            "password")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def testReconnectAfterIdleClose(self):
+        self.actions.extend(("close", "ok"))
+        with self.template.connect() as http:
+            http.post("/first")
+            http.drain()
+            self.closed.wait(5)
+            http.post("/second")
+            http.drain()
+        self.assertEqual(self.requests, ["/first", "/second"])
+
+    def testNoResendAfterRequestSent(self):
+        self.actions.extend(("ok", "drop", "ok"))
+        with self.template.connect() as http:
+            http.post("/sessions")
+            http.drain()
+            with self.assertRaises(tdrest.InterfaceError):
+                http.post("/queries")
+        self.assertEqual(self.requests, ["/sessions", "/queries"])
+
+    def testExecuteManyChunks(self):
+        def insert(request):
+            return {"queueDuration": 0, "queryDuration": 0, "results": [
+                {"resultSet": False, "count": int(params[0])}
+                for params in request["params"]]}
+        self.actions.extend([insert] * 3)
+        progress = []
+        with tdrest.connect(
+                host="127.0.0.1", port=self.server.server_address[1],
+                system="test", username="user", password="password",
+                webContext="", implicit=True) as conn:
+            with conn.cursor() as cursor:
+                cursor.executemany(
+                    "INSERT INTO test VALUES (?)", [(i, ) for i in
+                                                    range(1, 7)],
+                    batchSize=2, progressCallback=lambda *args:
+                    progress.append(args))
+                # The results of earlier requests are counted, only those
+                # of the last request are left for nextset.
+                self.assertEqual(cursor.rowcount, 1 + 2 + 3 + 4 + 5)
+                self.assertTrue(cursor.nextset())
+                self.assertEqual(cursor.rowcount, 6)
+                self.assertFalse(cursor.nextset())
+        self.assertEqual(progress, [(2, 1), (4, 6), (6, 15)])
+        self.assertEqual(self.requests, ["/systems/test/queries"] * 3)
+
+
 configFiles = [os.path.join(os.path.dirname(__file__), 'udaexec.ini')]
 udaExec = teradata.UdaExec(configFiles=configFiles, configureLogging=False)
 dsn = 'HTTP'
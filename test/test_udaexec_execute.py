@@ -240,6 +240,49 @@ class UdaExecExecuteTest ():
             self.assertEqual(len(rows), 0)
             self.assertIsNone(cursor.fetchone())
 
+    def testFetchColumns(self):
+        with udaExec.connect(self.dsn, username=self.username,
+                             password=self.password) as conn:
+            rowCount = 1200
+            conn.execute("""CREATE TABLE testFetchColumns (
+                id INT, f FLOAT, name VARCHAR(128), n INT)""")
+            conn.executemany(
+                "INSERT INTO testFetchColumns VALUES (?, ?, ?, ?)",
+                [(x, x / 2.0, str(x), None if x % 2 else x)
+                 for x in range(0, rowCount)], batch=True)
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT * FROM testFetchColumns ORDER BY id")
+                ids = []
+                for i in range(0, 3):
+                    columns = cursor.fetchcolumns(500)
+                    ids.extend(columns[0])
+                    self.assertEqual(list(columns[1]),
+                                     [x / 2.0 for x in columns[0]])
+                    self.assertEqual(columns[2],
+                                     [str(x) for x in columns[0]])
+                    self.assertEqual(columns[3], [None if x % 2 else x
+                                                  for x in columns[0]])
+                self.assertEqual(list(ids), list(range(0, rowCount)))
+                self.assertEqual(len(cursor.fetchcolumns(500)[0]), 0)
+
+    def testExecuteManyIterable(self):
+        with udaExec.connect(self.dsn, username=self.username,
+                             password=self.password) as conn:
+            rowCount = 2500
+            batchSize = 1000
+            conn.execute("""CREATE TABLE testExecuteManyIterable (
+                id INT, name VARCHAR(128))""")
+            progress = []
+            conn.executemany(
+                "INSERT INTO testExecuteManyIterable VALUES (?, ?)",
+                ((x, str(x)) for x in range(0, rowCount)), batch=True,
+                batchSize=batchSize,
+                progressCallback=lambda count, rows: progress.append(count))
+            self.assertEqual(progress, [1000, 2000, 2500])
+            self.assertEqual(conn.execute(
+                "SELECT COUNT(*) FROM testExecuteManyIterable").fetchone()[0],
+                rowCount)
+
     def testVolatileTable(self):
         with udaExec.connect(self.dsn, username=self.username,
                              password=self.password) as conn: